@@ -0,0 +1,94 @@
+"""
+Benchmark report rendering time, peak memory and page weight against report size.
+
+Run from the repository root:
+    python -m benchmarks.report_render_benchmark
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List
+
+from tools.report_visualizer import ReportVisualizer
+
+def make_report(num_sources: int) -> Dict[str, Any]:
+    """Build a synthetic report with one finding per two sources."""
+    source_analyses = [{
+        "source": {
+            "title": f"Source {i}",
+            "url": f"https://example.com/articles/{i}",
+            "published_date": f"2024-{i % 12 + 1:02d}-01",
+            "relevance_score": (i % 10) + 0.5,
+            "content_summary": "Summary sentence about the source. " * 20
+        },
+        "key_points": [f"Key point {j} of source {i} with some supporting detail." for j in range(5)],
+        "methodology": "Systematic review of published studies. " * 5,
+        "limitations": "Small sample sizes and self-reported data. " * 5,
+        "significance": "Implications for practice and future research. " * 5
+    } for i in range(num_sources)]
+
+    key_findings = [{
+        "finding": f"Finding {i} drawn from several sources.",
+        "supporting_sources": [{
+            "url": s["source"]["url"],
+            "title": s["source"]["title"],
+            "quote": s["key_points"][0]
+        } for s in source_analyses[2 * i:2 * i + 2]]
+    } for i in range(max(1, num_sources // 2))]
+
+    return {
+        "title": f"Benchmark Report {num_sources}",
+        "summary": "Executive summary. " * 50,
+        "key_findings": key_findings,
+        "timeline": [{"event": f"Event {i}", "date": f"2024-{i % 12 + 1:02d}-01", "significance": ""} for i in range(20)],
+        "metadata": {
+            "query": "Benchmark query",
+            "sources_analyzed": num_sources,
+            "date_range": {"earliest": "2024-01-01", "latest": "2024-12-01"}
+        },
+        "source_analyses": source_analyses
+    }
+
+def measure(visualizer: ReportVisualizer, report: Dict[str, Any], output_dir: Path, data_mode: str, repeat: int) -> Dict[str, float]:
+    """Render a report repeatedly and return timing, peak memory and bytes written."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        html_file = Path(visualizer.visualize(report, str(output_dir), 'd3_report.html', data_mode))
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    visualizer.visualize(report, str(output_dir), 'd3_report.html', data_mode)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    data_file = html_file.with_suffix('.data.json.gz')
+    return {
+        "render_ms": min(timings) * 1000,
+        "peak_kb": peak / 1024,
+        "html_kb": html_file.stat().st_size / 1024,
+        "data_kb": data_file.stat().st_size / 1024 if data_mode == 'external' else 0.0
+    }
+
+def main(sizes: List[int], repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        visualizer = ReportVisualizer(cache_dir=str(Path(tmp) / 'cache'))
+        output_dir = Path(tmp) / 'out'
+        output_dir.mkdir()
+
+        print(f"{'sources':>8} {'mode':>9} {'render ms':>10} {'peak KB':>10} {'html KB':>10} {'data KB':>10}")
+        for size in sizes:
+            report = make_report(size)
+            for data_mode in ('inline', 'external'):
+                r = measure(visualizer, report, output_dir, data_mode, repeat)
+                print(f"{size:>8} {data_mode:>9} {r['render_ms']:>10.1f} {r['peak_kb']:>10.0f} "
+                      f"{r['html_kb']:>10.1f} {r['data_kb']:>10.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.sizes, args.repeat)
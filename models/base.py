@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 @dataclass
 class ResearchResult:
@@ -11,6 +11,7 @@ class ResearchResult:
     relevance_score: float = 0.0
     content: Optional[str] = None
     content_summary: Optional[str] = None
+    highlights: Optional[List[str]] = None  # Query-relevant excerpts returned with the search
 
 @dataclass
 class SourceAnalysis:
@@ -35,6 +36,14 @@ class ResearchReport:
     timeline: List[Dict[str, str]]  # Timeline events
     metadata: Dict[str, str]  # Changed to Dict[str, str] to match schema
     source_analyses: List[SourceAnalysis]
+    # Supporting passages per key finding: {"finding", "supporting_sources": [{"url", "title", "quote", "score"}]}
+    finding_citations: List[Dict[str, Any]] = field(default_factory=list)
+
+@dataclass
+class ReportUpdate:
+    """Result of incrementally updating a report with new sources."""
+    report: ResearchReport
+    changed_sections: List[str]
 
 class BaseModel(ABC):
     """Base class for all LLM models."""
@@ -69,6 +78,15 @@ class BaseModel(ABC):
         """
         pass
     
+    def summarize_and_analyze(self,
+                              source: ResearchResult,
+                              max_length: Optional[int] = None) -> SourceAnalysis:
+        """
+        Summarize a source if it's too long, then analyze it.
+        Models may override this to do both in a single call.
+        """
+        return self.analyze_source(self.summarize_source(source, max_length=max_length))
+
     @abstractmethod
     def synthesize_research(self,
                           sources: List[SourceAnalysis],
@@ -79,6 +97,17 @@ class BaseModel(ABC):
         """
         pass
 
+    def update_research(self,
+                        report: ResearchReport,
+                        new_sources: List[SourceAnalysis],
+                        query: str) -> ReportUpdate:
+        """
+        Fold new source analyses into an existing report without re-reading
+        the sources it was built from.
+        Returns the updated report and the names of the sections that changed.
+        """
+        raise NotImplementedError("Incremental synthesis not implemented for this model.")
+
     def count_tokens(self, text: str) -> int:
         """Count tokens in text. Implementation varies by model."""
         raise NotImplementedError("Token counting not implemented for this model.") 
\ No newline at end of file
@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+from .routing import STAGES
+
+logger = logging.getLogger(__name__)
+
+# Model stages plus Exa search and content requests
+BUDGET_STAGES = STAGES + ["search"]
+
+# USD per million input and output tokens
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "o3-mini": (1.10, 4.40),
+}
+
+# USD per Exa search request and per page of contents or highlights
+EXA_PRICES = {
+    "search": 0.005,
+    "contents": 0.001,
+    "highlights": 0.001,
+}
+
+class BudgetExceeded(RuntimeError):
+    """Raised when a call would start after its run or stage budget is used up."""
+
+@dataclass
+class Limits:
+    """Caps for a run or a stage; None means unlimited."""
+    deadline: Optional[float] = None  # Seconds (wall clock for a run, time spent in calls for a stage)
+    max_tokens: Optional[int] = None
+    max_cost: Optional[float] = None  # USD
+
+@dataclass
+class Usage:
+    """What a run or a stage has spent so far."""
+    seconds: float = 0.0
+    tokens: int = 0
+    cost: float = 0.0
+    calls: int = 0
+
+    def fraction_of(self, limits: Limits) -> float:
+        """Largest share of any cap used (0 when uncapped)."""
+        fractions = [0.0]
+        if limits.deadline:
+            fractions.append(self.seconds / limits.deadline)
+        if limits.max_tokens:
+            fractions.append(self.tokens / limits.max_tokens)
+        if limits.max_cost:
+            fractions.append(self.cost / limits.max_cost)
+        return max(fractions)
+
+class BudgetController:
+    """
+    Tracks latency, tokens and cost per run and per stage against caps.
+
+    Callers check pressure before doing work: past degrade_at of a cap they switch to
+    a cheaper fallback (cheaper model, fewer sources, no summarization) and record it,
+    and once a cap is used up check() raises BudgetExceeded.
+    """
+
+    def __init__(self,
+                 run: Optional[Limits] = None,
+                 stages: Optional[Dict[str, Limits]] = None,
+                 degrade_at: float = 0.8,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            run: Caps for the whole run
+            stages: Caps per stage (see BUDGET_STAGES)
+            degrade_at: Share of a cap (0-1) at which callers start degrading
+            clock: Time source in seconds
+        """
+        stages = stages or {}
+        unknown = set(stages) - set(BUDGET_STAGES)
+        if unknown:
+            raise ValueError(f"Unknown budget stages: {sorted(unknown)}")
+        self.run_limits = run or Limits()
+        self.stage_limits = stages
+        self.degrade_at = degrade_at
+        self.clock = clock
+        self.started = clock()
+        self.run_usage = Usage()
+        self.stage_usage: Dict[str, Usage] = {stage: Usage() for stage in BUDGET_STAGES}
+        self.degradations: List[str] = []
+        # Exa fetches may be charged from prefetch threads
+        self._lock = threading.Lock()
+
+    def _run_usage(self) -> Usage:
+        return Usage(seconds=self.clock() - self.started, tokens=self.run_usage.tokens,
+                     cost=self.run_usage.cost, calls=self.run_usage.calls)
+
+    def pressure(self, stage: Optional[str] = None) -> float:
+        """Largest share used of the run caps, and of the stage caps if a stage is given."""
+        pressure = self._run_usage().fraction_of(self.run_limits)
+        if stage is not None and stage in self.stage_limits:
+            pressure = max(pressure, self.stage_usage[stage].fraction_of(self.stage_limits[stage]))
+        return pressure
+
+    def should_degrade(self, stage: Optional[str] = None) -> bool:
+        return self.pressure(stage) >= self.degrade_at
+
+    def check(self, stage: str):
+        """Raise BudgetExceeded if the run or the stage has no budget left."""
+        if self.pressure(stage) >= 1.0:
+            raise BudgetExceeded(f"Budget exhausted before {stage} call ({self.pressure(stage):.0%} used)")
+
+    def remaining_seconds(self) -> Optional[float]:
+        """Time left before the run deadline, usable as a request timeout."""
+        if not self.run_limits.deadline:
+            return None
+        return max(self.run_limits.deadline - (self.clock() - self.started), 0.0)
+
+    def degrade(self, action: str):
+        """Record a fallback taken to stay within budget (once per distinct action)."""
+        if action not in self.degradations:
+            self.degradations.append(action)
+            logger.warning("budget degraded: %s (%.0f%% of run budget used)", action, 100 * self.pressure())
+
+    def _charge(self, stage: str, seconds: float, tokens: int, cost: float):
+        with self._lock:
+            for usage in (self.run_usage, self.stage_usage[stage]):
+                usage.seconds += seconds
+                usage.tokens += tokens
+                usage.cost += cost
+                usage.calls += 1
+
+    def charge_model(self, stage: str, model: str, input_tokens: int, output_tokens: int, seconds: float = 0.0):
+        """Record one model call; models without a known price cost nothing."""
+        input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+        cost = (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+        self._charge(stage, seconds, input_tokens + output_tokens, cost)
+
+    def charge_exa(self, endpoint: str, count: int = 1, seconds: float = 0.0):
+        """Record Exa requests: one per search, or one per page of contents."""
+        self._charge("search", seconds, 0, EXA_PRICES.get(endpoint, 0.0) * count)
+
+    def source_limit(self, max_sources: int) -> int:
+        """Number of sources to process, halved once the run is under budget pressure."""
+        if max_sources > 1 and self.should_degrade():
+            self.degrade(f"fewer sources ({max(1, max_sources // 2)} of {max_sources})")
+            return max(1, max_sources // 2)
+        return max_sources
+
+    def metadata(self) -> Dict[str, str]:
+        """Spend and degradations in the string form used by report metadata."""
+        usage = self._run_usage()
+        return {
+            "budget_seconds": f"{usage.seconds:.1f}",
+            "budget_tokens": str(usage.tokens),
+            "budget_cost_usd": f"{usage.cost:.4f}",
+            "budget_degraded": "; ".join(self.degradations)
+        }
@@ -0,0 +1,217 @@
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Cassette modes: replay only, record everything, or replay what exists and record the rest
+MODES = ("replay", "record", "auto")
+
+# Replay timing: immediate, each interaction's own recorded latency, or latencies drawn
+# from everything recorded for the same endpoint
+LATENCIES = ("none", "recorded", "sampled")
+
+# Response headers that describe the wire encoding rather than the stored body
+_WIRE_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode for a request that was never recorded."""
+
+@dataclass
+class Interaction:
+    """One recorded request and its response. Request headers (and API keys) are never stored."""
+    key: str
+    method: str
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: str  # Base64 of the decoded response body
+    elapsed: float
+
+def _canonical_body(body: bytes) -> bytes:
+    """JSON bodies are compared with sorted keys so field order doesn't matter."""
+    try:
+        return json.dumps(json.loads(body), sort_keys=True).encode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        return body
+
+def request_key(method: str, url: str, body: Optional[bytes]) -> str:
+    """Identity of a request: method, URL and canonical body."""
+    digest = hashlib.sha256(f"{method.upper()} {url}\n".encode("utf-8"))
+    digest.update(_canonical_body(body or b""))
+    return digest.hexdigest()
+
+def _endpoint(method: str, url: str) -> str:
+    parts = urlsplit(url)
+    return f"{method.upper()} {parts.netloc}{parts.path}"
+
+class Cassette:
+    """
+    Recorded HTTP interactions in an append-only JSON Lines file.
+
+    Identical requests are replayed in the order they were recorded; once those run
+    out the last response is repeated. Replay can reproduce recorded latency, either
+    per interaction or as a seeded sample of the endpoint's latency distribution.
+    """
+
+    def __init__(self,
+                 path: str,
+                 mode: str = "replay",
+                 latency: str = "none",
+                 speed: float = 1.0,
+                 seed: int = 0):
+        """
+        Args:
+            path: Cassette file
+            mode: 'replay', 'record' or 'auto' (see MODES)
+            latency: Replay timing (see LATENCIES)
+            speed: Divides replayed delays (2.0 replays twice as fast)
+            seed: Seed for sampled latencies
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if latency not in LATENCIES:
+            raise ValueError(f"Unknown replay latency: {latency}")
+        self.path = Path(path)
+        self.mode = mode
+        self.latency = latency
+        self.speed = speed
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._interactions: Dict[str, List[Interaction]] = defaultdict(list)
+        self._latencies: Dict[str, List[float]] = defaultdict(list)
+        self._replayed: Dict[str, int] = defaultdict(int)
+        self.hits = 0
+        self.recorded = 0
+
+        if mode == "record" and self.path.exists():
+            self.path.unlink()
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._add(Interaction(**json.loads(line)))
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._interactions.values())
+
+    def _add(self, interaction: Interaction):
+        self._interactions[interaction.key].append(interaction)
+        self._latencies[_endpoint(interaction.method, interaction.url)].append(interaction.elapsed)
+
+    def lookup(self, method: str, url: str, body: Optional[bytes]) -> Optional[Interaction]:
+        """
+        The next recorded response for a request, after any replay delay, or None when
+        the request should go to the network. Raises CassetteMiss in replay mode.
+        """
+        if self.mode == "record":
+            return None
+        key = request_key(method, url, body)
+        with self._lock:
+            recorded = self._interactions.get(key)
+            if not recorded:
+                if self.mode == "replay":
+                    raise CassetteMiss(f"No recorded response for {method.upper()} {url}")
+                return None
+            interaction = recorded[min(self._replayed[key], len(recorded) - 1)]
+            self._replayed[key] += 1
+            self.hits += 1
+            if self.latency == "sampled":
+                delay = self._random.choice(self._latencies[_endpoint(method, url)])
+            else:
+                delay = interaction.elapsed if self.latency == "recorded" else 0.0
+        if delay > 0:
+            time.sleep(delay / self.speed)
+        return interaction
+
+    def record(self, method: str, url: str, body: Optional[bytes],
+               status: int, headers: Dict[str, str], content: bytes, elapsed: float):
+        """Append a live interaction to the cassette."""
+        interaction = Interaction(
+            key=request_key(method, url, body),
+            method=method.upper(),
+            url=url,
+            status=status,
+            headers={k: v for k, v in headers.items() if k.lower() not in _WIRE_HEADERS},
+            body=base64.b64encode(content).decode("ascii"),
+            elapsed=round(elapsed, 4)
+        )
+        with self._lock:
+            self._add(interaction)
+            self.recorded += 1
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(asdict(interaction)) + "\n")
+
+class CassetteTransport(httpx.BaseTransport):
+    """httpx transport that replays from a cassette and records live requests through an inner transport."""
+
+    def __init__(self, cassette: Cassette, inner: httpx.BaseTransport):
+        self.cassette = cassette
+        self.inner = inner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        interaction = self.cassette.lookup(request.method, str(request.url), body)
+        if interaction is not None:
+            return httpx.Response(
+                interaction.status,
+                headers=interaction.headers,
+                content=base64.b64decode(interaction.body),
+                request=request
+            )
+
+        started = time.perf_counter()
+        response = self.inner.handle_request(request)
+        try:
+            content = response.read()
+        finally:
+            response.close()
+        self.cassette.record(request.method, str(request.url), body, response.status_code,
+                             dict(response.headers), content, time.perf_counter() - started)
+        return httpx.Response(
+            response.status_code,
+            headers={k: v for k, v in response.headers.items() if k.lower() not in _WIRE_HEADERS},
+            content=content,
+            request=request
+        )
+
+    def close(self):
+        self.inner.close()
+
+class CassetteAdapter(HTTPAdapter):
+    """requests adapter that replays from a cassette and records live requests."""
+
+    def __init__(self, *args, cassette: Cassette, **kwargs):
+        self.cassette = cassette
+        super().__init__(*args, **kwargs)
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        interaction = self.cassette.lookup(request.method, request.url, body)
+        if interaction is not None:
+            response = requests.Response()
+            response.status_code = interaction.status
+            response.headers = CaseInsensitiveDict(interaction.headers)
+            response._content = base64.b64decode(interaction.body)
+            response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+            response.url = request.url
+            response.request = request
+            response.reason = "Replayed"
+            return response
+
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        self.cassette.record(request.method, request.url, body, response.status_code,
+                             dict(response.headers), response.content, time.perf_counter() - started)
+        return response
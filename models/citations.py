@@ -0,0 +1,129 @@
+from typing import Any, Dict, List, Tuple
+from collections import Counter
+import re
+import numpy as np
+from .base import ResearchReport, SourceAnalysis
+from .selection import tokenize
+
+# Sentence boundary: terminal punctuation followed by whitespace, or a blank line
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\n\s*\n')
+
+def split_passages(text: str, min_chars: int = 40, max_chars: int = 400) -> List[str]:
+    """Split text into sentence passages, merging short sentences with their neighbours."""
+    passages: List[str] = []
+    current = ''
+    for sentence in _SENTENCE_END.split(text):
+        sentence = ' '.join(sentence.split())
+        if not sentence:
+            continue
+        current = f"{current} {sentence}" if current else sentence
+        if len(current) >= min_chars:
+            passages.append(current[:max_chars])
+            current = ''
+    if current:
+        passages.append(current[:max_chars])
+    return passages
+
+class PassageIndex:
+    """BM25 index over passages drawn from analyzed sources."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.passages: List[str] = []
+        self.passage_sources: List[int] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._lengths: List[int] = []
+        self._length_array = None
+
+    @classmethod
+    def from_analyses(cls, analyses: List[SourceAnalysis]) -> 'PassageIndex':
+        """Index the full content of each source, or its summary and analysis when content is missing."""
+        index = cls()
+        for i, analysis in enumerate(analyses):
+            source = analysis.source
+            text = source.content or "\n\n".join(filter(None, [
+                source.content_summary,
+                *analysis.key_points,
+                analysis.significance
+            ]))
+            for passage in split_passages(text):
+                index.add(i, passage)
+        return index
+
+    def add(self, source_index: int, passage: str):
+        """Add one passage belonging to the source at source_index."""
+        passage_id = len(self.passages)
+        terms = Counter(tokenize(passage))
+        self.passages.append(passage)
+        self.passage_sources.append(source_index)
+        self._lengths.append(sum(terms.values()))
+        self._length_array = None
+        for term, tf in terms.items():
+            self._postings.setdefault(term, []).append((passage_id, tf))
+            self._arrays.pop(term, None)
+
+    def _posting_array(self, term: str) -> np.ndarray:
+        """Postings for a term as a (2, n) array of passage ids and term frequencies, built once."""
+        if term not in self._arrays:
+            self._arrays[term] = np.asarray(self._postings[term], dtype=np.int64).T
+        return self._arrays[term]
+
+    def search(self, query: str, top_k: int = 3, max_per_source: int = 1) -> List[Tuple[int, float]]:
+        """
+        Return up to top_k (passage id, score) pairs for the query, best first,
+        taking at most max_per_source passages from any one source.
+        """
+        if not self.passages:
+            return []
+        if self._length_array is None:
+            self._length_array = np.asarray(self._lengths, dtype=np.float32)
+        lengths = self._length_array
+        avg_length = max(float(lengths.mean()), 1.0)
+        scores = np.zeros(len(self.passages), dtype=np.float32)
+
+        for term in set(tokenize(query)):
+            if term not in self._postings:
+                continue
+            ids, tf = self._posting_array(term)
+            idf = np.log(1 + (len(self.passages) - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[ids] / avg_length)
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        matches = np.flatnonzero(scores)
+        results: List[Tuple[int, float]] = []
+        per_source: Counter = Counter()
+        for passage_id in matches[np.argsort(-scores[matches], kind='stable')]:
+            source_index = self.passage_sources[passage_id]
+            if per_source[source_index] >= max_per_source:
+                continue
+            per_source[source_index] += 1
+            results.append((int(passage_id), float(scores[passage_id])))
+            if len(results) >= top_k:
+                break
+        return results
+
+def attach_citations(report: ResearchReport, top_k: int = 3, min_score: float = 1.0) -> ResearchReport:
+    """
+    Link each key finding to its best supporting passages from the report's sources.
+    Populates report.finding_citations in the {finding, supporting_sources} shape the
+    report templates use, without any model calls.
+    """
+    index = PassageIndex.from_analyses(report.source_analyses)
+    citations: List[Dict[str, Any]] = []
+    for finding in report.key_findings:
+        supporting = []
+        for passage_id, score in index.search(finding, top_k=top_k):
+            if score < min_score:
+                break
+            source = report.source_analyses[index.passage_sources[passage_id]].source
+            supporting.append({
+                'url': source.url,
+                'title': source.title,
+                'quote': index.passages[passage_id],
+                'score': round(score, 2)
+            })
+        citations.append({'finding': finding, 'supporting_sources': supporting})
+    report.finding_citations = citations
+    return report
@@ -0,0 +1,149 @@
+from typing import Callable, List, Optional, Set, Tuple
+from dataclasses import dataclass
+from collections import Counter
+from functools import partial
+import hashlib
+import math
+import re
+from .base import ResearchResult
+from .offload import ProcessOffload
+
+# Headings that start a trailing reference section
+_REFERENCE_HEADING = re.compile(
+    r'^\W*(references|bibliography|works cited|citations|sources|notes|footnotes|further reading)\W*$',
+    re.IGNORECASE
+)
+
+@dataclass
+class CleaningStats:
+    """Token savings from cleaning one source."""
+    url: str
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+def _normalize_line(line: str) -> str:
+    return ' '.join(line.split()).lower()
+
+def find_boilerplate(texts: List[str],
+                     min_doc_fraction: float = 0.3,
+                     max_line_chars: int = 200) -> Set[str]:
+    """
+    Find short lines shared by many documents (navigation, cookie banners, footers).
+
+    Returns:
+        Normalized lines that appear in at least min_doc_fraction of the documents
+        (and in at least two of them)
+    """
+    if len(texts) < 2:
+        return set()
+    doc_counts: Counter = Counter()
+    for text in texts:
+        doc_counts.update({
+            normalized for normalized in map(_normalize_line, text.splitlines())
+            if normalized and len(normalized) <= max_line_chars
+        })
+    threshold = max(2, math.ceil(min_doc_fraction * len(texts)))
+    return {line for line, count in doc_counts.items() if count >= threshold}
+
+def clean_content(text: str,
+                  boilerplate: Optional[Set[str]] = None,
+                  cut_references: bool = True,
+                  max_repeats: int = 2,
+                  max_line_chars: int = 200) -> str:
+    """
+    Clean page text before it is tokenized and sent to a model.
+
+    Args:
+        text: Raw page text
+        boilerplate: Normalized lines to drop, usually from find_boilerplate
+        cut_references: Drop everything after a reference-section heading in the second half
+        max_repeats: Short lines seen more often than this within the page (repeated
+            headers, share buttons) are dropped after that many occurrences
+        max_line_chars: Lines longer than this are never treated as repeated boilerplate
+
+    Returns:
+        Cleaned text with repeated blocks removed and whitespace normalized
+    """
+    boilerplate = boilerplate or set()
+    lines = text.splitlines()
+
+    if cut_references:
+        for i in range(len(lines) // 2, len(lines)):
+            if _REFERENCE_HEADING.match(lines[i].strip()):
+                lines = lines[:i]
+                break
+
+    kept: List[str] = []
+    seen_lines: Counter = Counter()
+    for line in lines:
+        normalized = _normalize_line(line)
+        if not normalized:
+            kept.append('')
+            continue
+        if normalized in boilerplate:
+            continue
+        if len(normalized) <= max_line_chars:
+            seen_lines[normalized] += 1
+            if seen_lines[normalized] > max_repeats:
+                continue
+        kept.append(' '.join(line.split()))
+
+    # Drop repeated paragraphs (syndicated blurbs, duplicated sections)
+    blocks: List[str] = []
+    seen_blocks: Set[str] = set()
+    for block in re.split(r'\n{2,}', '\n'.join(kept)):
+        block = block.strip()
+        if not block:
+            continue
+        digest = hashlib.sha1(_normalize_line(block).encode('utf-8')).hexdigest()
+        if digest in seen_blocks:
+            continue
+        seen_blocks.add(digest)
+        blocks.append(block)
+
+    return '\n\n'.join(blocks)
+
+def _clean_and_count(text: str,
+                     count_tokens: Callable[[str], int],
+                     boilerplate: Set[str],
+                     cut_references: bool) -> Tuple[str, int, int]:
+    """Clean one text and count its tokens before and after, in a single pass for worker processes."""
+    cleaned = clean_content(text, boilerplate, cut_references=cut_references)
+    return cleaned, count_tokens(text), count_tokens(cleaned)
+
+def clean_sources(results: List[ResearchResult],
+                  count_tokens: Callable[[str], int],
+                  cut_references: bool = True,
+                  min_doc_fraction: float = 0.3,
+                  offload: Optional[ProcessOffload] = None) -> List[CleaningStats]:
+    """
+    Clean the content of a batch of sources in place.
+    Boilerplate is detected across the batch, so larger batches clean better.
+
+    Args:
+        results: Sources whose content should be cleaned
+        count_tokens: Token counter used to report savings (e.g. openai_model.count_tokens);
+            must be picklable when offloading
+        cut_references: Drop trailing reference sections
+        min_doc_fraction: Share of documents a line must appear in to count as boilerplate
+        offload: Process pool for cleaning and counting large batches (default: inline)
+
+    Returns:
+        Token savings for each source that had content
+    """
+    with_content = [r for r in results if r.content]
+    texts = [r.content for r in with_content]
+    boilerplate = find_boilerplate(texts, min_doc_fraction=min_doc_fraction)
+
+    clean = partial(_clean_and_count, count_tokens=count_tokens, boilerplate=boilerplate, cut_references=cut_references)
+    outputs = offload.map(clean, texts) if offload is not None else [clean(text) for text in texts]
+
+    stats = []
+    for result, (cleaned, before, after) in zip(with_content, outputs):
+        result.content = cleaned
+        stats.append(CleaningStats(url=result.url, tokens_before=before, tokens_after=after))
+    return stats
@@ -0,0 +1,132 @@
+import atexit
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, List, Optional, Tuple, TypeVar, Union
+
+R = TypeVar("R")
+
+def _attach(name: str) -> SharedMemory:
+    """Attach to a block owned by the parent, which is responsible for unlinking it."""
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching registers the block again, but pool workers share
+        # the parent's resource tracker, so the parent's unlink clears the registration
+        return SharedMemory(name=name)
+
+def _run_chunk(func: Callable[[str], R], texts: Union[List[str], Tuple[str, List[Tuple[int, int]]]]) -> List[R]:
+    """Worker: apply func to a chunk passed either directly or as (block name, byte ranges) in shared memory."""
+    if isinstance(texts, list):
+        return [func(text) for text in texts]
+    name, ranges = texts
+    shm = _attach(name)
+    try:
+        results = []
+        for start, end in ranges:
+            with shm.buf[start:end] as view:
+                text = str(view, "utf-8")
+            results.append(func(text))
+        return results
+    finally:
+        shm.close()
+
+class ProcessOffload:
+    """
+    Runs a function over many texts in worker processes once the batch is large enough
+    to be worth it, and inline otherwise.
+
+    Texts are grouped into chunks of roughly equal size. Chunks above shared_memory_chars
+    are written once into a shared memory block that workers decode from in place, rather
+    than being pickled through the pool's pipes.
+    """
+
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 min_chars: int = 500_000,
+                 chunks_per_worker: int = 4,
+                 shared_memory_chars: int = 1_000_000):
+        """
+        Args:
+            max_workers: Worker processes (default: one per CPU)
+            min_chars: Batches with fewer characters in total run inline
+            chunks_per_worker: Chunks per worker, for load balancing
+            shared_memory_chars: Chunks with at least this many characters go through shared memory
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_chars = min_chars
+        self.chunks_per_worker = chunks_per_worker
+        self.shared_memory_chars = shared_memory_chars
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def should_offload(self, texts: List[str]) -> bool:
+        return self.max_workers > 1 and len(texts) > 1 and sum(map(len, texts)) >= self.min_chars
+
+    def _chunks(self, texts: List[str]) -> List[List[str]]:
+        """Consecutive groups of texts of roughly equal total length."""
+        target = max(sum(map(len, texts)) // (self.max_workers * self.chunks_per_worker), 1)
+        chunks, current, size = [], [], 0
+        for text in texts:
+            current.append(text)
+            size += len(text)
+            if size >= target:
+                chunks.append(current)
+                current, size = [], 0
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def map(self, func: Callable[[str], R], texts: List[str]) -> List[R]:
+        """
+        Apply func to each text, in worker processes above min_chars.
+
+        Args:
+            func: A picklable function (module level, or functools.partial of one)
+            texts: Texts to process
+
+        Returns:
+            Results in the order of the input texts
+        """
+        if not self.should_offload(texts):
+            return [func(text) for text in texts]
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+        blocks: List[SharedMemory] = []
+        try:
+            futures = []
+            for chunk in self._chunks(texts):
+                if sum(map(len, chunk)) < self.shared_memory_chars:
+                    futures.append(self._executor.submit(_run_chunk, func, chunk))
+                    continue
+                encoded = [text.encode("utf-8") for text in chunk]
+                block = SharedMemory(create=True, size=max(sum(map(len, encoded)), 1))
+                blocks.append(block)
+                ranges, offset = [], 0
+                for data in encoded:
+                    block.buf[offset:offset + len(data)] = data
+                    ranges.append((offset, offset + len(data)))
+                    offset += len(data)
+                futures.append(self._executor.submit(_run_chunk, func, (block.name, ranges)))
+            return [result for future in futures for result in future.result()]
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+@lru_cache(maxsize=None)
+def default_offload() -> ProcessOffload:
+    """Process-wide backend configured from OFFLOAD_WORKERS and OFFLOAD_MIN_CHARS."""
+    workers = os.getenv("OFFLOAD_WORKERS")
+    offload = ProcessOffload(
+        max_workers=int(workers) if workers else None,
+        min_chars=int(os.getenv("OFFLOAD_MIN_CHARS", 500_000))
+    )
+    atexit.register(offload.close)
+    return offload
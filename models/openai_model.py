@@ -1,15 +1,34 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable, Tuple
 import tiktoken
-from openai import OpenAI
+from openai import LengthFinishReasonError, ContentFilterFinishReasonError
 import json
-from pydantic import BaseModel, Field
-from .base import BaseModel as AbstractBaseModel, ResearchResult, SourceAnalysis, ResearchReport
+from functools import lru_cache
+from pydantic import BaseModel, Field, ValidationError
+from .base import BaseModel as AbstractBaseModel, ResearchResult, SourceAnalysis, ResearchReport, ReportUpdate
+from .routing import RoutingPolicy
+from .budget import BudgetController
+from .transport import default_transport
+from .profiling import profiled
+from .selection import mmr_select
+from .citations import attach_citations
+from .prompt_encoding import PromptStats, compact_json, domain, encode_records, measure, resolve_ids, short_ids
+from .relevance import RelevanceScorer, default_relevance_scorer
 from datetime import datetime
+from dataclasses import replace
+
+@lru_cache(maxsize=None)
+def _encoding(model: str) -> tiktoken.Encoding:
+    """Load a tiktoken encoding once per process."""
+    return tiktoken.encoding_for_model(model)
+
+def count_tokens(text: str) -> int:
+    """Count tokens with the base encoding; a module-level function so worker processes can run it."""
+    return len(_encoding("gpt-4").encode(text))
 
 class SourceEvaluation(BaseModel):
     """Schema for source evaluation response."""
     scores: List[Dict[str, float]] = Field(
-        description="List of scores for each source, containing url and score"
+        description="List of scores for each source, containing its id and score"
     )
 
     class Config:
@@ -29,6 +48,14 @@ class SourceAnalysisSchema(BaseModel):
     limitations: Optional[str] = Field(description="Study limitations and constraints")
     significance: str = Field(description="Research significance and implications")
 
+class SourceDigestSchema(BaseModel):
+    """Schema for a fused summarize-and-analyze response."""
+    content_summary: str = Field(description="Concise summary of the source content")
+    key_points: List[str] = Field(description="Main points from the source")
+    methodology: Optional[str] = Field(description="Research methodology used")
+    limitations: Optional[str] = Field(description="Study limitations and constraints")
+    significance: str = Field(description="Research significance and implications")
+
 class ResearchReportSchema(BaseModel):
     """Schema for final research report."""
     title: str = Field(description="Concise title for the research report")
@@ -49,45 +76,184 @@ class ResearchReportSchema(BaseModel):
             ]
         }
 
+# Report sections the synthesis model writes; everything else is bookkeeping.
+REPORT_SECTIONS = [
+    "title", "summary", "key_findings", "detailed_analysis", "critical_evaluation",
+    "future_implications", "methodology_analysis", "limitations_and_gaps"
+]
+
+class ReportUpdateSchema(BaseModel):
+    """Schema for incremental report update response. Unchanged sections are null."""
+    title: Optional[str] = Field(description="Revised title, or null if unchanged")
+    summary: Optional[str] = Field(description="Revised executive summary, or null if unchanged")
+    key_findings: Optional[List[str]] = Field(description="Full revised list of key findings, or null if unchanged")
+    detailed_analysis: Optional[str] = Field(description="Revised in-depth analysis, or null if unchanged")
+    critical_evaluation: Optional[str] = Field(description="Revised critical evaluation, or null if unchanged")
+    future_implications: Optional[str] = Field(description="Revised future implications, or null if unchanged")
+    methodology_analysis: Optional[str] = Field(description="Revised methodology analysis, or null if unchanged")
+    limitations_and_gaps: Optional[str] = Field(description="Revised limitations and gaps, or null if unchanged")
+
 class OpenAIModel(AbstractBaseModel):
     """OpenAI model implementation using different models for different tasks."""
     
-    def __init__(self):
-        self.client = OpenAI()
+    def __init__(self,
+                 routing: Optional[RoutingPolicy] = None,
+                 fuse_summary_analysis: bool = False,
+                 diversity: float = 0.3,
+                 budget: Optional[BudgetController] = None,
+                 compact_prompts: bool = True,
+                 scorer: Optional[RelevanceScorer] = None):
+        # Every model shares one keep-alive connection pool
+        self.client = default_transport().openai_client()
+        self.routing = routing or RoutingPolicy()
+        # Latency/token/cost caps; calls degrade near a cap and stop once it is used up
+        self.budget = budget
+        # Summarize and analyze long sources in one call instead of two
+        self.fuse_summary_analysis = fuse_summary_analysis
+        # Weight of redundancy versus relevance when selecting sources (0 = plain top-N)
+        self.diversity = diversity
+        # Send sources with short IDs and without repeated labels or JSON formatting
+        self.compact_prompts = compact_prompts
+        # Verbose versus compact prompt size of each compact call
+        self.prompt_stats: List[PromptStats] = []
+        # Local relevance model; only sources it is unsure about are scored by the LLM
+        self.scorer = scorer if scorer is not None else default_relevance_scorer()
+
+        # Base model per role for small inputs; each call is routed individually
+        self.eval_model = self.routing.base_model("evaluation")
+        self.summary_model = self.routing.base_model("summary")
+        self.analysis_model = self.routing.base_model("analysis")
+        self.synthesis_model = self.routing.base_model("synthesis")
+
+    def count_tokens(self, text: str) -> int:
+        """Count tokens using tiktoken."""
+        return count_tokens(text)
+
+    def _messages_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """Estimate the input size of a chat request."""
+        return sum(self.count_tokens(m["content"]) for m in messages)
 
+    def _record_prompt(self, stage: str, verbose: List[Dict[str, str]], compact: List[Dict[str, str]]):
+        """Record and report how many tokens the compact encoding saved for a call."""
+        stats = measure(stage, "\n".join(m["content"] for m in verbose),
+                        "\n".join(m["content"] for m in compact), self.count_tokens)
+        self.prompt_stats.append(stats)
+        print(f"{stage} prompt: {stats.tokens_before} -> {stats.tokens_after} tokens")
+
+    def _route(self, stage: str, messages: List[Dict[str, str]]) -> Tuple[str, bool]:
         """
-        self.eval_model = "o3-mini"  
-        self.summary_model = "o3-mini"
-        self.analysis_model = "o3-mini" 
-        self.synthesis_model = "o3-mini"
+        Choose the model for a call and whether it may escalate. Under budget
+        pressure the cheapest tier that fits the input is used and escalation is disabled.
         """
+        input_tokens = self._messages_tokens(messages)
+        if self.budget is not None and self.budget.should_degrade(stage):
+            self.budget.degrade(f"cheaper model for {stage}")
+            return self.routing.cheapest(stage, input_tokens), False
+        return self.routing.route(stage, input_tokens), True
 
-        self.eval_model = "gpt-4o-mini"  
-        self.summary_model = "gpt-4o-mini"
-        self.analysis_model = "gpt-4o-mini" 
-        self.synthesis_model = "gpt-4o-mini"
+    def _request(self, stage: str, create: Callable[..., Any], model: str, **kwargs) -> Any:
+        """Make one API call, enforcing and charging the budget if there is one."""
+        if self.budget is None:
+            return create(model=model, **kwargs)
+        self.budget.check(stage)
+        timeout = self.budget.remaining_seconds()
+        if timeout is not None:
+            kwargs.setdefault("timeout", timeout)
+        started = self.budget.clock()
+        response = create(model=model, **kwargs)
+        usage = getattr(response, "usage", None)
+        self.budget.charge_model(
+            stage, model,
+            input_tokens=usage.prompt_tokens if usage else 0,
+            output_tokens=usage.completion_tokens if usage else 0,
+            seconds=self.budget.clock() - started
+        )
+        return response
 
-        
-    def count_tokens(self, text: str) -> int:
-        """Count tokens using tiktoken."""
-        enc = tiktoken.encoding_for_model("gpt-4")  # Base encoding for token estimation
-        return len(enc.encode(text))
+    def _parse(self, stage: str, messages: List[Dict[str, str]], response_format: type, **kwargs) -> Any:
+        """
+        Run a structured-output call on the routed model, escalating to a
+        stronger model when the response can't be parsed or fails validation.
+        """
+        model, may_escalate = self._route(stage, messages)
+        attempt = 1
+        while True:
+            try:
+                response = self._request(
+                    stage,
+                    self.client.beta.chat.completions.parse,
+                    model=model,
+                    messages=messages,
+                    response_format=response_format,
+                    **kwargs
+                )
+                parsed = response.choices[0].message.parsed
+                if parsed is not None:
+                    return parsed
+                reason = "no parsed output"
+            except (ValidationError, LengthFinishReasonError, ContentFilterFinishReasonError) as e:
+                reason = type(e).__name__
+
+            model = self.routing.escalate(stage, model, reason, attempt) if may_escalate else None
+            if model is None:
+                raise RuntimeError(f"Invalid {stage} output after escalation: {reason}")
+            attempt += 1
+
+    def _create_json(self, stage: str, messages: List[Dict[str, str]], required_keys: List[str], **kwargs) -> Optional[Dict[str, Any]]:
+        """
+        Run a JSON-mode call on the routed model, escalating when the output
+        isn't valid JSON or lacks required keys. Returns None if every tier fails.
+        """
+        model, may_escalate = self._route(stage, messages)
+        attempt = 1
+        while True:
+            response = self._request(
+                stage,
+                self.client.chat.completions.create,
+                model=model,
+                messages=messages,
+                response_format={"type": "json_object"},
+                **kwargs
+            )
+            try:
+                content = json.loads(response.choices[0].message.content)
+                missing = [key for key in required_keys if key not in content]
+                if not missing:
+                    return content
+                reason = f"missing keys {missing}"
+            except (TypeError, json.JSONDecodeError) as e:
+                reason = type(e).__name__
+
+            print(f"Error parsing response: {reason}")
+            model = self.routing.escalate(stage, model, reason, attempt) if may_escalate else None
+            if model is None:
+                return None
+            attempt += 1
     
-    def evaluate_sources(self, 
-                        results: List[ResearchResult], 
-                        query: str,
-                        max_sources: int = 5) -> List[ResearchResult]:
-        """Evaluate and rank sources using the evaluation model."""
+    def _evaluation_messages(self,
+                             results: List[ResearchResult],
+                             query: str,
+                             ids: Optional[Dict[str, str]] = None) -> List[Dict[str, str]]:
+        """Evaluation prompt listing full URLs, or short source IDs when ids are given."""
+        # Highlights returned with the search give the model something to judge
+        if ids is None:
+            key, example = "url", "source_url"
+            sources_text = "\n\n".join([
+                f"Title: {r.title}\nURL: {r.url}\nDate: {r.published_date}"
+                + (f"\nHighlights: {' ... '.join(r.highlights)}" if r.highlights else "")
+                for r in results
+            ])
+        else:
+            key, example = "id", "S1"
+            sources_text = encode_records([
+                (f"[{ids[r.url]}] {r.title}", {"site": domain(r.url), "date": r.published_date,
+                                               "highlights": r.highlights})
+                for r in results
+            ])
         
-        # Prepare the evaluation prompt
-        sources_text = "\n\n".join([
-            f"Title: {r.title}\nURL: {r.url}\nDate: {r.published_date}"
-            for r in results
-        ])
-        
-        messages = [{
+        return [{
             "role": "system",
-            "content": """You are a research librarian expert at evaluating source quality and relevance.
+            "content": f"""You are a research librarian expert at evaluating source quality and relevance.
             Analyze each source and assign a relevance score (0-10) based on:
             1. Relevance to the research query
             2. Source credibility and authority
@@ -95,12 +261,12 @@ class OpenAIModel(AbstractBaseModel):
             4. Methodology and rigor (if applicable)
             
             Return a list of scores in JSON format like:
-            {
+            {{
                 "scores": [
-                    {"url": "source_url", "score": 8.5},
-                    {"url": "source_url", "score": 7.2}
+                    {{"{key}": "{example}", "score": 8.5}},
+                    {{"{key}": "{example}", "score": 7.2}}
                 ]
-            }"""
+            }}"""
         }, {
             "role": "user",
             "content": f"""Research Query: {query}
@@ -110,30 +276,49 @@ Available Sources:
 
 Evaluate these sources and return relevance scores."""
         }]
+
+    @profiled("evaluation")
+    def evaluate_sources(self, 
+                        results: List[ResearchResult], 
+                        query: str,
+                        max_sources: int = 5) -> List[ResearchResult]:
+        """Evaluate and rank sources, scoring them locally where the relevance scorer is confident."""
+        # Sources the local scorer is sure about skip the LLM
+        to_judge = self.scorer.assign(query, results) if self.scorer is not None else results
+        if len(to_judge) < len(results):
+            print(f"Scored {len(results) - len(to_judge)} of {len(results)} sources locally")
         
-        response = self.client.chat.completions.create(
-            model=self.eval_model,
-            messages=messages,
-            response_format={"type": "json_object"}
-        )
-        
-        # Parse the JSON response
-        try:
-            scores = json.loads(response.choices[0].message.content)["scores"]
-            url_to_score = {s["url"]: s["score"] for s in scores}
+        if to_judge:
+            ids = short_ids([r.url for r in to_judge])
+            messages = self._evaluation_messages(to_judge, query, ids if self.compact_prompts else None)
+            if self.compact_prompts:
+                self._record_prompt("evaluation", self._evaluation_messages(to_judge, query), messages)
             
-            # Update scores and sort results
-            for result in results:
-                result.relevance_score = url_to_score.get(result.url, 0.0)
+            evaluation = self._create_json("evaluation", messages, required_keys=["scores"])
+            
+            # Parse the JSON response
+            try:
+                url_to_score = {url: float(s["score"]) for url, s in resolve_ids(evaluation["scores"], ids).items()}
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Error parsing response: {e}")
+                # Return original results if parsing fails
+                return results[:max_sources]
             
-            return sorted(results, 
-                         key=lambda x: x.relevance_score, 
-                         reverse=True)[:max_sources]
-        except (KeyError, json.JSONDecodeError) as e:
-            print(f"Error parsing response: {e}")
-            # Return original results if parsing fails
-            return results[:max_sources]
+            for result in to_judge:
+                result.relevance_score = url_to_score.get(result.url, 0.0)
+            # The LLM's scores are training data for the local scorer
+            if self.scorer is not None:
+                self.scorer.record(query, [r for r in to_judge if r.url in url_to_score])
+        
+        # Pick a relevant but non-redundant subset and sort it
+        if self.budget is not None:
+            max_sources = self.budget.source_limit(max_sources)
+        selected = mmr_select(results, max_sources, diversity=self.diversity)
+        return sorted(selected, 
+                     key=lambda x: x.relevance_score, 
+                     reverse=True)
     
+    @profiled("summary")
     def summarize_source(self, 
                         source: ResearchResult,
                         max_length: Optional[int] = None) -> ResearchResult:
@@ -144,6 +329,8 @@ Evaluate these sources and return relevance scores."""
         # Check if summarization is needed
         token_count = self.count_tokens(source.content)
         if max_length and token_count > max_length:
+            if self._skip_summary(source, max_length):
+                return source
             messages = [{
                 "role": "system",
                 "content": """Summarize the given text while preserving:
@@ -161,16 +348,13 @@ Text to summarize:
 {source.content}"""
             }]
             
-            response = self.client.beta.chat.completions.parse(
-                model=self.summary_model,
-                messages=messages,
-                response_format=SourceSummary
-            )
+            parsed = self._parse("summary", messages, SourceSummary)
             
-            source.content_summary = response.summary
+            source.content_summary = parsed.summary
             
         return source
     
+    @profiled("analysis")
     def analyze_source(self, source: ResearchResult) -> SourceAnalysis:
         """Perform detailed analysis of a single source."""
         content = source.content_summary if source.content_summary else source.content
@@ -194,13 +378,7 @@ Content:
 Provide a detailed analysis."""
         }]
         
-        response = self.client.beta.chat.completions.parse(
-            model=self.analysis_model,
-            messages=messages,
-            response_format=SourceAnalysisSchema
-        )
-        
-        parsed = response.choices[0].message.parsed
+        parsed = self._parse("analysis", messages, SourceAnalysisSchema)
         
         return SourceAnalysis(
             source=source,
@@ -210,13 +388,87 @@ Provide a detailed analysis."""
             significance=parsed.significance
         )
     
-    def synthesize_research(self,
-                          sources: List[SourceAnalysis],
-                          query: str) -> ResearchReport:
-        """Synthesize analyses into a comprehensive report."""
-        
-        # Prepare source information
-        sources_text = "\n\n".join([
+    @profiled("summary_analysis")
+    def summarize_and_analyze(self,
+                              source: ResearchResult,
+                              max_length: Optional[int] = None,
+                              fused: Optional[bool] = None) -> SourceAnalysis:
+        """Summarize and analyze a source, in one call for long content when fused."""
+        fused = self.fuse_summary_analysis if fused is None else fused
+        if not fused:
+            return super().summarize_and_analyze(source, max_length=max_length)
+
+        # Short content needs no summary, so there is nothing to fuse
+        if not source.content or not max_length or self.count_tokens(source.content) <= max_length:
+            return self.analyze_source(source)
+        if self._skip_summary(source, max_length):
+            return self.analyze_source(source)
+
+        messages = [{
+            "role": "system",
+            "content": """Summarize and perform a detailed academic analysis of the research source.
+            The summary should preserve:
+            1. Key findings and conclusions
+            2. Important methodological details
+            3. Significant data points and statistics
+            4. Critical context and limitations
+            
+            The analysis should focus on:
+            1. Key findings and contributions
+            2. Methodological approach and rigor
+            3. Limitations and potential biases
+            4. Significance and implications
+            
+            Maintain academic tone and precision."""
+        }, {
+            "role": "user",
+            "content": f"""Title: {source.title}
+Published: {source.published_date}
+
+Content:
+{source.content}
+
+Provide a summary and a detailed analysis."""
+        }]
+
+        parsed = self._parse("analysis", messages, SourceDigestSchema)
+
+        source.content_summary = parsed.content_summary
+        return SourceAnalysis(
+            source=source,
+            key_points=parsed.key_points,
+            methodology=parsed.methodology,
+            limitations=parsed.limitations,
+            significance=parsed.significance
+        )
+
+    def _skip_summary(self, source: ResearchResult, max_length: int) -> bool:
+        """Under summary budget pressure, truncate the content instead of summarizing it."""
+        if self.budget is None or not self.budget.should_degrade("summary"):
+            return False
+        self.budget.degrade("skipped summarization")
+        # Roughly four characters per token; no need for an exact cut on the degraded path
+        source.content_summary = source.content[:max_length * 4]
+        return True
+
+    def _budget_metadata(self) -> Dict[str, str]:
+        return self.budget.metadata() if self.budget is not None else {}
+
+    def _format_source_analyses(self, sources: List[SourceAnalysis], compact: bool = False) -> str:
+        """Render source analyses as prompt text for synthesis."""
+        if compact:
+            return encode_records([
+                (f"## {s.source.title}", {
+                    "site": domain(s.source.url),
+                    "published": s.source.published_date,
+                    "key points": s.key_points,
+                    "methodology": s.methodology,
+                    "limitations": s.limitations,
+                    "significance": s.significance
+                })
+                for s in sources
+            ])
+        return "\n\n".join([
             f"""Source: {s.source.title}
 URL: {s.source.url}
 Published: {s.source.published_date}
@@ -226,8 +478,11 @@ Limitations: {s.limitations}
 Significance: {s.significance}"""
             for s in sources
         ])
+
+    def _synthesis_messages(self, sources: List[SourceAnalysis], query: str, compact: bool = False) -> List[Dict[str, str]]:
+        sources_text = self._format_source_analyses(sources, compact)
         
-        messages = [{
+        return [{
             "role": "system",
             "content": """You are an expert research synthesist.
             Create a comprehensive research report that:
@@ -245,16 +500,49 @@ Source Analyses:
 
 Synthesize these sources into a comprehensive report."""
         }]
+
+    def _update_messages(self,
+                         report: ResearchReport,
+                         new_sources: List[SourceAnalysis],
+                         query: str,
+                         compact: bool = False) -> List[Dict[str, str]]:
+        sections = {name: getattr(report, name) for name in REPORT_SECTIONS}
+        current_report = compact_json(sections) if compact else json.dumps(sections, indent=2)
+        sources_text = self._format_source_analyses(new_sources, compact)
+
+        return [{
+            "role": "system",
+            "content": """You are an expert research synthesist maintaining a living research report.
+            You are given the current report and analyses of newly found sources.
+            1. Revise only the sections that the new sources materially change
+            2. Return null for every section that should stay as it is
+            3. When revising key findings, return the complete updated list
+            4. Keep revised sections consistent with the unchanged ones"""
+        }, {
+            "role": "user",
+            "content": f"""Research Query: {query}
+
+Current Report:
+{current_report}
+
+New Source Analyses:
+{sources_text}
+
+Update the report with these new sources."""
+        }]
+
+    @profiled("synthesis")
+    def synthesize_research(self,
+                          sources: List[SourceAnalysis],
+                          query: str) -> ResearchReport:
+        """Synthesize analyses into a comprehensive report."""
+        messages = self._synthesis_messages(sources, query, self.compact_prompts)
+        if self.compact_prompts:
+            self._record_prompt("synthesis", self._synthesis_messages(sources, query), messages)
         
-        response = self.client.beta.chat.completions.parse(
-            model=self.synthesis_model,
-            messages=messages,
-            response_format=ResearchReportSchema
-        )
-        
-        parsed = response.choices[0].message.parsed
+        parsed = self._parse("synthesis", messages, ResearchReportSchema)
         
-        return ResearchReport(
+        report = ResearchReport(
             title=parsed.title,
             summary=parsed.summary,
             key_findings=parsed.key_findings,
@@ -264,6 +552,49 @@ Synthesize these sources into a comprehensive report."""
             methodology_analysis=parsed.methodology_analysis,
             limitations_and_gaps=parsed.limitations_and_gaps,
             timeline=[{"event": "Research Completed", "date": datetime.now().strftime("%Y-%m-%d")}],
-            metadata={"query": query, "num_sources": str(len(sources))},
+            metadata={"query": query, "num_sources": str(len(sources)), **self._budget_metadata()},
             source_analyses=sources
-        ) 
\ No newline at end of file
+        )
+        return attach_citations(report)
+
+    @profiled("update")
+    def update_research(self,
+                        report: ResearchReport,
+                        new_sources: List[SourceAnalysis],
+                        query: str) -> ReportUpdate:
+        """Revise an existing report using only newly analyzed sources."""
+        if not new_sources:
+            return ReportUpdate(report=report, changed_sections=[])
+
+        messages = self._update_messages(report, new_sources, query, self.compact_prompts)
+        if self.compact_prompts:
+            self._record_prompt("update", self._update_messages(report, new_sources, query), messages)
+
+        parsed = self._parse("synthesis", messages, ReportUpdateSchema)
+
+        # Only count a section as changed if the revision actually differs
+        revisions = {}
+        for name in REPORT_SECTIONS:
+            value = getattr(parsed, name)
+            if value is not None and value != getattr(report, name):
+                revisions[name] = value
+
+        source_analyses = report.source_analyses + new_sources
+        today = datetime.now().strftime("%Y-%m-%d")
+        metadata = dict(report.metadata)
+        metadata.update({
+            "num_sources": str(len(source_analyses)),
+            "last_updated": today,
+            "changed_sections": ",".join(revisions),
+            **self._budget_metadata()
+        })
+
+        updated = replace(
+            report,
+            **revisions,
+            timeline=report.timeline + [{"event": f"Research Updated ({len(new_sources)} new sources)", "date": today}],
+            metadata=metadata,
+            source_analyses=source_analyses
+        )
+        # Findings may have changed and new sources may support old ones, so re-link all of them
+        return ReportUpdate(report=attach_citations(updated), changed_sections=list(revisions))
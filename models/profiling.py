@@ -0,0 +1,228 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+@dataclass
+class StageProfile:
+    """What was recorded for one stage across all of its runs."""
+    calls: int = 0
+    seconds: float = 0.0
+    stacks: Counter = field(default_factory=Counter)  # Collapsed stack -> sample weight (see SAMPLE_WEIGHT)
+    samples: int = 0
+    allocations: Counter = field(default_factory=Counter)  # "file:line" -> bytes allocated
+    peak_bytes: int = 0
+
+def _collapse(frame) -> str:
+    """A stack in flamegraph collapsed format, outermost frame first."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+# Samples are weighted by the CPU time the thread used since its previous sample, so threads
+# blocked on sockets or locks drop out; without per-thread CPU clocks every sample counts once
+CPU_CLOCKS = hasattr(time, "pthread_getcpuclockid")
+SAMPLE_WEIGHT = "cpu_microseconds" if CPU_CLOCKS else "wall_clock_samples"
+
+class StageProfiler:
+    """
+    Opt-in CPU sampling and allocation tracking per pipeline stage.
+
+    A background thread samples the stacks of threads inside a stage every interval
+    seconds, attributing each sample to the innermost stage. Where the platform has
+    per-thread CPU clocks a sample is weighted by the CPU time since the thread's last
+    sample, so blocking I/O doesn't show up; otherwise samples are on wall-clock time
+    (SAMPLE_WEIGHT says which). With trace_allocations,
+    tracemalloc snapshots taken around each stage give its top allocation sites.
+    """
+
+    def __init__(self,
+                 output_dir: str,
+                 interval: float = 0.005,
+                 trace_allocations: bool = True,
+                 top_allocations: int = 20):
+        """
+        Args:
+            output_dir: Directory for the per-stage .folded and .allocations.txt files
+            interval: Seconds between stack samples
+            trace_allocations: Snapshot allocations around each stage (slower)
+            top_allocations: Allocation sites kept per stage in the report
+        """
+        self.output_dir = Path(output_dir)
+        self.interval = interval
+        self.trace_allocations = trace_allocations
+        self.top_allocations = top_allocations
+        self.profiles: Dict[str, StageProfile] = {}
+        self._active: Dict[int, List[str]] = {}  # Thread id -> stage stack
+        self._cpu: Dict[int, List[float]] = {}  # Thread id -> [CPU clock id, CPU seconds at last sample]
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _weight(self, thread_id: int) -> int:
+        """Microseconds of CPU the thread used since its last sample (1 without CPU clocks)."""
+        if not CPU_CLOCKS:
+            return 1
+        clock = self._cpu[thread_id]
+        now = time.clock_gettime(clock[0])
+        used, clock[1] = now - clock[1], now
+        return int(used * 1_000_000)
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, stages in self._active.items():
+                    if stages and thread_id in frames:
+                        weight = self._weight(thread_id)
+                        if weight > 0:
+                            profile = self.profiles[stages[-1]]
+                            profile.stacks[_collapse(frames[thread_id])] += weight
+                            profile.samples += 1
+
+    def _start_sampler(self):
+        if self._sampler is None:
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name="stage-profiler", daemon=True)
+            self._sampler.start()
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        """Allocation snapshot without the profiler's own bookkeeping."""
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)
+        ])
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Profile the enclosed block as the named stage."""
+        thread_id = threading.get_ident()
+        with self._lock:
+            outermost = not any(self._active.values())
+            self.profiles.setdefault(name, StageProfile())
+            self._active.setdefault(thread_id, []).append(name)
+            if CPU_CLOCKS and len(self._active[thread_id]) == 1:
+                clock = time.pthread_getcpuclockid(thread_id)
+                self._cpu[thread_id] = [clock, time.clock_gettime(clock)]
+            self._start_sampler()
+
+        before = None
+        if self.trace_allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            if outermost:
+                # Nested stages report the peak since their outermost stage began
+                tracemalloc.reset_peak()
+            before = self._snapshot()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            allocations: Counter = Counter()
+            peak = 0
+            if before is not None:
+                peak = tracemalloc.get_traced_memory()[1]
+                for diff in self._snapshot().compare_to(before, "lineno"):
+                    if diff.size_diff > 0:
+                        frame = diff.traceback[0]
+                        allocations[f"{frame.filename}:{frame.lineno}"] += diff.size_diff
+            with self._lock:
+                profile = self.profiles[name]
+                profile.calls += 1
+                profile.seconds += elapsed
+                profile.allocations.update(allocations)
+                profile.peak_bytes = max(profile.peak_bytes, peak)
+                self._active[thread_id].pop()
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Calls, time, samples (and their total weight) and peak traced memory per stage."""
+        with self._lock:
+            return {
+                name: {
+                    "calls": p.calls,
+                    "seconds": round(p.seconds, 4),
+                    "samples": p.samples,
+                    "sample_weight": SAMPLE_WEIGHT,
+                    "sampled_weight": sum(p.stacks.values()),
+                    "peak_kb": round(p.peak_bytes / 1024, 1)
+                }
+                for name, p in self.profiles.items()
+            }
+
+    def write(self) -> Path:
+        """
+        Write <stage>.folded (input for flamegraph.pl or speedscope, weighted as
+        SAMPLE_WEIGHT says), <stage>.allocations.txt and summary.json to the output directory.
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            for name, profile in self.profiles.items():
+                with open(self.output_dir / f"{name}.folded", "w", encoding="utf-8") as f:
+                    for stack, count in profile.stacks.most_common():
+                        f.write(f"{stack} {count}\n")
+                with open(self.output_dir / f"{name}.allocations.txt", "w", encoding="utf-8") as f:
+                    for site, size in profile.allocations.most_common(self.top_allocations):
+                        f.write(f"{size / 1024:10.1f} KiB  {site}\n")
+        with open(self.output_dir / "summary.json", "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+        return self.output_dir
+
+    def close(self):
+        """Stop the sampler and tracemalloc."""
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+        if self.trace_allocations and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+# The process-wide profiler; None keeps every hook a no-op
+_profiler: Optional[StageProfiler] = None
+_NO_PROFILE = nullcontext()
+
+def enable_profiling(output_dir: Optional[str] = None, **kwargs) -> StageProfiler:
+    """Turn on stage profiling for this process (default directory: EXA_PROFILE or ./profiles)."""
+    global _profiler
+    if _profiler is not None:
+        _profiler.close()
+    _profiler = StageProfiler(output_dir or os.getenv("EXA_PROFILE") or "profiles", **kwargs)
+    return _profiler
+
+def disable_profiling() -> Optional[StageProfiler]:
+    """Turn stage profiling off, returning the profiler so its results can still be written."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.close()
+    return profiler
+
+def profile_stage(name: str):
+    """Context manager profiling a block as the named stage when profiling is on."""
+    if _profiler is None:
+        return _NO_PROFILE
+    return _profiler.stage(name)
+
+def profiled(name: str) -> Callable:
+    """Decorator form of profile_stage."""
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return func(*args, **kwargs)
+            with _profiler.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,95 @@
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+from dataclasses import dataclass
+from urllib.parse import urlparse
+import json
+
+# Values that carry no information for the model
+EMPTY_VALUES = (None, "", "None", "Unknown", [])
+
+@dataclass
+class PromptStats:
+    """Prompt size of one call in the verbose and the compact encoding."""
+    stage: str
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+def short_ids(urls: Sequence[str], prefix: str = "S") -> Dict[str, str]:
+    """Short source IDs (S1, S2, ...) for URLs, in order; a repeated URL keeps its first ID."""
+    ids: Dict[str, str] = {}
+    for url in urls:
+        if url not in ids:
+            ids[url] = f"{prefix}{len(ids) + 1}"
+    return ids
+
+def resolve_ids(items: List[Dict[str, Any]], ids: Dict[str, str], key: str = "id") -> Dict[str, Any]:
+    """
+    Map a model's per-source items back to URLs.
+
+    Args:
+        items: Items such as {"id": "S1", "score": 8.5}; a "url" key is accepted too
+        ids: URL to short ID mapping the prompt was encoded with
+
+    Returns:
+        URL to item, for items whose ID (or URL) is known
+    """
+    urls = {short_id: url for url, short_id in ids.items()}
+    resolved = {}
+    for item in items:
+        ref = str(item.get(key) or item.get("url") or "").strip().strip("[]")
+        url = urls.get(ref) or (ref if ref in ids else None)
+        if url is not None:
+            resolved[url] = item
+    return resolved
+
+def domain(url: str) -> str:
+    """Host of a URL without the www. prefix."""
+    netloc = urlparse(url).netloc
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+def _render(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return " | ".join(str(v) for v in value)
+    return str(value)
+
+def encode_records(records: List[Tuple[str, Dict[str, Any]]]) -> str:
+    """
+    Render records as compact prompt text: each record's header line followed by
+    "field: value" lines. Empty fields are dropped, lists are joined with " | ", and
+    fields with the same value in every record are stated once up front.
+
+    Args:
+        records: (header line, field name to value) pairs, fields in display order
+
+    Returns:
+        The encoded records
+    """
+    shared = {}
+    if len(records) > 1:
+        for name, value in records[0][1].items():
+            if value not in EMPTY_VALUES and all(fields.get(name) == value for _, fields in records[1:]):
+                shared[name] = value
+
+    blocks = []
+    if shared:
+        blocks.append("All sources: " + "; ".join(f"{name}: {_render(value)}" for name, value in shared.items()))
+    for header, fields in records:
+        lines = [header]
+        lines.extend(
+            f"{name}: {_render(value)}"
+            for name, value in fields.items()
+            if name not in shared and value not in EMPTY_VALUES
+        )
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+def compact_json(value: Any) -> str:
+    """JSON without indentation or spaces after separators."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+def measure(stage: str, verbose: str, compact: str, count_tokens: Callable[[str], int]) -> PromptStats:
+    """Token counts of the same prompt content in both encodings."""
+    return PromptStats(stage=stage, tokens_before=count_tokens(verbose), tokens_after=count_tokens(compact))
@@ -0,0 +1,405 @@
+"""
+Local relevance scoring learned from past LLM judgments.
+
+Every score the evaluation model gives a source for a query can be appended to a judgment
+log. A ridge regression over cheap lexical, date and domain features is fitted to those
+judgments and predicts the LLM's score in microseconds. Each prediction comes with an
+uncertainty: the spread of the cross-validation fold models plus the error the residual
+model expects for sources like this one. Only sources above max_uncertainty are sent to
+the LLM, and their scores become new training data.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from .base import ResearchResult
+from .prompt_encoding import domain
+from .selection import tokenize
+
+FEATURES = [
+    'title_overlap', 'text_overlap', 'title_jaccard', 'phrase_match', 'title_tokens', 'text_chars', 'has_text',
+    'age_years', 'missing_date', 'domain_prior', 'domain_seen', 'edu', 'gov', 'org', 'path_depth'
+]
+
+@dataclass
+class Judgment:
+    """One relevance score (0-10) the evaluation model gave a source for a query."""
+    query: str
+    url: str
+    title: str
+    published_date: str
+    score: float
+    text: str = ''  # Highlights or the start of the content, as seen at scoring time
+    judged: float = field(default_factory=time.time)
+
+def judgment_text(result: ResearchResult, max_chars: int = 500) -> str:
+    """The source text features are computed from: highlights if any, else summary or content."""
+    if result.highlights:
+        return ' '.join(result.highlights)[:max_chars]
+    return (result.content_summary or result.content or '')[:max_chars]
+
+class JudgmentLog:
+    """Append-only JSONL file of judgments, safe to share between threads."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def append(self, judgments: Sequence[Judgment]):
+        if not judgments:
+            return
+        lines = ''.join(json.dumps(asdict(j)) + '\n' for j in judgments)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open('a', encoding='utf-8') as f:
+                f.write(lines)
+
+    def load(self) -> List[Judgment]:
+        """All judgments in the log; a truncated last line is skipped."""
+        if not self.path.exists():
+            return []
+        judgments = []
+        with self.path.open(encoding='utf-8') as f:
+            for line in f:
+                try:
+                    judgments.append(Judgment(**json.loads(line)))
+                except (ValueError, TypeError):
+                    continue
+        return judgments
+
+def judgments_from_archive(archive: Any) -> List[Judgment]:
+    """
+    Judgments from the sources of archived reports (see tools.analysis.ResearchArchive).
+    Only sources that were selected for analysis are archived, so these skew towards high scores.
+    """
+    queries = dict(zip(archive.column('reports', 'run_id'), archive.column('reports', 'query')))
+    columns = archive.columns('sources', ['run_id', 'url', 'title', 'published_date', 'relevance_score', 'content_summary'])
+    judgments = []
+    for i, run_id in enumerate(columns['run_id']):
+        date = columns['published_date'][i]
+        judgments.append(Judgment(
+            query=queries.get(run_id, ''),
+            url=columns['url'][i],
+            title=columns['title'][i],
+            published_date='Unknown' if np.isnat(date) else str(date),
+            score=float(columns['relevance_score'][i]),
+            text=columns['content_summary'][i][:500]
+        ))
+    return judgments
+
+def _year(date: Optional[str]) -> Optional[float]:
+    match = re.match(r'(\d{4})(?:-(\d{2}))?', date or '')
+    if not match:
+        return None
+    return int(match.group(1)) + (int(match.group(2)) - 1) / 12 if match.group(2) else float(match.group(1))
+
+def _features(query: str, title: str, url: str, published_date: str, text: str, when: float,
+              domain_prior: float, domain_count: int) -> List[float]:
+    """Feature vector in FEATURES order."""
+    query_tokens, title_tokens, text_tokens = set(tokenize(query)), set(tokenize(title)), set(tokenize(text))
+    n = max(len(query_tokens), 1)
+    ordered = tokenize(query)
+    bigrams = {' '.join(ordered[i:i + 2]) for i in range(len(ordered) - 1)}
+    haystack = ' '.join(tokenize(f"{title} {text}"))
+    year = _year(published_date)
+    now = datetime.fromtimestamp(when)
+    host = domain(url)
+    return [
+        len(query_tokens & title_tokens) / n,
+        len(query_tokens & text_tokens) / n,
+        len(query_tokens & title_tokens) / max(len(query_tokens | title_tokens), 1),
+        sum(b in haystack for b in bigrams) / max(len(bigrams), 1),
+        min(len(title_tokens), 30) / 30,
+        np.log1p(len(text)) / 10,
+        float(bool(text)),
+        min(max(now.year + (now.month - 1) / 12 - year, 0.0), 50.0) / 10 if year is not None else 0.0,
+        float(year is None),
+        domain_prior,
+        np.log1p(domain_count),
+        float(host.endswith('.edu') or '.ac.' in host),
+        float(host.endswith('.gov')),
+        float(host.endswith('.org')),
+        min(len([p for p in url.split('?')[0].split('/')[3:] if p]), 10) / 10,
+    ]
+
+def _ridge(X: np.ndarray, y: np.ndarray, alpha: float) -> np.ndarray:
+    """Ridge regression weights; the last column of X is the unpenalized bias."""
+    penalty = alpha * np.eye(X.shape[1])
+    penalty[-1, -1] = 0.0
+    return np.linalg.solve(X.T @ X + penalty, X.T @ y)
+
+class RelevanceScorer:
+    """
+    Predicts the evaluation model's relevance scores from past judgments, and
+    decides which sources are certain enough to skip the LLM.
+    """
+
+    def __init__(self,
+                 log: Optional[JudgmentLog] = None,
+                 max_uncertainty: float = 1.0,
+                 alpha: float = 1.0,
+                 folds: int = 5,
+                 smoothing: float = 5.0,
+                 min_judgments: int = 50):
+        """
+        Args:
+            log: Where LLM judgments are recorded for future training
+            max_uncertainty: Sources predicted with more uncertainty (in score points) go to the LLM
+            alpha: Ridge regularization strength
+            folds: Cross-validation folds; the fold models measure how stable a prediction is
+            smoothing: Judgments of the global mean blended into each domain's mean score
+            min_judgments: Fewer judgments than this are not enough to fit on
+        """
+        self.log = log
+        self.max_uncertainty = max_uncertainty
+        self.alpha = alpha
+        self.folds = folds
+        self.smoothing = smoothing
+        self.min_judgments = min_judgments
+        self.weights: Optional[np.ndarray] = None
+        self.fold_weights: Optional[np.ndarray] = None
+        self.residual_weights: Optional[np.ndarray] = None
+        self.mean: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+        self.global_mean = 5.0
+        self.domains: Dict[str, Tuple[float, int]] = {}  # domain -> (score sum, count)
+
+    @property
+    def trained(self) -> bool:
+        return self.weights is not None
+
+    def _domain_prior(self, host: str, exclude: Optional[float] = None) -> Tuple[float, int]:
+        """Smoothed mean score of a domain, optionally leaving one of its judgments out."""
+        total, count = self.domains.get(host, (0.0, 0))
+        if exclude is not None:
+            total, count = total - exclude, count - 1
+        prior = (total + self.smoothing * self.global_mean) / (count + self.smoothing)
+        return (prior - self.global_mean) / 10, count
+
+    def _design(self, rows: np.ndarray) -> np.ndarray:
+        """Standardized features with a bias column."""
+        Z = (rows - self.mean) / self.scale
+        return np.hstack([Z, np.ones((len(Z), 1))])
+
+    def fit(self, judgments: Sequence[Judgment]) -> 'RelevanceScorer':
+        """
+        Fit the score, fold and residual models.
+
+        Raises:
+            ValueError: If there are fewer than min_judgments judgments
+        """
+        if len(judgments) < self.min_judgments:
+            raise ValueError(f"Need at least {self.min_judgments} judgments to fit, got {len(judgments)}")
+        y = np.array([j.score for j in judgments], dtype=np.float64)
+        self.global_mean = float(y.mean())
+        self.domains = {}
+        for j in judgments:
+            total, count = self.domains.get(domain(j.url), (0.0, 0))
+            self.domains[domain(j.url)] = (total + j.score, count + 1)
+
+        # Leave each judgment out of its own domain prior, or the prior leaks the label
+        rows = np.array([
+            _features(j.query, j.title, j.url, j.published_date, j.text, j.judged,
+                      *self._domain_prior(domain(j.url), exclude=j.score))
+            for j in judgments
+        ])
+        self.mean = rows.mean(axis=0)
+        # Features that are constant in the training data (up to rounding) are left unscaled, not blown up
+        std = rows.std(axis=0)
+        self.scale = np.where(std > 1e-6, std, 1.0)
+        X = self._design(rows)
+        self.weights = _ridge(X, y, self.alpha)
+
+        fold = np.random.default_rng(0).permutation(len(y)) % self.folds
+        out_of_fold = np.zeros_like(y)
+        fold_weights = []
+        for k in range(self.folds):
+            w = _ridge(X[fold != k], y[fold != k], self.alpha)
+            out_of_fold[fold == k] = X[fold == k] @ w
+            fold_weights.append(w)
+        self.fold_weights = np.stack(fold_weights)
+        self.residual_weights = _ridge(X, np.abs(y - out_of_fold), self.alpha)
+        return self
+
+    def predict(self, query: str, results: Sequence[ResearchResult]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            Predicted scores (0-10) and their uncertainty in score points
+        """
+        if not self.trained:
+            raise ValueError("RelevanceScorer has not been fitted")
+        if not results:
+            return np.zeros(0), np.zeros(0)
+        now = time.time()
+        X = self._design(np.array([
+            _features(query, r.title, r.url, r.published_date, judgment_text(r), now,
+                      *self._domain_prior(domain(r.url)))
+            for r in results
+        ]))
+        scores = np.clip(X @ self.weights, 0.0, 10.0)
+        spread = (X @ self.fold_weights.T).std(axis=1)
+        expected_error = np.clip(X @ self.residual_weights, 0.0, None)
+        return scores, np.sqrt(spread ** 2 + expected_error ** 2)
+
+    def assign(self, query: str, results: Sequence[ResearchResult]) -> List[ResearchResult]:
+        """
+        Set relevance_score on the sources predicted within max_uncertainty.
+
+        Returns:
+            The remaining sources, which still need an LLM judgment
+        """
+        if not self.trained:
+            return list(results)
+        scores, uncertainty = self.predict(query, results)
+        uncertain = []
+        for result, score, error in zip(results, scores, uncertainty):
+            if error <= self.max_uncertainty:
+                result.relevance_score = float(score)
+            else:
+                uncertain.append(result)
+        return uncertain
+
+    def record(self, query: str, results: Sequence[ResearchResult]):
+        """Log the LLM's scores for these sources as training data."""
+        if self.log is not None:
+            self.log.append([
+                Judgment(query=query, url=r.url, title=r.title, published_date=r.published_date,
+                         score=r.relevance_score, text=judgment_text(r))
+                for r in results
+            ])
+
+    def save(self, path: str):
+        if not self.trained:
+            raise ValueError("RelevanceScorer has not been fitted")
+        np.savez(path, weights=self.weights, fold_weights=self.fold_weights, residual_weights=self.residual_weights,
+                 mean=self.mean, scale=self.scale, global_mean=self.global_mean,
+                 domains=np.array(list(self.domains), dtype=str),
+                 domain_sums=np.array([s for s, _ in self.domains.values()]),
+                 domain_counts=np.array([c for _, c in self.domains.values()], dtype=np.int64))
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'RelevanceScorer':
+        scorer = cls(**kwargs)
+        with np.load(path) as data:
+            scorer.weights, scorer.fold_weights = data['weights'], data['fold_weights']
+            scorer.residual_weights, scorer.mean, scorer.scale = data['residual_weights'], data['mean'], data['scale']
+            scorer.global_mean = float(data['global_mean'])
+            scorer.domains = {str(d): (float(s), int(c)) for d, s, c in
+                              zip(data['domains'], data['domain_sums'], data['domain_counts'])}
+        return scorer
+
+def _ranks(values: np.ndarray) -> np.ndarray:
+    return np.argsort(np.argsort(values, kind='stable'), kind='stable').astype(np.float64)
+
+def _correlation(a: np.ndarray, b: np.ndarray) -> float:
+    if len(a) < 2 or a.std() == 0 or b.std() == 0:
+        return float('nan')
+    return float(np.corrcoef(a, b)[0, 1])
+
+def evaluate_scorer(judgments: Sequence[Judgment],
+                    test_fraction: float = 0.2,
+                    max_uncertainty: float = 1.0,
+                    top_k: int = 5,
+                    **scorer_args) -> Dict[str, float]:
+    """
+    Offline comparison of the local scorer against LLM scores. Whole queries are held
+    out, so the report reflects queries the scorer has never seen.
+
+    Args:
+        judgments: Logged LLM judgments
+        test_fraction: Share of queries held out for testing
+        max_uncertainty: Routing threshold to report coverage and accuracy at
+        top_k: Sources per query compared for top-k agreement
+        scorer_args: Passed to RelevanceScorer
+
+    Returns:
+        Metric name to value
+
+    Raises:
+        ValueError: If either side of the split is empty or too small to fit
+    """
+    def held_out(query: str) -> bool:
+        return int(hashlib.sha1(query.encode('utf-8')).hexdigest(), 16) % 1000 < test_fraction * 1000
+
+    train = [j for j in judgments if not held_out(j.query)]
+    test = [j for j in judgments if held_out(j.query)]
+    if not test:
+        raise ValueError("No queries were held out for testing; add judgments or raise test_fraction")
+    scorer = RelevanceScorer(max_uncertainty=max_uncertainty, **scorer_args).fit(train)
+
+    by_query: Dict[str, List[Judgment]] = {}
+    for j in test:
+        by_query.setdefault(j.query, []).append(j)
+
+    predicted, uncertainty, actual, agreement = [], [], [], []
+    elapsed = 0.0
+    for query, group in by_query.items():
+        results = [ResearchResult(title=j.title, url=j.url, published_date=j.published_date, content=j.text or None)
+                   for j in group]
+        started = time.perf_counter()
+        scores, errors = scorer.predict(query, results)
+        elapsed += time.perf_counter() - started
+        llm = np.array([j.score for j in group])
+        predicted.append(scores)
+        uncertainty.append(errors)
+        actual.append(llm)
+        k = min(top_k, len(group))
+        agreement.append(len(set(np.argsort(-scores, kind='stable')[:k]) & set(np.argsort(-llm, kind='stable')[:k])) / k)
+
+    predicted, uncertainty, actual = np.concatenate(predicted), np.concatenate(uncertainty), np.concatenate(actual)
+    errors = np.abs(predicted - actual)
+    confident = uncertainty <= max_uncertainty
+    return {
+        'train_judgments': float(len(train)),
+        'test_judgments': float(len(test)),
+        'test_queries': float(len(by_query)),
+        'mae': float(errors.mean()),
+        'rmse': float(np.sqrt((errors ** 2).mean())),
+        'baseline_mae': float(np.abs(actual - scorer.global_mean).mean()),
+        'pearson': _correlation(predicted, actual),
+        'spearman': _correlation(_ranks(predicted), _ranks(actual)),
+        f'top{top_k}_agreement': float(np.mean(agreement)),
+        'confident_share': float(confident.mean()),
+        'confident_mae': float(errors[confident].mean()) if confident.any() else float('nan'),
+        'uncertain_mae': float(errors[~confident].mean()) if (~confident).any() else float('nan'),
+        'microseconds_per_source': elapsed / len(test) * 1e6,
+    }
+
+def format_report(metrics: Dict[str, float]) -> str:
+    """Render evaluate_scorer metrics as aligned text."""
+    width = max(map(len, metrics))
+    lines = []
+    for name, value in metrics.items():
+        shown = f"{int(value)}" if name.endswith(('judgments', 'queries')) else f"{value:.3f}"
+        lines.append(f"{name.ljust(width)}  {shown}")
+    return "\n".join(lines)
+
+@lru_cache(maxsize=None)
+def default_relevance_scorer() -> Optional[RelevanceScorer]:
+    """
+    Process-wide scorer configured from RELEVANCE_JUDGMENTS (judgment log; unset disables
+    local scoring), RELEVANCE_MODEL (fitted model file, else fitted from the log when it
+    has enough judgments) and RELEVANCE_MAX_UNCERTAINTY (score points).
+    """
+    log_path = os.getenv('RELEVANCE_JUDGMENTS')
+    if not log_path:
+        return None
+    args = dict(log=JudgmentLog(log_path), max_uncertainty=float(os.getenv('RELEVANCE_MAX_UNCERTAINTY', 1.0)))
+    model_path = os.getenv('RELEVANCE_MODEL')
+    if model_path and Path(model_path).exists():
+        return RelevanceScorer.load(model_path, **args)
+    scorer = RelevanceScorer(**args)
+    judgments = scorer.log.load()
+    if len(judgments) >= scorer.min_judgments:
+        scorer.fit(judgments)
+    return scorer
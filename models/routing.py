@@ -0,0 +1,112 @@
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages a model call can belong to
+STAGES = ["evaluation", "summary", "analysis", "synthesis"]
+
+# Latency/cost targets, from cheapest and fastest to most capable
+TARGETS = ["latency", "balanced", "quality"]
+
+@dataclass
+class ModelTier:
+    """A model the router can choose, ordered from cheapest to strongest."""
+    name: str
+    large_input_tokens: int  # Inputs above this are routed one tier up unless optimizing for latency
+    max_input_tokens: int    # Hard context limit; inputs above this always go up a tier
+
+@dataclass
+class RoutingDecision:
+    """A single routing or escalation decision, kept for inspection."""
+    stage: str
+    model: str
+    input_tokens: int
+    reason: str
+
+DEFAULT_TIERS = [
+    ModelTier(name="gpt-4o-mini", large_input_tokens=8000, max_input_tokens=120000),
+    ModelTier(name="gpt-4o", large_input_tokens=32000, max_input_tokens=120000),
+    ModelTier(name="o3-mini", large_input_tokens=200000, max_input_tokens=200000),
+]
+
+class RoutingPolicy:
+    """
+    Picks a model per call from the stage, the input size and a latency/cost target,
+    and escalates to a stronger model only when the output can't be parsed or validated.
+    """
+
+    def __init__(self,
+                 tiers: Optional[List[ModelTier]] = None,
+                 stage_floors: Optional[Dict[str, int]] = None,
+                 target: str = "balanced",
+                 max_escalations: int = 1,
+                 history_size: int = 1000):
+        if target not in TARGETS:
+            raise ValueError(f"Unknown routing target: {target}")
+        self.tiers = tiers or DEFAULT_TIERS
+        self.stage_floors = stage_floors or {}
+        self.target = target
+        self.max_escalations = max_escalations
+        self.decisions: Deque[RoutingDecision] = deque(maxlen=history_size)
+
+    def _tier_index(self, model: str) -> int:
+        for i, tier in enumerate(self.tiers):
+            if tier.name == model:
+                return i
+        raise ValueError(f"Model {model} is not in the routing tiers")
+
+    def _record(self, stage: str, model: str, input_tokens: int, reason: str):
+        self.decisions.append(RoutingDecision(stage, model, input_tokens, reason))
+        logger.info("routing stage=%s model=%s input_tokens=%d reason=%s", stage, model, input_tokens, reason)
+
+    def _base_index(self, stage: str) -> int:
+        index = self.stage_floors.get(stage, 0) + (1 if self.target == "quality" else 0)
+        return min(index, len(self.tiers) - 1)
+
+    def base_model(self, stage: str) -> str:
+        """The model a stage uses for small inputs, without recording a decision."""
+        return self.tiers[self._base_index(stage)].name
+
+    def route(self, stage: str, input_tokens: int = 0) -> str:
+        """Choose the model for a call to the given stage."""
+        if stage not in STAGES:
+            raise ValueError(f"Unknown pipeline stage: {stage}")
+
+        index = self._base_index(stage)
+        reason = "quality target" if self.target == "quality" else "stage floor"
+
+        if self.target != "latency" and input_tokens > self.tiers[index].large_input_tokens:
+            index = min(index + 1, len(self.tiers) - 1)
+            reason = "large input"
+        while input_tokens > self.tiers[index].max_input_tokens and index < len(self.tiers) - 1:
+            index += 1
+            reason = "context limit"
+
+        model = self.tiers[index].name
+        self._record(stage, model, input_tokens, reason)
+        return model
+
+    def cheapest(self, stage: str, input_tokens: int = 0, reason: str = "budget pressure") -> str:
+        """Choose the cheapest model whose context fits the input, ignoring stage floors and the target."""
+        if stage not in STAGES:
+            raise ValueError(f"Unknown pipeline stage: {stage}")
+        index = 0
+        while input_tokens > self.tiers[index].max_input_tokens and index < len(self.tiers) - 1:
+            index += 1
+        model = self.tiers[index].name
+        self._record(stage, model, input_tokens, reason)
+        return model
+
+    def escalate(self, stage: str, current_model: str, reason: str, attempt: int = 1) -> Optional[str]:
+        """Return the next stronger model after an invalid output, or None if escalation is exhausted."""
+        index = self._tier_index(current_model)
+        if attempt > self.max_escalations or index + 1 >= len(self.tiers):
+            logger.warning("routing stage=%s model=%s escalation exhausted reason=%s", stage, current_model, reason)
+            return None
+
+        model = self.tiers[index + 1].name
+        self._record(stage, model, 0, f"escalated: {reason}")
+        return model
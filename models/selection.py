@@ -0,0 +1,103 @@
+from typing import Dict, List, Optional
+import re
+import numpy as np
+from .base import ResearchResult
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'in', 'into',
+    'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'their', 'this', 'to', 'was', 'were', 'with'
+}
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords."""
+    return [t for t in re.findall(r'[a-z0-9]+', text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+def source_text(result: ResearchResult, max_chars: int = 2000) -> str:
+    """Text used to compare sources: title plus summary or the start of the content."""
+    body = result.content_summary or (result.content or '')[:max_chars]
+    return f"{result.title}\n{body}"
+
+def tfidf_vectors(texts: List[str]) -> np.ndarray:
+    """
+    Build L2-normalized TF-IDF vectors for a small corpus.
+
+    Returns:
+        Array of shape (len(texts), vocabulary size); rows of empty texts are zero
+    """
+    docs = [tokenize(t) for t in texts]
+    vocab: Dict[str, int] = {}
+    for tokens in docs:
+        for token in tokens:
+            vocab.setdefault(token, len(vocab))
+    if not vocab:
+        return np.zeros((len(texts), 0), dtype=np.float32)
+
+    counts = np.zeros((len(texts), len(vocab)), dtype=np.float32)
+    for i, tokens in enumerate(docs):
+        np.add.at(counts[i], [vocab[t] for t in tokens], 1.0)
+
+    df = (counts > 0).sum(axis=0)
+    idf = np.log((1 + len(texts)) / (1 + df)) + 1.0
+    vectors = np.log1p(counts) * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+def mmr_select(results: List[ResearchResult],
+               k: int,
+               diversity: float = 0.3,
+               vectors: Optional[np.ndarray] = None) -> List[ResearchResult]:
+    """
+    Select k results by maximal marginal relevance, trading relevance_score off
+    against similarity to sources already selected.
+
+    Args:
+        results: Candidate results with relevance scores (0-10)
+        k: Number of results to select
+        diversity: Weight of redundancy versus relevance; 0 is plain top-k by score
+        vectors: Precomputed TF-IDF vectors for the results (default: built from source_text)
+
+    Returns:
+        Selected results in selection order
+    """
+    if k <= 0 or not results:
+        return []
+    if vectors is None:
+        vectors = tfidf_vectors([source_text(r) for r in results])
+
+    relevance = np.clip(np.array([r.relevance_score for r in results], dtype=np.float32) / 10.0, 0.0, 1.0)
+    similarity = vectors @ vectors.T
+
+    selected: List[int] = []
+    max_similarity = np.zeros(len(results), dtype=np.float32)
+    available = np.ones(len(results), dtype=bool)
+    for _ in range(min(k, len(results))):
+        scores = (1 - diversity) * relevance - diversity * max_similarity
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, similarity[best])
+
+    return [results[i] for i in selected]
+
+def coverage(selected: List[ResearchResult],
+             pool: List[ResearchResult],
+             threshold: float = 0.2) -> float:
+    """
+    Fraction of the pool whose content is represented by the selection, i.e. has
+    cosine similarity of at least threshold to some selected source.
+    """
+    if not pool or not selected:
+        return 0.0
+    vectors = tfidf_vectors([source_text(r) for r in selected + pool])
+    similarity = vectors[len(selected):] @ vectors[:len(selected)].T
+    return float((similarity.max(axis=1) >= threshold).mean())
+
+def redundancy(selected: List[ResearchResult]) -> float:
+    """Mean pairwise cosine similarity within a selection (0 = all distinct)."""
+    if len(selected) < 2:
+        return 0.0
+    vectors = tfidf_vectors([source_text(r) for r in selected])
+    similarity = vectors @ vectors.T
+    upper = np.triu_indices(len(selected), k=1)
+    return float(similarity[upper].mean())
@@ -0,0 +1,234 @@
+import atexit
+import copy
+import importlib.util
+import json
+import os
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Optional, Union
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from openai import OpenAI
+from exa_py import Exa
+from exa_py.api import ExaJSONEncoder
+from .cassette import Cassette, CassetteAdapter, CassetteTransport
+
+@dataclass
+class PoolConfig:
+    """Connection pool sizing shared by every client built from a registry."""
+    max_connections: int = 100    # Open connections per pool (per host for requests)
+    max_keepalive: int = 20       # Idle connections kept alive for reuse
+    keepalive_expiry: float = 30.0  # Seconds an idle connection is kept
+    http2: bool = True            # Used only when the h2 package is installed
+    timeout: float = 600.0        # Default request timeout in seconds
+
+@dataclass
+class PoolStats:
+    """Connection counts for one pool at a point in time (None where the library's internals are unknown)."""
+    open: Optional[int]
+    idle: Optional[int]
+    waiting: Optional[int]
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter that counts requests in flight, since urllib3 doesn't track waiters."""
+
+    def __init__(self, *args, **kwargs):
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def send(self, *args, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+        try:
+            return super().send(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+class _CountingCassetteAdapter(_CountingAdapter, CassetteAdapter):
+    """Counting adapter that records to or replays from a cassette."""
+
+class PooledExa(Exa):
+    """
+    Exa client that sends requests through a shared requests.Session instead of
+    module-level requests calls, so connections are kept alive and reused.
+    """
+
+    def __init__(self, session: requests.Session, api_key: Optional[str] = None, timeout: Optional[float] = None, **kwargs):
+        super().__init__(api_key=api_key, **kwargs)
+        self.session = session
+        self.timeout = timeout
+
+    def with_timeout(self, timeout: Optional[float]) -> "PooledExa":
+        """A client on the same session whose requests give up after at most timeout seconds (None: unchanged)."""
+        if timeout is None:
+            return self
+        client = copy.copy(self)
+        client.timeout = timeout if self.timeout is None else min(self.timeout, timeout)
+        return client
+
+    def request(self,
+                endpoint: str,
+                data: Optional[Union[Dict[str, Any], str]] = None,
+                method: str = "POST",
+                params: Optional[Dict[str, Any]] = None,
+                headers: Optional[Dict[str, str]] = None) -> Union[Dict[str, Any], requests.Response]:
+        request_headers = {**self.headers, **(headers or {})}
+        streaming = (
+            (isinstance(data, dict) and data.get("stream"))
+            or (params and params.get("stream") == "true")
+            or request_headers.get("Accept") == "text/event-stream"
+        )
+        if streaming:
+            # Streams hold their connection open; leave them to the stock client
+            return super().request(endpoint, data=data, method=method, params=params, headers=headers)
+
+        json_data = data if isinstance(data, str) else (json.dumps(data, cls=ExaJSONEncoder) if data else None)
+        res = self.session.request(
+            method.upper(),
+            self.base_url + endpoint,
+            data=json_data if method.upper() in ("POST", "PATCH") else None,
+            params=params,
+            headers=request_headers,
+            timeout=self.timeout
+        )
+        if res.status_code >= 400:
+            raise ValueError(f"Request failed with status code {res.status_code}: {res.text}")
+        return res.json()
+
+class TransportRegistry:
+    """
+    Process-wide HTTP connection pools: one httpx client for OpenAI and one
+    requests session for Exa, created on first use and shared by every client.
+    With a cassette, both pools record to or replay from it.
+    """
+
+    def __init__(self, config: Optional[PoolConfig] = None, cassette: Optional[Cassette] = None):
+        self.config = config or PoolConfig()
+        self.cassette = cassette
+        self._lock = threading.Lock()
+        self._http_client: Optional[httpx.Client] = None
+        self._session: Optional[requests.Session] = None
+        self._adapter: Optional[_CountingAdapter] = None
+
+    @property
+    def http2(self) -> bool:
+        """Whether HTTP/2 is used: requested and the h2 package is available."""
+        return self.config.http2 and importlib.util.find_spec("h2") is not None
+
+    def http_client(self) -> httpx.Client:
+        """The shared httpx client."""
+        with self._lock:
+            if self._http_client is None:
+                transport = httpx.HTTPTransport(
+                    http2=self.http2,
+                    limits=httpx.Limits(
+                        max_connections=self.config.max_connections,
+                        max_keepalive_connections=self.config.max_keepalive,
+                        keepalive_expiry=self.config.keepalive_expiry
+                    )
+                )
+                self._http_client = httpx.Client(
+                    transport=CassetteTransport(self.cassette, transport) if self.cassette is not None else transport,
+                    timeout=self.config.timeout,
+                    follow_redirects=True
+                )
+            return self._http_client
+
+    def session(self) -> requests.Session:
+        """The shared requests session; requests beyond max_connections per host wait for a free connection."""
+        with self._lock:
+            if self._session is None:
+                pool_args = dict(
+                    pool_connections=10,  # Hosts with a cached pool; idle connections per host are kept up to pool_maxsize
+                    pool_maxsize=self.config.max_connections,
+                    pool_block=True
+                )
+                if self.cassette is not None:
+                    self._adapter = _CountingCassetteAdapter(cassette=self.cassette, **pool_args)
+                else:
+                    self._adapter = _CountingAdapter(**pool_args)
+                self._session = requests.Session()
+                self._session.mount("https://", self._adapter)
+                self._session.mount("http://", self._adapter)
+            return self._session
+
+    def openai_client(self, **kwargs) -> OpenAI:
+        """An OpenAI client on the shared pool."""
+        return OpenAI(http_client=self.http_client(), **kwargs)
+
+    def exa_client(self, api_key: Optional[str] = None, **kwargs) -> PooledExa:
+        """An Exa client on the shared pool."""
+        return PooledExa(self.session(), api_key=api_key, timeout=self.config.timeout, **kwargs)
+
+    def _httpx_stats(self) -> PoolStats:
+        # Reads httpcore internals; other versions may lay the pool out differently
+        try:
+            transport = self._http_client._transport
+            pool = (transport.inner if isinstance(transport, CassetteTransport) else transport)._pool
+            connections = pool.connections
+            return PoolStats(
+                open=sum(1 for c in connections if not c.is_closed()),
+                idle=sum(1 for c in connections if c.is_idle()),
+                waiting=sum(1 for r in pool._requests if r.connection is None)
+            )
+        except (AttributeError, TypeError):
+            return PoolStats(open=None, idle=None, waiting=None)
+
+    def _requests_stats(self) -> PoolStats:
+        waiting = max(self._adapter.in_flight - self.config.max_connections, 0)
+        # Reads urllib3 internals; other versions may lay the pools out differently
+        try:
+            idle = sum(
+                sum(1 for conn in list(pool.pool.queue) if conn is not None)
+                for pool in list(self._adapter.poolmanager.pools._container.values())
+            )
+        except (AttributeError, TypeError):
+            return PoolStats(open=None, idle=None, waiting=waiting)
+        in_use = min(self._adapter.in_flight, self.config.max_connections)
+        return PoolStats(open=idle + in_use, idle=idle, waiting=waiting)
+
+    def stats(self) -> Dict[str, PoolStats]:
+        """Open, idle and waiting connections for each pool created so far."""
+        stats = {}
+        if self._http_client is not None:
+            stats["httpx"] = self._httpx_stats()
+        if self._adapter is not None:
+            stats["requests"] = self._requests_stats()
+        return stats
+
+    def close(self):
+        """Close every pool. Clients built from this registry must not be used afterwards."""
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+            if self._session is not None:
+                self._session.close()
+                self._session = self._adapter = None
+
+@lru_cache(maxsize=None)
+def default_transport() -> TransportRegistry:
+    """
+    Process-wide registry configured from the environment: HTTP_POOL_MAX_CONNECTIONS,
+    HTTP_POOL_MAX_KEEPALIVE and HTTP_POOL_HTTP2 (0 disables HTTP/2), and for offline
+    runs HTTP_CASSETTE (file), HTTP_CASSETTE_MODE and HTTP_CASSETTE_LATENCY.
+    """
+    defaults = PoolConfig()
+    cassette = None
+    if os.getenv("HTTP_CASSETTE"):
+        cassette = Cassette(
+            os.getenv("HTTP_CASSETTE"),
+            mode=os.getenv("HTTP_CASSETTE_MODE", "replay"),
+            latency=os.getenv("HTTP_CASSETTE_LATENCY", "none")
+        )
+    registry = TransportRegistry(PoolConfig(
+        max_connections=int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", defaults.max_connections)),
+        max_keepalive=int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", defaults.max_keepalive)),
+        http2=os.getenv("HTTP_POOL_HTTP2", "1") != "0"
+    ), cassette=cassette)
+    atexit.register(registry.close)
+    return registry
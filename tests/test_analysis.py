@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from models.base import ResearchReport, ResearchResult, SourceAnalysis
+from tools.analysis import export_reports, ResearchArchive
+
+def make_report(i: int, num_sources: int = 3) -> ResearchReport:
+    """Build a report whose sources have distinct scores and dates."""
+    analyses = [SourceAnalysis(
+        source=ResearchResult(
+            title=f"Source {i}-{j}",
+            url=f"https://site{j}.example.com/{i}",
+            published_date=f"2024-0{j + 1}-15" if j else "Unknown",
+            relevance_score=float(j + i),
+            content="x" * (100 * j)
+        ),
+        key_points=[f"Point {j}", "Ünïcödé point"],
+        methodology="Survey" if j % 2 else None,
+        significance=f"Significance {j}"
+    ) for j in range(num_sources)]
+    return ResearchReport(
+        title=f"Report {i}", summary=f"Summary {i}", key_findings=[f"Finding {i}"],
+        detailed_analysis="", critical_evaluation="", future_implications="",
+        methodology_analysis="", limitations_and_gaps="",
+        timeline=[{"event": "Research Completed", "date": f"2024-05-0{i + 1}"}],
+        metadata={"query": f"Query {i}", "num_sources": str(num_sources)},
+        source_analyses=analyses
+    )
+
+@pytest.fixture(params=["numpy", "arrow"])
+def archive_format(request):
+    """Run each test against both storage formats."""
+    if request.param == "arrow":
+        pytest.importorskip("pyarrow")
+    return request.param
+
+def test_export_and_query(tmp_path, archive_format):
+    """Test round-tripping scores, dates and text through the archive."""
+    export_reports([make_report(0), make_report(1)], str(tmp_path), format=archive_format)
+    export_reports([make_report(2)], str(tmp_path), format=archive_format)
+    archive = ResearchArchive(str(tmp_path))
+
+    assert len(archive) == 3, "Should have one row per report across parts"
+    scores = archive.column("sources", "relevance_score")
+    assert isinstance(scores, np.ndarray) and scores.dtype == np.float32
+    assert scores.tolist() == [0, 1, 2, 1, 2, 3, 2, 3, 4]
+
+    dates = archive.column("sources", "published_date")
+    assert np.isnat(dates[0]), "Unknown dates should be NaT"
+    assert dates[1] == np.datetime64("2024-02-15")
+
+    titles = archive.column("sources", "title")
+    assert len(titles) == 9 and titles[4] == "Source 1-1" and titles[-1] == "Source 2-2"
+    assert archive.column("sources", "key_points")[0] == "Point 0\nÜnïcödé point", "Text should round-trip UTF-8"
+    assert archive.column("sources", "content")[2] == "", "Content is excluded by default"
+    assert archive.column("sources", "content_chars").tolist()[:3] == [0, 100, 200]
+    assert archive.column("sources", "has_methodology").tolist()[:3] == [False, True, False]
+
+    # Bulk query: mean score per run without touching text columns
+    run_ids = np.asarray(list(archive.column("sources", "run_id")))
+    assert len(set(run_ids)) == 3
+    assert scores[run_ids == run_ids[-1]].mean() == pytest.approx(3.0)
+
+def test_numpy_columns_are_memory_mapped(tmp_path):
+    """Test the fallback format reads numeric columns as memory maps."""
+    export_reports([make_report(0)], str(tmp_path), format="numpy")
+    scores = ResearchArchive(str(tmp_path)).column("sources", "relevance_score")
+    assert isinstance(scores, np.memmap), "Single-part numeric columns should be memory-mapped"
+
+def test_invalid_requests(tmp_path):
+    """Test unknown formats, tables and columns are rejected."""
+    with pytest.raises(ValueError):
+        export_reports([make_report(0)], str(tmp_path), format="csv")
+    export_reports([make_report(0)], str(tmp_path), format="numpy")
+    archive = ResearchArchive(str(tmp_path))
+    with pytest.raises(ValueError):
+        archive.column("sources", "missing")
+    with pytest.raises(ValueError):
+        archive.parts("queries")
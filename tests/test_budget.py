@@ -0,0 +1,116 @@
+import pytest
+from types import SimpleNamespace
+from models.budget import BudgetController, BudgetExceeded, Limits
+from models.openai_model import OpenAIModel, SourceAnalysisSchema
+from models.base import ResearchResult
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class FakeCompletions:
+    """Records requested models and returns a fixed parsed analysis with usage."""
+
+    def __init__(self):
+        self.models = []
+
+    def parse(self, model, messages, response_format, **kwargs):
+        self.models.append(model)
+        parsed = SourceAnalysisSchema(key_points=["point"], methodology="m", limitations="l", significance="s")
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(parsed=parsed))],
+            usage=SimpleNamespace(prompt_tokens=1000, completion_tokens=100)
+        )
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def model(monkeypatch):
+    """OpenAI model with a fake client and a word-count token estimate, so no API calls are made."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    def build(budget):
+        model = OpenAIModel(budget=budget)
+        model.client = SimpleNamespace(beta=SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions())))
+        model.count_tokens = lambda text: len(text.split())
+        return model
+    return build
+
+def test_pressure_tracks_run_and_stage_caps(clock):
+    """Test pressure is the largest share used of any applicable cap."""
+    budget = BudgetController(
+        run=Limits(deadline=100, max_cost=1.0),
+        stages={"analysis": Limits(max_tokens=1000)},
+        clock=clock
+    )
+    clock.now = 50
+    assert budget.pressure() == pytest.approx(0.5), "Half the run deadline has passed"
+
+    budget.charge_model("analysis", "gpt-4o-mini", input_tokens=800, output_tokens=100)
+    assert budget.pressure("analysis") == pytest.approx(0.9), "Stage token cap should dominate"
+    assert budget.should_degrade("analysis") and not budget.should_degrade("summary")
+
+    clock.now = 100
+    with pytest.raises(BudgetExceeded):
+        budget.check("summary")
+
+def test_costs_and_metadata(clock):
+    """Test model and Exa charges are priced and reported as metadata strings."""
+    budget = BudgetController(clock=clock)
+    budget.charge_model("synthesis", "gpt-4o", input_tokens=1_000_000, output_tokens=100_000)
+    budget.charge_exa("search", count=2)
+    budget.degrade("skipped summarization")
+    budget.degrade("skipped summarization")
+
+    metadata = budget.metadata()
+    assert metadata["budget_cost_usd"] == "3.5100"
+    assert metadata["budget_tokens"] == "1100000"
+    assert metadata["budget_degraded"] == "skipped summarization", "Degradations should be recorded once"
+
+def test_unknown_stage_rejected():
+    with pytest.raises(ValueError):
+        BudgetController(stages={"planning": Limits(max_tokens=10)})
+
+def test_source_limit_halves_under_pressure(clock):
+    """Test fewer sources are processed once the run is near its deadline."""
+    budget = BudgetController(run=Limits(deadline=10), clock=clock)
+    assert budget.source_limit(5) == 5
+    clock.now = 9
+    assert budget.source_limit(5) == 2
+    assert budget.degradations == ["fewer sources (2 of 5)"]
+
+def test_model_degrades_and_enforces_budget(model, clock):
+    """Test the model charges calls, switches to the cheapest tier near a cap and stops at the cap."""
+    budget = BudgetController(stages={"analysis": Limits(max_tokens=2500)}, degrade_at=0.4, clock=clock)
+    openai_model = model(budget)
+    openai_model.routing.target = "quality"
+    source = ResearchResult(title="Test", url="https://example.com", published_date="2024-01-01", content="text")
+
+    openai_model.analyze_source(source)
+    openai_model.analyze_source(source)
+    models = openai_model.client.beta.chat.completions.models
+    assert models == ["gpt-4o", "gpt-4o-mini"], "Second call should fall back to the cheapest tier"
+    assert budget.stage_usage["analysis"].tokens == 2200
+    assert "cheaper model for analysis" in budget.degradations
+    assert openai_model.routing.decisions[-1].reason == "budget pressure", "The fallback should be in the routing log"
+
+    openai_model.analyze_source(source)
+    with pytest.raises(BudgetExceeded):
+        openai_model.analyze_source(source)
+
+def test_summary_skipped_under_pressure(model, clock):
+    """Test long content is truncated instead of summarized when the summary stage is near its cap."""
+    budget = BudgetController(stages={"summary": Limits(deadline=10)}, clock=clock)
+    budget.charge_model("summary", "gpt-4o-mini", 0, 0, seconds=9)
+    openai_model = model(budget)
+    source = ResearchResult(title="Test", url="https://example.com", published_date="2024-01-01",
+                            content="word " * 5000)
+
+    openai_model.summarize_source(source, max_length=100)
+    assert source.content_summary, "Truncated content should stand in for the summary"
+    assert openai_model.client.beta.chat.completions.models == [], "No summary call should be made"
+    assert budget.degradations == ["skipped summarization"]
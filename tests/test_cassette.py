@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from models.cassette import Cassette, CassetteMiss, request_key
+from models.transport import PoolConfig, TransportRegistry
+
+class CountingHandler(BaseHTTPRequestHandler):
+    """Answers each POST with a running count, so repeated requests get different responses."""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests += 1
+        payload = json.dumps({"received": json.loads(body), "count": self.server.requests}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CountingHandler)
+    server.requests = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def registry_for(cassette: Cassette) -> TransportRegistry:
+    return TransportRegistry(PoolConfig(http2=False), cassette=cassette)
+
+def test_record_then_replay_offline(server, tmp_path):
+    """Test recorded Exa and httpx traffic replays identically without the server."""
+    path = tmp_path / "run.jsonl"
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    recording = registry_for(Cassette(str(path), mode="record"))
+    exa = recording.exa_client(api_key="secret-key", base_url=base_url)
+    recorded = [exa.request("/search", {"query": "q"}), exa.request("/search", {"query": "q"})]
+    http_recorded = recording.http_client().post(f"{base_url}/chat", json={"a": 1, "b": 2}).json()
+    recording.close()
+    assert server.requests == 3
+    assert "secret-key" not in path.read_text(), "API keys must never be written to cassettes"
+
+    server.shutdown()
+    replaying = registry_for(Cassette(str(path), mode="replay"))
+    exa = replaying.exa_client(api_key="other-key", base_url=base_url)
+    assert [exa.request("/search", {"query": "q"}), exa.request("/search", {"query": "q"})] == recorded, \
+        "Repeated requests should replay in recorded order"
+    # Key order in JSON bodies doesn't affect matching
+    assert replaying.http_client().post(f"{base_url}/chat", json={"b": 2, "a": 1}).json() == http_recorded
+    assert replaying.cassette.hits == 3
+
+    with pytest.raises(CassetteMiss):
+        exa.request("/search", {"query": "never recorded"})
+
+def test_replay_reproduces_latency(tmp_path, monkeypatch):
+    """Test recorded and sampled latencies are replayed, scaled by speed."""
+    path = str(tmp_path / "latency.jsonl")
+    cassette = Cassette(path, mode="record")
+    for i, elapsed in enumerate([0.02, 0.04, 0.2]):
+        cassette.record("POST", "https://api.example.com/search", f'{{"q": {i}}}'.encode(), 200, {}, b"{}", elapsed)
+
+    recorded = Cassette(path, latency="recorded", speed=2.0)
+    started = time.perf_counter()
+    recorded.lookup("POST", "https://api.example.com/search", b'{"q": 2}')
+    assert 0.09 <= time.perf_counter() - started < 0.2, "0.2s recorded at double speed"
+
+    sleeps = []
+    monkeypatch.setattr(time, "sleep", sleeps.append)
+    for _ in range(2):
+        sampled = Cassette(path, latency="sampled", speed=4.0, seed=7)
+        for i in range(5):
+            sampled.lookup("POST", "https://api.example.com/search", f'{{"q": {i % 3}}}'.encode())
+    assert len(sleeps) == 10 and sleeps[:5] == sleeps[5:], "Sampled latencies should be deterministic for a seed"
+    assert all(any(delay == pytest.approx(elapsed / 4.0) for elapsed in (0.02, 0.04, 0.2)) for delay in sleeps), \
+        "Delays should be the endpoint's recorded latencies divided by speed"
+
+def test_auto_mode_only_records_misses(tmp_path):
+    """Test auto mode replays known requests and reports misses for recording."""
+    path = str(tmp_path / "auto.jsonl")
+    Cassette(path, mode="record").record("GET", "https://x/a", None, 200, {}, b"a", 0.0)
+    cassette = Cassette(path, mode="auto")
+    assert cassette.lookup("GET", "https://x/a", None).status == 200
+    assert cassette.lookup("GET", "https://x/b", None) is None
+    assert request_key("GET", "https://x/a", None) != request_key("GET", "https://x/b", None)
@@ -0,0 +1,75 @@
+import time
+from models.base import ResearchReport, ResearchResult, SourceAnalysis
+from models.citations import split_passages, PassageIndex, attach_citations
+from tools.report_visualizer import report_to_dict
+
+def make_analysis(i: int, content: str = None, key_points=None) -> SourceAnalysis:
+    source = ResearchResult(title=f"Source {i}", url=f"https://example.com/{i}",
+                            published_date="2024-01-01", content=content)
+    return SourceAnalysis(source=source, key_points=key_points or [], significance="")
+
+def make_report(findings, analyses) -> ResearchReport:
+    return ResearchReport(
+        title="Test", summary="", key_findings=findings, detailed_analysis="", critical_evaluation="",
+        future_implications="", methodology_analysis="", limitations_and_gaps="",
+        timeline=[], metadata={}, source_analyses=analyses
+    )
+
+def test_split_passages():
+    """Test sentences are split and short ones merged."""
+    passages = split_passages("Short. Also short. This sentence is long enough to stand on its own as a passage.\n\nNew paragraph")
+    assert passages == [
+        "Short. Also short. This sentence is long enough to stand on its own as a passage.",
+        "New paragraph"
+    ]
+
+def test_search_limits_passages_per_source():
+    """Test BM25 ranks matching passages and takes at most one per source by default."""
+    index = PassageIndex()
+    index.add(0, "Breathing exercises in yoga calm the nervous system.")
+    index.add(0, "Yoga breathing exercises are called pranayama.")
+    index.add(1, "Christian contemplative prayer uses the breath as an anchor.")
+    index.add(2, "Unrelated passage about gardening.")
+
+    results = index.search("yoga breathing exercises", top_k=3)
+    assert [index.passage_sources[p] for p, _ in results] == [0], "Only one passage per source"
+    assert len(index.search("yoga breathing exercises", top_k=3, max_per_source=2)) == 2
+    assert index.search("astronomy") == [], "No shared terms means no results"
+
+def test_attach_citations():
+    """Test findings are linked to the sources that support them."""
+    analyses = [
+        make_analysis(0, content="The Gospel of Thomas contains sayings about inner light. "
+                                 "Scholars date it to the second century."),
+        make_analysis(1, key_points=["Kundalini yoga describes energy rising through the spine."]),
+    ]
+    report = attach_citations(make_report(
+        ["The Gospel of Thomas speaks of an inner light", "Kundalini energy rises through the spine", "Nothing matches"],
+        analyses
+    ))
+
+    first, second, third = report.finding_citations
+    assert first["supporting_sources"][0]["url"] == "https://example.com/0"
+    assert "inner light" in first["supporting_sources"][0]["quote"]
+    assert second["supporting_sources"][0]["url"] == "https://example.com/1", "Key points are indexed without content"
+    assert third["supporting_sources"] == []
+
+    data = report_to_dict(report)
+    assert data["key_findings"][0]["supporting_sources"] == first["supporting_sources"], \
+        "Templates should receive the citations"
+
+def test_attach_citations_scales():
+    """Test citation linking stays fast for hundreds of long sources."""
+    words = ["meditation", "prayer", "breath", "gospel", "yoga", "tantra", "mystic", "silence", "light", "energy"]
+    analyses = [
+        make_analysis(i, content=" ".join(
+            f"Sentence {j} of source {i} discusses {words[(i + j) % 10]} and {words[(i * j) % 10]} practice."
+            for j in range(200)))
+        for i in range(300)
+    ]
+    findings = [f"{words[i]} and {words[(i + 3) % 10]} practice" for i in range(10)]
+
+    start = time.perf_counter()
+    report = attach_citations(make_report(findings, analyses))
+    assert time.perf_counter() - start < 10, "Linking 300 sources should take seconds at most"
+    assert all(len(c["supporting_sources"]) == 3 for c in report.finding_citations)
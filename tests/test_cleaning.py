@@ -0,0 +1,68 @@
+from models.base import ResearchResult
+from models.cleaning import find_boilerplate, clean_content, clean_sources
+
+NAV = "Home | About | Contact\nWe use cookies to improve your experience. Accept all"
+FOOTER = "© 2024 Example Media. All rights reserved."
+
+def make_page(body: str) -> str:
+    return f"{NAV}\n\n{body}\n\n{FOOTER}"
+
+def count_words(text: str) -> int:
+    """Stand-in token counter so tests don't need tokenizer downloads."""
+    return len(text.split())
+
+def test_find_boilerplate():
+    """Test lines shared across documents are detected but unique lines are not."""
+    pages = [make_page(f"Article body number {i}.") for i in range(4)]
+    boilerplate = find_boilerplate(pages)
+    assert "home | about | contact" in boilerplate
+    assert FOOTER.lower() in boilerplate
+    assert "article body number 1." not in boilerplate
+    assert find_boilerplate(pages[:1]) == set(), "A single document has no cross-document boilerplate"
+
+def test_clean_content():
+    """Test boilerplate, repeated lines and blocks, and reference sections are removed."""
+    body = "\n".join([
+        "Share this article",
+        "Yoga and contemplative prayer share breath-focused techniques.",
+        "Share this article",
+        "",
+        "A repeated syndicated paragraph.",
+        "",
+        "Share this article",
+        "Both traditions describe an inner light.",
+        "",
+        "A repeated syndicated paragraph.",
+        "",
+        "References",
+        "1. Smith, J. (2020). Some book.",
+    ])
+    cleaned = clean_content(make_page(body), boilerplate={"home | about | contact", FOOTER.lower()})
+
+    assert "Home | About" not in cleaned and FOOTER not in cleaned, "Boilerplate lines should be removed"
+    assert cleaned.count("Share this article") == 2, "Short lines repeated more than twice should be capped"
+    assert cleaned.count("A repeated syndicated paragraph.") == 1, "Repeated blocks should be deduplicated"
+    assert "Smith, J." not in cleaned, "Reference section should be cut"
+    assert "inner light" in cleaned and "breath-focused" in cleaned, "Content should be kept"
+
+    assert "Smith, J." in clean_content(body, cut_references=False), "Reference cutoff should be optional"
+
+def test_reference_heading_in_first_half_is_kept():
+    """Test a 'Notes' heading near the top isn't mistaken for a trailing reference list."""
+    text = "Notes\nThe first paragraph.\nThe second paragraph.\nThe third paragraph.\nThe end."
+    assert clean_content(text).startswith("Notes")
+
+def test_clean_sources_reports_savings():
+    """Test sources are cleaned in place and token savings are reported per source."""
+    results = [
+        ResearchResult(title=f"Article {i}", url=f"https://example.com/{i}", published_date="2024-01-01",
+                       content=make_page(f"Unique body text for article {i}."))
+        for i in range(3)
+    ] + [ResearchResult(title="No content", url="https://example.com/empty", published_date="2024-01-01")]
+
+    stats = clean_sources(results, count_words)
+
+    assert [s.url for s in stats] == [f"https://example.com/{i}" for i in range(3)], \
+        "Sources without content should be skipped"
+    assert all(s.tokens_saved > 0 and s.tokens_after < s.tokens_before for s in stats)
+    assert results[0].content == "Unique body text for article 0."
@@ -0,0 +1,68 @@
+import importlib
+from types import SimpleNamespace
+import pytest
+from models.budget import BudgetController, Limits
+from tools.search_cache import SearchCache
+
+class FakeExa:
+    """Records search_and_contents calls and returns canned results."""
+
+    def __init__(self):
+        self.calls = []
+        self.timeouts = []
+
+    def with_timeout(self, timeout):
+        self.timeouts.append(timeout)
+        return self
+
+    def search_and_contents(self, query, num_results, **options):
+        self.calls.append(options)
+        text = "Full page text. " * 10 if "text" in options else None
+        return SimpleNamespace(results=[
+            SimpleNamespace(title=f"Result {i}", url=f"https://example.com/{i}", published_date="2024-01-01",
+                            text=text[:options["text"]["max_characters"]] if text else None,
+                            highlights=[f"Highlight about {query}"])
+            for i in range(num_results)
+        ])
+
+@pytest.fixture
+def exa_module(monkeypatch):
+    monkeypatch.setenv("EXA_API_KEY", "test-key")
+    module = importlib.import_module("tools.exa")
+    fake = FakeExa()
+    monkeypatch.setattr(module, "exa", fake)
+    return module, fake
+
+def test_text_and_highlights_in_one_request(exa_module):
+    """Test one request returns capped text and highlights, and charges for both."""
+    exa, fake = exa_module
+    budget = BudgetController(run=Limits(deadline=60, max_cost=1.0))
+
+    results = exa.search_with_contents("gnostic gospels", max_results=3, max_characters=50,
+                                       cache=SearchCache(), budget=budget)
+
+    assert len(fake.calls) == 1, "Contents should come back with the search"
+    assert fake.calls[0]["text"] == {"max_characters": 50}
+    assert 0 < fake.timeouts[0] <= 60, "Requests should time out at the run deadline"
+    assert all(len(r.text) <= 50 for r in results), "Text should be capped per result"
+    assert results[0].highlights == ["Highlight about gnostic gospels"]
+    assert budget.metadata()["budget_cost_usd"] == f"{0.005 + 3 * 0.001 + 3 * 0.001:.4f}"
+
+def test_highlights_only_and_cached(exa_module):
+    """Test highlights-only mode skips text, and repeats are served from the cache per mode."""
+    exa, fake = exa_module
+    cache = SearchCache()
+
+    results = exa.search_with_contents("vedanta", max_results=2, contents="highlights", cache=cache)
+    again = exa.search_with_contents("vedanta", max_results=2, contents="highlights", cache=cache)
+    exa.search_with_contents("vedanta", max_results=2, contents="text", cache=cache)
+
+    assert "text" not in fake.calls[0], "Highlights-only mode should not request text"
+    assert all(r.text is None and r.highlights for r in results)
+    assert again == results
+    assert len(fake.calls) == 2, "The text mode should be cached separately from highlights only"
+
+def test_unknown_contents_mode(exa_module):
+    exa, _ = exa_module
+    with pytest.raises(ValueError):
+        exa.search_with_contents("query", contents="summary")
@@ -0,0 +1,42 @@
+import time
+import pytest
+from models.base import ResearchResult
+from tools.fanout import fan_out
+
+def make_search(delays, urls):
+    """A search that sleeps for the query's delay and returns results for its URLs."""
+    def search(query):
+        time.sleep(delays[query])
+        return [ResearchResult(title=url, url=url, published_date="2024") for url in urls[query]]
+    return search
+
+def test_wall_time_is_the_slowest_query():
+    """Test queries run concurrently and results arrive in completion order."""
+    delays = {"slow": 0.3, "medium": 0.2, "fast": 0.1}
+    search = make_search(delays, {q: [f"https://{q}.example"] for q in delays})
+
+    start = time.perf_counter()
+    order = [query for query, _ in fan_out(list(delays), search)]
+    elapsed = time.perf_counter() - start
+
+    assert order == ["fast", "medium", "slow"], "Results should be yielded as each query finishes"
+    assert elapsed < 0.45, f"Batch took {elapsed:.2f}s, expected about the slowest query (0.3s), not the sum (0.6s)"
+
+def test_merges_without_duplicates():
+    """Test URLs already seen or returned by an earlier query are dropped."""
+    search = make_search({"a": 0.0, "b": 0.05}, {"a": ["u1", "u2"], "b": ["u2", "u3", "u4"]})
+    seen = {"u4"}
+
+    merged = dict(fan_out(["a", "b"], search, seen))
+
+    assert [r.url for r in merged["a"]] == ["u1", "u2"]
+    assert [r.url for r in merged["b"]] == ["u3"], "Duplicates across queries and seen URLs should be dropped"
+    assert seen == {"u1", "u2", "u3", "u4"}, "New URLs should be added to seen_urls"
+
+def test_search_errors_propagate():
+    """Test a failing search raises instead of silently returning nothing."""
+    def search(query):
+        raise ValueError("EXA_API_KEY environment variable is not set")
+
+    with pytest.raises(ValueError):
+        list(fan_out(["a"], search))
@@ -0,0 +1,129 @@
+import threading
+import pytest
+from tools.job_queue import DONE, FAILED, LEASED, PENDING, Deferred, QueueWorker, SQLiteQueue
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def queue(clock):
+    return SQLiteQueue(':memory:', clock=clock)
+
+def test_idempotency_key_deduplicates(queue):
+    """Test enqueueing with an existing idempotency key returns the original task."""
+    first = queue.enqueue('analysis', {'url': 'a'}, idempotency_key='run:analysis:a')
+    second = queue.enqueue('analysis', {'url': 'a'}, idempotency_key='run:analysis:a')
+    assert first == second
+    assert len(queue.tasks()) == 1
+
+def test_lease_is_exclusive_until_it_expires(queue, clock):
+    """Test a crashed worker's task is picked up by another worker once its lease runs out."""
+    task_id = queue.enqueue('query', {'query': 'q'})
+    task = queue.lease('worker-1', lease_seconds=30)
+    assert task.id == task_id and task.attempts == 1
+    assert queue.lease('worker-2', lease_seconds=30) is None, "A leased task should not be handed out twice"
+
+    clock.now += 31
+    retried = queue.lease('worker-2', lease_seconds=30)
+    assert retried.id == task_id and retried.attempts == 2, "Expired leases should be re-leased"
+    assert not queue.complete(task_id, 'worker-1', 'late'), "The old worker no longer holds the lease"
+    assert queue.complete(task_id, 'worker-2', {'ok': True})
+    assert queue.get(task_id).status == DONE and queue.get(task_id).result == {'ok': True}
+
+def test_heartbeat_extends_lease(queue, clock):
+    """Test heartbeats keep a long-running task leased."""
+    task_id = queue.enqueue('synthesis', {})
+    queue.lease('worker-1', lease_seconds=30)
+    clock.now += 25
+    assert queue.heartbeat('worker-1', task_id, lease_seconds=30)
+    clock.now += 25
+    assert queue.lease('worker-2') is None, "The renewed lease should still be valid"
+    assert queue.workers()[0]['task_id'] == task_id
+
+def test_failures_retry_then_fail(queue, clock):
+    """Test failed tasks are retried after a delay until max_attempts, then marked failed."""
+    task_id = queue.enqueue('fetch', {}, max_attempts=2)
+    queue.lease('worker-1')
+    queue.fail(task_id, 'worker-1', 'timeout', retry_delay=10)
+    assert queue.get(task_id).status == PENDING
+    assert queue.lease('worker-1') is None, "Retry should wait for the delay"
+
+    clock.now += 10
+    queue.lease('worker-1')
+    queue.fail(task_id, 'worker-1', 'timeout')
+    assert queue.get(task_id).status == FAILED and queue.get(task_id).error == 'timeout'
+
+def test_expired_lease_without_attempts_left_fails(queue, clock):
+    task_id = queue.enqueue('analysis', {}, max_attempts=1)
+    queue.lease('worker-1', lease_seconds=5)
+    clock.now += 6
+    assert queue.lease('worker-2') is None
+    assert queue.get(task_id).status == FAILED
+
+def test_counts_per_group(queue):
+    """Test task states are counted per group without touching other runs."""
+    queue.enqueue('work', {'text': 'x' * 1000}, group='run-1')
+    queue.enqueue('work', {}, group='run-1')
+    queue.enqueue('work', {}, group='run-2')
+    task = queue.lease('worker-1')
+    queue.complete(task.id, 'worker-1')
+
+    assert queue.counts(group='run-1') == {PENDING: 1, LEASED: 0, DONE: 1, FAILED: 0}
+    assert queue.counts(group='run-2') == {PENDING: 1, LEASED: 0, DONE: 0, FAILED: 0}
+    assert queue.counts() == {PENDING: 2, LEASED: 0, DONE: 1, FAILED: 0}
+
+def test_join_defers_until_upstream_done():
+    """Test a deferred join task runs after the tasks it waits for, without using up attempts."""
+    queue = SQLiteQueue(':memory:')
+    order = []
+
+    def work(task, q):
+        order.append(task.payload['n'])
+        return task.payload['n'] * 2
+
+    def join(task, q):
+        counts = q.counts()
+        if counts[PENDING] + counts[LEASED] > 1:
+            raise Deferred(0.01)
+        return sum(t.result for t in q.tasks(kind='work'))
+
+    join_id = queue.enqueue('join', {})
+    for n in range(3):
+        queue.enqueue('work', {'n': n})
+    QueueWorker(queue, {'work': work, 'join': join}, poll_interval=0).run(stop_when_idle=True)
+
+    assert sorted(order) == [0, 1, 2]
+    assert queue.get(join_id).result == 6
+    assert queue.get(join_id).attempts == 1, "Deferrals should not count as attempts"
+
+def test_workers_share_a_queue_file(tmp_path):
+    """Test several workers with their own connections process every task exactly once."""
+    path = str(tmp_path / 'queue.sqlite')
+    producer = SQLiteQueue(path)
+    for n in range(40):
+        producer.enqueue('work', {'n': n})
+
+    seen = []
+    lock = threading.Lock()
+
+    def work(task, q):
+        with lock:
+            seen.append(task.payload['n'])
+
+    workers = [QueueWorker(SQLiteQueue(path), {'work': work}, poll_interval=0.01) for _ in range(4)]
+    threads = [threading.Thread(target=w.run, kwargs={'stop_when_idle': True}) for w in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(seen) == list(range(40)), "Each task should run exactly once"
+    assert producer.counts()[DONE] == 40
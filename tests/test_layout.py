@@ -0,0 +1,43 @@
+import numpy as np
+from tools.layout import force_layout, findings_network
+
+def test_force_layout_is_deterministic_and_in_frame():
+    """Test layouts are reproducible and stay inside the frame."""
+    edges = [(0, i) for i in range(1, 20)] + [(20, i) for i in range(10, 30)]
+    first = force_layout(30, edges, width=1000, height=600)
+    second = force_layout(30, edges, width=1000, height=600)
+
+    assert first.shape == (30, 2), "Should return one position per node"
+    assert np.array_equal(first, second), "Same input should give the same layout"
+    assert (first[:, 0] >= 0).all() and (first[:, 0] <= 1000).all(), "x should be inside the frame"
+    assert (first[:, 1] >= 0).all() and (first[:, 1] <= 600).all(), "y should be inside the frame"
+
+def test_force_layout_separates_nodes():
+    """Test repulsion keeps nodes apart and edges pull neighbours closer than strangers."""
+    edges = [(0, i) for i in range(1, 10)] + [(10, i) for i in range(11, 20)]
+    pos = force_layout(20, edges)
+    dist = np.linalg.norm(pos[:, None] - pos[None], axis=-1)
+    np.fill_diagonal(dist, np.inf)
+
+    assert dist.min() > 5, "No two nodes should overlap"
+    assert dist[0, 1:10].mean() < dist[0, 11:20].mean(), "Linked nodes should sit closer together"
+
+def test_force_layout_small_graphs():
+    """Test empty and single-node graphs."""
+    assert force_layout(0, []).shape == (0, 2)
+    assert np.allclose(force_layout(1, [], width=100, height=50), [[50, 25]]), "Single node should be centered"
+
+def test_findings_network_shares_sources():
+    """Test sources supporting several findings become one node with several links."""
+    shared = {"url": "https://example.com/shared", "title": "Shared", "quote": ""}
+    report = {"key_findings": [
+        {"finding": "A", "supporting_sources": [shared, {"url": "https://example.com/a", "title": "Only A", "quote": ""}]},
+        {"finding": "B", "supporting_sources": [shared]},
+        "A plain string finding"
+    ]}
+    network = findings_network(report)
+
+    assert [n["type"] for n in network["nodes"]].count("finding") == 3, "Each finding should be a node"
+    assert [n["type"] for n in network["nodes"]].count("source") == 2, "Shared source should be one node"
+    assert len(network["links"]) == 3, "Each finding-source pair should be a link"
+    assert all("x" in n and "y" in n for n in network["nodes"]), "Every node should have a position"
@@ -0,0 +1,50 @@
+import os
+import pytest
+from models.offload import ProcessOffload
+from models.base import ResearchResult
+from models.cleaning import clean_sources
+
+def word_count(text: str) -> int:
+    return len(text.split())
+
+def worker_pid(text: str) -> int:
+    return os.getpid()
+
+def reverse(text: str) -> str:
+    return text[::-1]
+
+@pytest.fixture
+def offload():
+    offload = ProcessOffload(max_workers=2, min_chars=1000, shared_memory_chars=500)
+    yield offload
+    offload.close()
+
+def test_small_batches_run_inline(offload):
+    """Test batches below the threshold never start worker processes."""
+    assert offload.map(worker_pid, ["short", "texts"]) == [os.getpid()] * 2
+    assert offload._executor is None
+
+def test_large_batches_use_workers_and_keep_order(offload):
+    """Test large batches run in worker processes with results in input order."""
+    texts = [f"text {i} " * 50 for i in range(40)]
+    assert os.getpid() not in offload.map(worker_pid, texts), "Work should run in worker processes"
+    assert offload.map(word_count, texts) == [word_count(t) for t in texts]
+
+def test_shared_memory_handoff_preserves_unicode(offload):
+    """Test texts passed through shared memory decode exactly, including multi-byte characters."""
+    texts = ["naïve café — 東京 " * 40, "", "plain ascii " * 100, "emoji 🎉 " * 60]
+    assert offload.map(reverse, texts) == [t[::-1] for t in texts]
+
+def test_clean_sources_offloaded_matches_inline(offload):
+    """Test cleaning in worker processes gives the same content and savings as inline."""
+    def batch():
+        return [
+            ResearchResult(title=f"Doc {i}", url=f"https://example.com/{i}", published_date="2024-01-01",
+                           content=f"Menu\nSubscribe\n\nBody {i} " * 20 + "\n\nReferences\n[1] cite")
+            for i in range(6)
+        ]
+    inline, offloaded = batch(), batch()
+    inline_stats = clean_sources(inline, word_count)
+    offloaded_stats = clean_sources(offloaded, word_count, offload=offload)
+    assert [r.content for r in offloaded] == [r.content for r in inline]
+    assert offloaded_stats == inline_stats
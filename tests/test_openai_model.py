@@ -1,13 +1,24 @@
 import os
+import sys
 import pytest
 from dotenv import load_dotenv
-from models.openai_model import OpenAIModel
+from models.openai_model import OpenAIModel, count_tokens
+from models.offload import default_offload
 from models.base import ResearchResult, SourceAnalysis
+from models.selection import mmr_select, coverage, redundancy
+from models.cleaning import clean_sources
+from models.prompt_encoding import domain, encode_records, resolve_ids, short_ids
+from tools.search_cache import SearchCache
+from tools.prefetch import ContentPrefetcher
+from tools.fanout import fan_out
+from models.budget import BudgetController, Limits
+from models.transport import default_transport
+from models.profiling import enable_profiling, disable_profiling, profile_stage
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from exa_py import Exa
-from typing import List, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
 from pydantic import BaseModel
-import json
 
 class ResearchQueries(BaseModel):
     queries: List[str]
@@ -58,43 +69,51 @@ def generate_research_queries(model: OpenAIModel, previous_results: List[Researc
             - Specific practices or concepts that appear in both traditions"""
         }]
     
-    response = model.client.beta.chat.completions.parse(
-        model=model.eval_model,
-        messages=messages,
-        response_format=ResearchQueries,
-        max_tokens=200
-    )
-    
-    return response.choices[0].message.parsed.queries
+    # Routed, escalated and charged to the budget like every other model call
+    return model._parse("evaluation", messages, ResearchQueries).queries
 
-def fetch_research_results(query: str, existing_urls: Set[str]) -> List[ResearchResult]:
-    """Fetch research results for a query, excluding already seen URLs."""
-    exa_api_key = os.getenv("EXA_API_KEY")
-    if not exa_api_key:
-        raise ValueError("EXA_API_KEY environment variable is not set")
-        
-    client = Exa(api_key=exa_api_key)
-    search_response = client.search(query, num_results=5)
+def fetch_research_results(query: str,
+                           existing_urls: Set[str],
+                           cache: Optional[SearchCache] = None,
+                           budget: Optional[BudgetController] = None,
+                           contents: str = "text",
+                           max_characters: int = 4000) -> List[ResearchResult]:
+    """
+    Fetch research results for a query, excluding already seen URLs. Repeated queries are served from the cache.
+
+    Page text (capped at max_characters) and highlights come back with the search itself, so
+    sources don't need a second contents request. With contents="highlights" only the
+    highlights are requested and they stand in for the content.
+    """
+    from tools.exa import search_with_contents  # Needs EXA_API_KEY
     
     research_results = []
-    for result in search_response.results:
+    for result in search_with_contents(query, max_results=5, contents=contents, max_characters=max_characters,
+                                       cache=cache, budget=budget):
         if result.url in existing_urls:
             continue
-            
-        try:
-            # Get the content directly from the search result
-            research_results.append(ResearchResult(
-                title=result.title,
-                url=result.url,
-                published_date=result.published_date or "Unknown",
-                content=result.text if hasattr(result, 'text') else None
-            ))
-        except Exception as e:
-            print(f"Error processing result {result.title}: {e}")
-            continue
+        research_results.append(ResearchResult(
+            title=result.title,
+            url=result.url,
+            published_date=result.published_date or "Unknown",
+            content=result.text if contents == "text" else "\n\n".join(result.highlights or []) or None,
+            highlights=result.highlights or None
+        ))
     
     return research_results
 
+def fetch_page_text(url: str, budget: Optional[BudgetController] = None) -> Optional[str]:
+    """Fetch the full text of one page through Exa."""
+    client = default_transport().exa_client(api_key=os.getenv("EXA_API_KEY"))
+    if budget is not None:
+        budget.check("search")
+        client = client.with_timeout(budget.remaining_seconds())
+        started = budget.clock()
+    response = client.get_contents([url], text=True)
+    if budget is not None:
+        budget.charge_exa("contents", seconds=budget.clock() - started)
+    return response.results[0].text if response.results else None
+
 def evaluate_source_quality(model: OpenAIModel, results: List[ResearchResult]) -> Tuple[List[ResearchResult], bool]:
     """Evaluate if we have enough high-quality sources or need more."""
     
@@ -125,88 +144,250 @@ def evaluate_source_quality(model: OpenAIModel, results: List[ResearchResult]) -
         "content": f"Evaluate these sources:\n{sources_text}"
     }]
     
-    response = model.client.chat.completions.create(
-        model=model.eval_model,
-        messages=messages,
-        response_format={"type": "json_object"},
-        max_tokens=1000
-    )
+    evaluation = model._create_json("evaluation", messages, required_keys=["sufficient", "explanation", "scores"])
     
     try:
-        evaluation = json.loads(response.choices[0].message.content)
         
         # Update source scores
-        for result in results:
-            for score_info in evaluation["scores"]:
-                if score_info["url"] == result.url:
-                    result.relevance_score = score_info["score"]
-                    break
+        url_index = {r.url: r for r in results}
+        for score_info in evaluation["scores"]:
+            result = url_index.get(score_info["url"])
+            if result is not None:
+                result.relevance_score = score_info["score"]
         
         # Sort by score
         ranked_results = sorted(results, key=lambda x: x.relevance_score, reverse=True)
         
         print(f"\nSource Evaluation: {evaluation['explanation']}")
         return ranked_results, evaluation["sufficient"]
-    except (KeyError, json.JSONDecodeError) as e:
+    except (KeyError, TypeError) as e:
         print(f"Error parsing response: {e}")
         return results, False
 
-def main():
-    """Run a test of the OpenAI research pipeline with iterative searching."""
+class IncrementalQualityEvaluator:
+    """
+    Evaluates source quality across search iterations, scoring each URL once.
+    Sufficiency is judged from the new sources plus a compact summary of what is
+    already covered, so later iterations cost about the same as the first.
+    """
+
+    def __init__(self, model: OpenAIModel, preview_chars: int = 500, top_titles: int = 10, max_sources: int = 5):
+        self.model = model
+        self.preview_chars = preview_chars
+        self.top_titles = top_titles
+        self.max_sources = max_sources
+        self.scores: Dict[str, float] = {}
+        self.sufficient = False
+        self.explanation = ""
+
+    def preview(self, result: ResearchResult) -> str:
+        """Highlights when the search returned them, otherwise the start of the content."""
+        if result.highlights:
+            return " ... ".join(result.highlights)[:self.preview_chars]
+        return result.content[:self.preview_chars] if result.content else 'No content'
+
+    def coverage_summary(self, results: List[ResearchResult]) -> str:
+        """Summarize already-scored sources in a few lines instead of listing them all."""
+        scored = sorted((r for r in results if r.url in self.scores),
+                        key=lambda r: self.scores[r.url], reverse=True)
+        if not scored:
+            return "No sources evaluated yet."
+
+        scores = [self.scores[r.url] for r in scored]
+        dates = sorted(r.published_date for r in scored if r.published_date and r.published_date != "Unknown")
+        domains = {urlparse(r.url).netloc for r in scored}
+        # How well the sources we would analyze cover everything collected so far
+        for r in scored:
+            r.relevance_score = self.scores[r.url]
+        picks = mmr_select(scored, self.max_sources, diversity=self.model.diversity)
+
+        lines = [
+            f"Sources evaluated: {len(scored)} from {len(domains)} domains",
+            f"Mean score: {sum(scores) / len(scores):.1f}, sources scoring 7+: {sum(s >= 7 for s in scores)}",
+            f"Date range: {dates[0]} to {dates[-1]}" if dates else "Date range: unknown",
+            f"Top {len(picks)} diverse picks cover {coverage(picks, scored):.0%} of collected sources "
+            f"(redundancy among picks: {redundancy(picks):.2f})",
+            "Selected for analysis:"
+        ]
+        lines.extend(f"- {r.title} ({self.scores[r.url]:.1f})" for r in picks)
+        lines.append("Other top sources:")
+        lines.extend(f"- {r.title} ({self.scores[r.url]:.1f})" for r in scored[:self.top_titles] if r not in picks)
+        if self.explanation:
+            lines.append(f"Previous assessment: {self.explanation}")
+        return "\n".join(lines)
+
+    def evaluate(self, results: List[ResearchResult]) -> Tuple[List[ResearchResult], bool]:
+        """Score new sources, judge sufficiency and return all results ranked by score."""
+        url_index = {r.url: r for r in results}
+        new_results = [r for r in url_index.values() if r.url not in self.scores]
+
+        if new_results:
+            # Short IDs instead of URLs the model would have to echo back
+            ids = short_ids([r.url for r in new_results])
+            sources_text = encode_records([
+                (f"[{ids[r.url]}] {r.title}", {"site": domain(r.url), "date": r.published_date, "preview": self.preview(r)})
+                for r in new_results
+            ])
+
+            messages = [{
+                "role": "system",
+                "content": """You are a research quality evaluator.
+                You are given a summary of the sources already collected and a set of new sources.
+                1. Score only the new sources for quality and relevance (0-10)
+                2. Decide whether the collection as a whole now provides sufficient coverage of the topic
+                3. If additional sources are needed, explain what aspects need more coverage
+                
+                Return your evaluation in JSON format like:
+                {
+                    "sufficient": true/false,
+                    "explanation": "Explanation of the evaluation...",
+                    "scores": [
+                        {"id": "S1", "score": 8.5},
+                        {"id": "S2", "score": 7.2}
+                    ]
+                }"""
+            }, {
+                "role": "user",
+                "content": f"""Already collected:
+{self.coverage_summary(results)}
+
+New sources:
+{sources_text}"""
+            }]
+
+            evaluation = self.model._create_json("evaluation", messages,
+                                                 required_keys=["sufficient", "explanation", "scores"])
+
+            try:
+                for url, score_info in resolve_ids(evaluation["scores"], ids).items():
+                    self.scores[url] = float(score_info["score"])
+                self.sufficient = bool(evaluation["sufficient"])
+                self.explanation = evaluation["explanation"]
+                print(f"\nSource Evaluation: {self.explanation}")
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Error parsing response: {e}")
+                self.sufficient = False
+
+            # Sources the model skipped are scored 0 so they aren't re-sent every iteration
+            for r in new_results:
+                self.scores.setdefault(r.url, 0.0)
+
+        for r in results:
+            r.relevance_score = self.scores[r.url]
+
+        ranked_results = sorted(results, key=lambda x: x.relevance_score, reverse=True)
+        return ranked_results, self.sufficient
+
+def main(fuse_summary_analysis: bool = False, budget: Optional[BudgetController] = None, plan_after: int = 5,
+         contents: str = "text"):
+    """
+    Run a test of the OpenAI research pipeline with iterative searching.
+
+    Args:
+        fuse_summary_analysis: Summarize and analyze each source in one call
+        budget: Limits on time, tokens and cost for the run
+        plan_after: New sources after which the next iteration's queries are planned in the background
+        contents: Returned with each search: "text" (capped page text plus highlights) or "highlights" only
+    """
     load_dotenv()
     
     # Initialize the model
-    model = OpenAIModel()
+    model = OpenAIModel(fuse_summary_analysis=fuse_summary_analysis, budget=budget)
     
     print("\n=== Starting Research Pipeline Test ===\n")
     
     all_results = []
     seen_urls = set()
+    evaluator = IncrementalQualityEvaluator(model)
+    # Fetch page contents for the likely picks while sources are still being evaluated
+    prefetcher = ContentPrefetcher(lambda url: fetch_page_text(url, budget), top_k=5)
+    planner = ThreadPoolExecutor(max_workers=1, thread_name_prefix='planner')
+    next_queries: Optional[Future] = None
     iteration = 1
     
     while True:
         print(f"\n--- Search Iteration {iteration} ---")
         
-        # Generate queries
+        # Generate queries, unless they were already planned during the previous iteration
         print("\n1. Generating Research Queries...")
-        queries = generate_research_queries(model, all_results if iteration > 1 else None)
-        
-        # Fetch results for each query
-        new_results = []
+        if next_queries is not None:
+            queries = next_queries.result()
+            next_queries = None
+        else:
+            queries = generate_research_queries(model, all_results if iteration > 1 else None)
         for i, query in enumerate(queries, 1):
             print(f"\nProcessing Query {i}: {query}")
-            results = fetch_research_results(query, seen_urls)
-            new_results.extend(results)
-            seen_urls.update(r.url for r in results)
+        
+        # Search all queries at once, merging results as each one finishes
+        new_results = []
+        known_urls = set(seen_urls)
+        search = lambda q: fetch_research_results(q, known_urls, budget=budget, contents=contents)
+        with profile_stage("search"):
+            for query, results in fan_out(queries, search, seen_urls):
+                print(f"Finished Query: {query} ({len(results)} new sources)")
+                new_results.extend(results)
+                # Plan the next iteration from what's in so far, overlapping the remaining searches and evaluation
+                if (next_queries is None and iteration < 3 and len(new_results) >= plan_after
+                        and (budget is None or not budget.should_degrade())):
+                    next_queries = planner.submit(generate_research_queries, model, all_results + new_results)
+        
+        # Strip boilerplate before anything is tokenized or sent to a model
+        with profile_stage("cleaning"):
+            cleaning_stats = clean_sources(new_results, count_tokens, offload=default_offload())
+        for stats in cleaning_stats:
+            print(f"Cleaned {stats.url}: {stats.tokens_before} -> {stats.tokens_after} tokens")
+        if cleaning_stats:
+            print(f"Tokens saved by cleaning: {sum(s.tokens_saved for s in cleaning_stats)}")
         
         all_results.extend(new_results)
         
+        # Until scores exist, guess that earlier search results are the likely winners
+        scored = sorted((r for r in all_results if r.relevance_score), key=lambda r: r.relevance_score, reverse=True)
+        prefetcher.update([r.url for r in scored + all_results if not r.content])
+        
         # Evaluate quality and sufficiency
         print("\n2. Evaluating Source Quality...")
-        ranked_results, is_sufficient = evaluate_source_quality(model, all_results)
+        ranked_results, is_sufficient = evaluator.evaluate(all_results)
+        picks = mmr_select(ranked_results, 5, diversity=model.diversity)
+        prefetcher.update([r.url for r in picks + ranked_results if not r.content])
         
         if is_sufficient or iteration >= 3:  # Limit to 3 iterations
             all_results = ranked_results
             break
+        if budget is not None and budget.should_degrade():
+            budget.degrade(f"stopped searching after {iteration} iterations")
+            all_results = ranked_results
+            break
             
         iteration += 1
     
+    # A plan started before the search stopped is no longer needed; one already running can't
+    # be interrupted, so wait for it rather than leave its request running behind the report
+    if next_queries is not None:
+        next_queries.cancel()
+    planner.shutdown(wait=True)
+    
     # Process the final set of sources
     print("\n=== Processing Final Sources ===")
     
-    # Take top 5 sources for detailed analysis
-    top_results = all_results[:5]
-    
-    print("\n3. Summarizing Sources...")
-    summarized_results = [
-        model.summarize_source(result, max_length=2000)
-        for result in top_results
-    ]
-    
-    print("\n4. Analyzing Sources...")
+    # Take 5 relevant but non-redundant sources for detailed analysis
+    num_sources = budget.source_limit(5) if budget is not None else 5
+    top_results = mmr_select(all_results, num_sources, diversity=model.diversity)
+    
+    fetched = []
+    for result in top_results:
+        if not result.content:
+            result.content = prefetcher.get(result.url)
+            if result.content:
+                fetched.append(result)
+    prefetcher.close()
+    clean_sources(fetched, count_tokens, offload=default_offload())
+    print(f"Prefetch: {prefetcher.stats()}")
+    
+    print("\n3. Summarizing and Analyzing Sources...")
     analyses = [
-        model.analyze_source(result)
-        for result in summarized_results
+        model.summarize_and_analyze(result, max_length=2000)
+        for result in top_results
     ]
     
     for i, analysis in enumerate(analyses, 1):
@@ -215,7 +396,7 @@ def main():
         for j, point in enumerate(analysis.key_points, 1):
             print(f"  {j}. {point}")
     
-    print("\n5. Synthesizing Research...")
+    print("\n4. Synthesizing Research...")
     report = model.synthesize_research(analyses, "Connections between Jesus's esoteric teachings and Eastern spiritual traditions")
     
     print("\n=== Final Research Report ===")
@@ -234,6 +415,13 @@ def main():
     print("\nFuture Implications:")
     print(report.future_implications)
     
+    if budget is not None:
+        print(f"\nBudget: {budget.metadata()}")
+    print(f"Connection pools: {default_transport().stats()}")
+    if model.prompt_stats:
+        print(f"Compact prompts saved {sum(p.tokens_saved for p in model.prompt_stats)} of "
+              f"{sum(p.tokens_before for p in model.prompt_stats)} prompt tokens")
+    
     print(f"\n=== Test Complete ({iteration} search iterations) ===")
 
 # Test fixtures
@@ -332,6 +520,23 @@ def test_evaluate_source_quality(model, sample_results):
     scores = [r.relevance_score for r in ranked_results]
     assert scores == sorted(scores, reverse=True), "Results should be sorted by relevance_score in descending order"
 
+def test_incremental_quality_evaluator(model, sample_results):
+    """Test that the incremental evaluator scores each source only once."""
+    evaluator = IncrementalQualityEvaluator(model)
+
+    ranked_results, is_sufficient = evaluator.evaluate(sample_results[:1])
+    assert isinstance(is_sufficient, bool), "Sufficiency should be a boolean"
+    assert set(evaluator.scores) == {sample_results[0].url}, "First source should be scored"
+    first_score = evaluator.scores[sample_results[0].url]
+
+    ranked_results, is_sufficient = evaluator.evaluate(sample_results)
+    assert set(evaluator.scores) == {r.url for r in sample_results}, "New source should be scored"
+    assert evaluator.scores[sample_results[0].url] == first_score, "Cached scores should not be re-evaluated"
+    assert len(ranked_results) == len(sample_results), "Should return all results"
+
+    scores = [r.relevance_score for r in ranked_results]
+    assert scores == sorted(scores, reverse=True), "Results should be sorted by relevance_score in descending order"
+
 def test_summarize_source(model, sample_results):
     """Test source summarization."""
     result = model.summarize_source(sample_results[0], max_length=2000)
@@ -377,6 +582,21 @@ def test_analyze_source(model, sample_results):
     # Check source preservation
     assert analysis.source == sample_results[0], "Original source should be preserved"
 
+def test_summarize_and_analyze_fused(model, sample_results):
+    """Test the fused single-call summarize-and-analyze path."""
+    source = sample_results[0]
+    source.content = " ".join([source.content] * 200)
+
+    analysis = model.summarize_and_analyze(source, max_length=200, fused=True)
+
+    assert isinstance(analysis, SourceAnalysis), "Should return a SourceAnalysis"
+    assert analysis.source is source, "Original source should be preserved"
+    assert isinstance(source.content_summary, str) and len(source.content_summary.strip()) > 0, \
+        "Long content should get a summary from the fused call"
+    assert len(analysis.key_points) > 0, "Should have at least one key point"
+    assert isinstance(analysis.significance, str) and len(analysis.significance.strip()) > 0, \
+        "Significance should be non-empty"
+
 def test_synthesize_research(model, sample_results):
     """Test research synthesis."""
     # First create analyses
@@ -417,5 +637,42 @@ def test_synthesize_research(model, sample_results):
     assert all(isinstance(a, SourceAnalysis) for a in report.source_analyses), \
         "Source analyses should be SourceAnalysis objects"
 
+def test_update_research(model, sample_results):
+    """Test incremental synthesis with newly added sources."""
+    initial = model.synthesize_research([model.analyze_source(sample_results[0])], "Test research topic")
+    new_analyses = [model.analyze_source(sample_results[1])]
+
+    update = model.update_research(initial, new_analyses, "Test research topic")
+    report = update.report
+
+    # Check changed sections are reported accurately
+    assert isinstance(update.changed_sections, list), "Changed sections should be a list"
+    for name in update.changed_sections:
+        assert getattr(report, name) != getattr(initial, name), f"{name} reported as changed but is identical"
+
+    # Unchanged sections should be carried over as-is
+    for name in ["summary", "detailed_analysis", "limitations_and_gaps"]:
+        if name not in update.changed_sections:
+            assert getattr(report, name) == getattr(initial, name), f"{name} should be preserved"
+
+    # Check source bookkeeping
+    assert len(report.source_analyses) == 2, "New analyses should be appended"
+    assert report.metadata["num_sources"] == "2", "Source count should include new sources"
+    assert len(report.timeline) == len(initial.timeline) + 1, "Update should be recorded on the timeline"
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    # e.g. --deadline=120 --max-cost=0.05 to run under a budget, --profile=profiles to profile stages,
+    # --contents=highlights to search with highlights only
+    options = dict(arg[2:].split("=", 1) for arg in sys.argv[1:] if "=" in arg)
+    if "profile" in options:
+        enable_profiling(options["profile"])
+    budget = None
+    if "deadline" in options or "max-cost" in options:
+        budget = BudgetController(run=Limits(
+            deadline=float(options["deadline"]) if "deadline" in options else None,
+            max_cost=float(options["max-cost"]) if "max-cost" in options else None
+        ))
+    main(fuse_summary_analysis="--fused" in sys.argv, budget=budget, contents=options.get("contents", "text"))
+    profiler = disable_profiling()
+    if profiler is not None:
+        print(f"Stage profiles written to {profiler.write()}") 
\ No newline at end of file
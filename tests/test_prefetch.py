@@ -0,0 +1,60 @@
+import threading
+import time
+from tools.prefetch import ContentPrefetcher
+
+class SlowFetcher:
+    """Records fetched URLs; each fetch waits until released."""
+
+    def __init__(self):
+        self.fetched = []
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+
+    def __call__(self, url):
+        with self.lock:
+            self.fetched.append(url)
+        self.release.wait(timeout=5)
+        return f"text of {url}"
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_fetches_in_rank_order_up_to_worker_limit():
+    """Test the best-ranked URLs are fetched first with bounded concurrency."""
+    fetcher = SlowFetcher()
+    with ContentPrefetcher(fetcher, top_k=2, lookahead=1, max_workers=2) as prefetcher:
+        prefetcher.update(["a", "b", "c", "d"])
+        assert wait_for(lambda: len(fetcher.fetched) == 2)
+        assert fetcher.fetched == ["a", "b"], "Top-ranked URLs should start first"
+        fetcher.release.set()
+        assert prefetcher.get("a") == "text of a"
+        assert wait_for(lambda: prefetcher.stats()["completed"] == 3)
+        assert sorted(fetcher.fetched) == ["a", "b", "c"], "Only top_k plus lookahead should be fetched"
+
+def test_reranking_reprioritizes_and_caps_waste():
+    """Test URLs that fall out of the window are not fetched and waste stays within the cap."""
+    fetcher = SlowFetcher()
+    with ContentPrefetcher(fetcher, top_k=1, lookahead=2, max_workers=1, max_wasted=1) as prefetcher:
+        prefetcher.update(["a", "b", "c"])
+        assert wait_for(lambda: fetcher.fetched == ["a"])
+
+        # Evaluation promotes "x"; "a" is already running and becomes waste
+        prefetcher.update(["x", "y", "z"])
+        fetcher.release.set()
+        assert prefetcher.get("x") == "text of x"
+        assert wait_for(lambda: prefetcher.stats()["completed"] == prefetcher.stats()["started"])
+
+        assert "b" not in fetcher.fetched and "c" not in fetcher.fetched, "Dropped URLs should never start"
+        assert "y" not in fetcher.fetched, "Speculation should stop once the waste cap is reached"
+        assert prefetcher.stats()["wasted"] == 1
+
+def test_get_falls_back_to_direct_fetch():
+    """Test URLs that were never prefetched are fetched on demand."""
+    fetcher = SlowFetcher()
+    fetcher.release.set()
+    with ContentPrefetcher(fetcher) as prefetcher:
+        assert prefetcher.get("unranked") == "text of unranked"
+        assert prefetcher.stats()["started"] == 0, "Direct fetches are not prefetches"
@@ -0,0 +1,85 @@
+import json
+import time
+import pytest
+from models import profiling
+from models.profiling import StageProfiler, enable_profiling, disable_profiling, profile_stage, profiled
+
+def busy_work(seconds: float = 0.1) -> int:
+    """Spin the CPU so the sampler catches this frame."""
+    total = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+def allocate() -> list:
+    return [str(i) * 10 for i in range(20000)]
+
+@pytest.fixture(autouse=True)
+def profiling_off():
+    """Never leave the process-wide profiler on between tests."""
+    yield
+    disable_profiling()
+
+def test_disabled_hooks_are_no_ops():
+    """Test hooks do nothing when profiling is off."""
+    @profiled("stage")
+    def work():
+        return 42
+
+    assert profile_stage("stage") is profiling._NO_PROFILE
+    assert work() == 42
+
+def test_stage_writes_folded_stacks_and_allocations(tmp_path):
+    """Test a profiled stage produces flamegraph stacks, allocation sites and a summary."""
+    profiler = enable_profiling(str(tmp_path), interval=0.001)
+
+    @profiled("compute")
+    def work():
+        busy_work()
+        return allocate()
+
+    kept = work()
+    disable_profiling()
+    profiler.write()
+
+    folded = (tmp_path / "compute.folded").read_text().splitlines()
+    assert folded, "Samples should have been recorded"
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded), "Lines should end with a sample weight"
+    assert any("busy_work (test_profiling.py" in line for line in folded)
+
+    allocations = (tmp_path / "compute.allocations.txt").read_text()
+    assert "test_profiling.py" in allocations, "The list comprehension should be a top allocation site"
+
+    summary = json.loads((tmp_path / "summary.json").read_text())
+    assert summary["compute"]["calls"] == 1
+    assert summary["compute"]["sample_weight"] == profiling.SAMPLE_WEIGHT
+    assert summary["compute"]["peak_kb"] > 0
+    assert len(kept) == 20000
+
+def test_samples_go_to_innermost_stage(tmp_path):
+    """Test nested stages attribute samples to the innermost one."""
+    profiler = StageProfiler(str(tmp_path), interval=0.001, trace_allocations=False)
+    with profiler.stage("outer"):
+        with profiler.stage("inner"):
+            busy_work(0.05)
+    profiler.close()
+
+    stacks = profiler.profiles
+    assert any("busy_work" in stack for stack in stacks["inner"].stacks)
+    assert not any("busy_work" in stack for stack in stacks["outer"].stacks)
+    assert stacks["outer"].calls == stacks["inner"].calls == 1
+
+@pytest.mark.skipif(not profiling.CPU_CLOCKS, reason="Needs per-thread CPU clocks")
+def test_blocked_time_is_not_sampled(tmp_path):
+    """Test samples are weighted by CPU time, so a sleeping stage leaves no stacks behind."""
+    profiler = StageProfiler(str(tmp_path), interval=0.001, trace_allocations=False)
+    with profiler.stage("wait"):
+        time.sleep(0.1)
+    with profiler.stage("compute"):
+        busy_work(0.05)
+    profiler.close()
+
+    assert sum(profiler.profiles["wait"].stacks.values()) < 20_000, \
+        "Most of the 100ms blocked in sleep should not be attributed to the stage"
+    assert sum(profiler.profiles["compute"].stacks.values()) > 10_000, "Busy stage should record CPU microseconds"
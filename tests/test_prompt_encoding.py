@@ -0,0 +1,79 @@
+import json
+import pytest
+from types import SimpleNamespace
+from models.base import ResearchResult, SourceAnalysis
+from models.openai_model import OpenAIModel
+from models.prompt_encoding import encode_records, resolve_ids, short_ids
+
+class FakeJSONCompletions:
+    """Records prompts and answers with scores keyed by short source ID."""
+
+    def __init__(self, scores):
+        self.scores = scores
+        self.messages = []
+
+    def create(self, model, messages, **kwargs):
+        self.messages.append(messages)
+        content = json.dumps({"scores": [{"id": i, "score": s} for i, s in self.scores.items()]})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+@pytest.fixture
+def model(monkeypatch):
+    """OpenAI model with a four-characters-per-token estimate, so no tokenizer or API calls are needed."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    model = OpenAIModel(diversity=0.0)
+    model.count_tokens = lambda text: len(text) // 4
+    return model
+
+def test_short_ids_round_trip():
+    """Test IDs are assigned in order and model output maps back to URLs."""
+    ids = short_ids(["https://a.org/1", "https://b.org/2", "https://a.org/1"])
+    assert ids == {"https://a.org/1": "S1", "https://b.org/2": "S2"}
+
+    resolved = resolve_ids([{"id": "S2", "score": 3}, {"id": "[S1]", "score": 9}, {"id": "S9", "score": 1}], ids)
+    assert resolved == {"https://b.org/2": {"id": "S2", "score": 3}, "https://a.org/1": {"id": "[S1]", "score": 9}}, \
+        "Known IDs should resolve (brackets tolerated) and unknown ones be dropped"
+    assert resolve_ids([{"url": "https://a.org/1", "score": 5}], ids), "Echoed URLs should still be accepted"
+
+def test_shared_and_empty_fields():
+    """Test fields common to every record are stated once and empty fields are dropped."""
+    text = encode_records([
+        ("[S1] First", {"published": "Unknown", "site": "a.org", "methodology": "Survey", "key points": ["x", "y"]}),
+        ("[S2] Second", {"published": "Unknown", "site": "b.org", "methodology": "Survey", "key points": ["z"]}),
+    ])
+    assert text.startswith("All sources: methodology: Survey"), "Shared fields should be hoisted"
+    assert text.count("Survey") == 1
+    assert "Unknown" not in text, "Empty values should not be sent"
+    assert "key points: x | y" in text
+
+def test_evaluation_uses_short_ids(model):
+    """Test sources are sent without URLs, scores are mapped back and token savings recorded."""
+    results = [
+        ResearchResult(title="Gnostic texts", url="https://www.example.org/a/very/long/path?id=1", published_date="2020"),
+        ResearchResult(title="Tantra today", url="https://journal.example.com/articles/2021/9", published_date="2021"),
+    ]
+    completions = FakeJSONCompletions({"S1": 4.0, "S2": 9.0})
+    model.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    ranked = model.evaluate_sources(results, "gnosticism and tantra", max_sources=2)
+
+    prompt = completions.messages[0][1]["content"]
+    assert "https://" not in prompt and "[S1] Gnostic texts" in prompt and "example.org" in prompt
+    assert [r.title for r in ranked] == ["Tantra today", "Gnostic texts"]
+    assert ranked[0].relevance_score == 9.0
+    stats = model.prompt_stats[-1]
+    assert stats.stage == "evaluation" and stats.tokens_after < stats.tokens_before
+
+def test_synthesis_payload_is_smaller(model):
+    """Test compact source analyses carry the same content in fewer tokens."""
+    sources = [
+        SourceAnalysis(source=ResearchResult(title=f"Source {i}", url=f"https://example.org/{i}", published_date="Unknown"),
+                       key_points=["first point", "second point"], methodology=None, limitations="Small sample",
+                       significance="Shows a parallel")
+        for i in range(3)
+    ]
+    verbose = model._format_source_analyses(sources)
+    compact = model._format_source_analyses(sources, compact=True)
+
+    assert "second point" in compact and "Small sample" in compact
+    assert model.count_tokens(compact) < model.count_tokens(verbose)
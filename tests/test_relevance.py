@@ -0,0 +1,101 @@
+import json
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from models.base import ResearchResult
+from models.openai_model import OpenAIModel
+from models.relevance import Judgment, JudgmentLog, RelevanceScorer, evaluate_scorer
+
+TOPICS = ["gnostic gospel thomas", "kundalini yoga energy", "tantra ritual practice", "vedanta nondual self",
+          "desert fathers prayer", "kabbalah sefirot tree", "sufi dhikr remembrance", "zen koan practice"]
+FILLER = ["history", "review", "notes", "survey", "overview", "essay", "primer", "guide"]
+DOMAINS = {"university.edu": 2.0, "journal.org": 1.0, "blog.example.com": -2.0}
+
+def synthetic_judgments(n=400, seed=0):
+    """LLM-like scores that rise with query words in the title and with the domain's reputation."""
+    rng = np.random.default_rng(seed)
+    judgments = []
+    for i in range(n):
+        topic = TOPICS[i % len(TOPICS)]
+        words = topic.split()
+        matched = int(rng.integers(0, len(words) + 1))
+        title = " ".join(words[:matched] + list(rng.choice(FILLER, 3 - matched + 1)))
+        host = list(DOMAINS)[i % len(DOMAINS)]
+        score = np.clip(3 + 2 * matched + DOMAINS[host] + rng.normal(0, 0.3), 0, 10)
+        judgments.append(Judgment(query=f"{topic} {i // len(TOPICS) % 5}", url=f"https://{host}/a/{i}",
+                                  title=title, published_date="2020-01-01", score=float(score)))
+    return judgments
+
+@pytest.fixture(scope="module")
+def scorer():
+    return RelevanceScorer(max_uncertainty=1.0).fit(synthetic_judgments())
+
+def source(title, host, i=0):
+    return ResearchResult(title=title, url=f"https://{host}/b/{i}", published_date="2021-06-01")
+
+def test_learns_llm_scores(scorer):
+    """Test predictions follow lexical overlap and domain reputation."""
+    scores, uncertainty = scorer.predict("kundalini yoga energy", [
+        source("kundalini yoga energy guide", "university.edu"),
+        source("history review notes", "blog.example.com"),
+    ])
+    assert scores[0] > 8 and scores[1] < 3, f"Unexpected scores {scores}"
+    assert (uncertainty >= 0).all()
+
+def test_offline_report_beats_baseline():
+    """Test the held-out report shows the scorer beating the mean-score baseline."""
+    metrics = evaluate_scorer(synthetic_judgments(), test_fraction=0.3)
+    assert metrics["test_judgments"] > 0 and metrics["train_judgments"] > metrics["test_judgments"]
+    assert metrics["mae"] < metrics["baseline_mae"] / 2
+    assert metrics["spearman"] > 0.8
+    assert 0.0 <= metrics["confident_share"] <= 1.0
+    assert metrics["microseconds_per_source"] < 10_000
+
+def test_routing_threshold(scorer):
+    """Test only sources above the uncertainty threshold are left for the LLM."""
+    results = [source("zen koan practice primer", "journal.org", i) for i in range(3)]
+    assert RelevanceScorer().assign("zen koan practice", results) == results, "An unfitted scorer defers everything"
+
+    scorer.max_uncertainty = float("inf")
+    assert scorer.assign("zen koan practice", results) == []
+    assert all(r.relevance_score > 0 for r in results)
+    scorer.max_uncertainty = 0.0
+    assert scorer.assign("zen koan practice", results) == results
+    scorer.max_uncertainty = 1.0
+
+def test_save_and_load(scorer, tmp_path):
+    results = [source("tantra ritual practice", "university.edu")]
+    scorer.save(str(tmp_path / "scorer.npz"))
+    loaded = RelevanceScorer.load(str(tmp_path / "scorer.npz"))
+    assert np.allclose(loaded.predict("tantra ritual", results)[0], scorer.predict("tantra ritual", results)[0])
+
+def test_too_few_judgments():
+    with pytest.raises(ValueError):
+        RelevanceScorer().fit(synthetic_judgments(10))
+
+def test_evaluate_sources_routes_and_logs(scorer, monkeypatch, tmp_path):
+    """Test confident sources skip the LLM and the LLM's scores are logged as training data."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    requests = []
+
+    def create(model, messages, **kwargs):
+        requests.append(messages)
+        content = json.dumps({"scores": [{"id": "S1", "score": 7.0}]})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    log = JudgmentLog(str(tmp_path / "judgments.jsonl"))
+    local = RelevanceScorer(log=log, max_uncertainty=float("inf"))
+    vars(local).update({k: v for k, v in vars(scorer).items() if k not in ("log", "max_uncertainty")})
+    model = OpenAIModel(scorer=local, diversity=0.0)
+    model.count_tokens = lambda text: len(text) // 4
+    model.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    results = [source("sufi dhikr remembrance", "university.edu", i) for i in range(3)]
+    model.evaluate_sources(results, "sufi dhikr remembrance", max_sources=3)
+    assert not requests, "Confident sources should not reach the LLM"
+
+    local.max_uncertainty = 0.0
+    model.evaluate_sources(results[:1], "sufi dhikr remembrance", max_sources=1)
+    assert len(requests) == 1 and results[0].relevance_score == 7.0
+    logged = log.load()
+    assert [(j.query, j.url, j.score) for j in logged] == [("sufi dhikr remembrance", results[0].url, 7.0)]
@@ -0,0 +1,80 @@
+import json
+import pytest
+from models.base import ResearchReport, ResearchResult, SourceAnalysis
+from tools.report_site import ReportSiteBuilder, tokenize
+from tools.report_visualizer import ReportVisualizer, report_to_dict
+
+def make_report(title: str, finding: str) -> ResearchReport:
+    """Build a small ResearchReport with one analyzed source."""
+    source = ResearchResult(title="Source", url="https://example.com/1", published_date="2024-03-01")
+    return ResearchReport(
+        title=title,
+        summary=f"Summary about {title.lower()}.",
+        key_findings=[finding],
+        detailed_analysis="", critical_evaluation="", future_implications="",
+        methodology_analysis="", limitations_and_gaps="",
+        timeline=[{"event": "Research Completed", "date": "2024-04-01"}],
+        metadata={"query": "Test research topic", "num_sources": "1"},
+        source_analyses=[SourceAnalysis(source=source, key_points=["Point"])]
+    )
+
+@pytest.fixture
+def builder(tmp_path):
+    """Site builder over a temporary archive."""
+    visualizer = ReportVisualizer(cache_dir=str(tmp_path / "cache"))
+    return ReportSiteBuilder(data_dir=str(tmp_path / "data"), output_dir=str(tmp_path / "site"), visualizer=visualizer)
+
+def load_search_index(builder) -> dict:
+    script = (builder.output_dir / "search_index.js").read_text()
+    return json.loads(script[script.index("=") + 1:].strip().rstrip(";"))
+
+def test_report_to_dict():
+    """Test conversion of a ResearchReport into the template shape."""
+    data = report_to_dict(make_report("Cats", "Cats sleep a lot"))
+    assert data["key_findings"] == [{"finding": "Cats sleep a lot", "supporting_sources": []}]
+    assert data["metadata"]["date_range"] == {"earliest": "2024-03-01", "latest": "2024-03-01"}
+    assert data["metadata"]["sources_analyzed"] == 1
+
+def test_build_is_incremental(builder):
+    """Test only new or changed reports are rendered and removed ones are cleaned up."""
+    first = builder.add_report(make_report("Cat Intelligence", "Cats recognize their names"))
+    builder.add_report(make_report("Dog Behavior", "Dogs read human gestures"))
+
+    result = builder.build(max_workers=1)
+    assert sorted(result["added"]) == sorted(p.name for p in builder.data_dir.iterdir())
+    assert (builder.output_dir / "index.html").exists(), "Index page should be written"
+    assert "Cat Intelligence" in (builder.output_dir / "index.html").read_text()
+
+    assert builder.build(max_workers=1) == {"added": [], "updated": [], "removed": []}, \
+        "Unchanged archive should not re-render anything"
+
+    first.unlink()
+    third = builder.add_report(make_report("Bird Migration", "Birds navigate by magnetic fields"))
+    result = builder.build(max_workers=1)
+    assert result == {"added": [third.name], "updated": [], "removed": [first.name]}
+    assert not (builder.output_dir / f"{first.stem}.html").exists(), "Pages for removed reports should be deleted"
+    assert (builder.output_dir / f"{third.stem}.html").exists(), "Pages should be named after the archive key"
+
+def test_same_title_and_date_do_not_collide(builder):
+    """Test reports sharing a title and date get separate pages."""
+    builder.add_report(make_report("Cat Intelligence", "Cats recognize their names"))
+    builder.add_report(make_report("Cat Intelligence", "Cats prefer their owners' voices"))
+    builder.build(max_workers=1)
+
+    pages = [d["url"] for d in load_search_index(builder)["docs"]]
+    assert len(set(pages)) == 2, f"Each report should get its own page, got {pages}"
+    assert all((builder.output_dir / page).exists() for page in pages)
+
+def test_search_index(builder):
+    """Test the inverted index covers titles, summaries and key findings with field weights."""
+    builder.add_report(make_report("Cat Intelligence", "Cats recognize their names"))
+    builder.add_report(make_report("Dog Behavior", "Dogs read human gestures"))
+    builder.build(max_workers=1)
+
+    data = load_search_index(builder)
+    titles = [d["title"] for d in data["docs"]]
+    cat = titles.index("Cat Intelligence")
+    assert [cat, 4] in data["index"]["intelligence"], "Title (3) and summary (1) weights should add up"
+    assert [cat, 2] in data["index"]["recognize"], "Key finding terms should carry weight 2"
+    assert "the" not in data["index"], "Stopwords should not be indexed"
+    assert tokenize("The Cat's names") == ["cat", "names"]
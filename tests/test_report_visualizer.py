@@ -0,0 +1,86 @@
+import gzip
+import json
+import pytest
+from pathlib import Path
+from tools.report_visualizer import ReportVisualizer, TEMPLATE_DIR
+
+def make_report(i: int) -> dict:
+    """Build a minimal report dictionary in the shape the templates expect."""
+    return {
+        "title": f"Test Report {i}",
+        "summary": f"Summary of report {i}.",
+        "key_findings": [{
+            "finding": f"Finding {i}",
+            "supporting_sources": [{"url": "https://example.com/1", "title": "Source 1", "quote": "A quote."}]
+        }],
+        "timeline": [{"event": "Research Completed", "date": "2024-01-01", "significance": ""}],
+        "metadata": {
+            "query": "Test research topic",
+            "sources_analyzed": 1,
+            "date_range": {"earliest": "2024-01-01", "latest": "2024-01-02"}
+        }
+    }
+
+@pytest.fixture
+def visualizer(tmp_path):
+    """Visualizer with its bytecode cache in a temporary directory."""
+    return ReportVisualizer(cache_dir=str(tmp_path / "cache"))
+
+def test_visualize(visualizer, tmp_path):
+    """Test rendering a single report to HTML."""
+    output = Path(visualizer.visualize(make_report(1), output_dir=str(tmp_path / "out")))
+    assert output.exists(), "HTML file should be written"
+    assert output.name == "Test Report 1_2024-01-02.html", "Filename should come from title and latest date"
+    html = output.read_text()
+    assert "Finding 1" in html and "A quote." in html, "Findings and quotes should be rendered"
+
+def test_visualize_external_data(visualizer, tmp_path):
+    """Test writing report data as a separate gzipped payload for the D3 template."""
+    report = make_report(1)
+    output = Path(visualizer.visualize(report, output_dir=str(tmp_path / "out"),
+                                       template="d3_report.html", data_mode="external"))
+    data_file = output.with_suffix(".data.json.gz")
+
+    assert data_file.exists(), "Data payload should be written next to the HTML file"
+    with gzip.open(data_file, "rt") as f:
+        assert json.load(f) == report, "Payload should round-trip the report"
+    html = output.read_text()
+    assert data_file.name in html, "Page should reference the payload"
+    assert '"supporting_sources"' not in html, "Report data should not be inlined"
+    assert "served over HTTP" in html, "Page should explain a failed load instead of staying blank"
+
+    with pytest.raises(ValueError):
+        visualizer.visualize(report, output_dir=str(tmp_path / "out"), data_mode="embedded")
+
+def test_d3_network_precomputed(visualizer, tmp_path):
+    """Test the D3 template embeds fixed node positions and the live simulation is optional."""
+    output = Path(visualizer.visualize(make_report(1), output_dir=str(tmp_path / "out"), template="d3_report.html"))
+    html = output.read_text()
+    assert '"id": "finding-0"' in html and '"x": ' in html, "Network nodes should be embedded with positions"
+    assert "const liveLayout = false;" in html, "Live simulation should be off by default"
+
+    output = Path(visualizer.visualize(make_report(1), output_dir=str(tmp_path / "out"),
+                                       template="d3_report.html", live_layout=True))
+    assert "const liveLayout = true;" in output.read_text(), "Live simulation should be switchable"
+
+def test_templates_compiled_once(visualizer, tmp_path):
+    """Test templates are cached per process and bytecode is written outside the package."""
+    assert visualizer.get_template("basic_report.html") is visualizer.get_template("basic_report.html"), \
+        "Template should be compiled once"
+    assert ReportVisualizer(cache_dir=visualizer.cache_dir).env is visualizer.env, \
+        "Visualizers should share an environment per cache location"
+    assert any((tmp_path / "cache").iterdir()), "Bytecode cache should be populated"
+
+def test_render_many(visualizer, tmp_path):
+    """Test batch rendering in worker processes preserves order and writes nothing to the package."""
+    template_files = sorted(p.name for p in TEMPLATE_DIR.iterdir())
+    reports = [make_report(i) for i in range(6)]
+
+    outputs = visualizer.render_many(reports, output_dir=str(tmp_path / "out"), max_workers=2)
+
+    assert [Path(p).name for p in outputs] == [f"Test Report {i}_2024-01-02.html" for i in range(6)], \
+        "Outputs should follow input order"
+    assert all(f"Finding {i}" in Path(p).read_text() for i, p in enumerate(outputs)), \
+        "Each file should contain its own report"
+    assert sorted(p.name for p in TEMPLATE_DIR.iterdir()) == template_files, \
+        "Rendering should not write to the template directory"
@@ -0,0 +1,64 @@
+import pytest
+from models.routing import RoutingPolicy, ModelTier
+
+@pytest.fixture
+def tiers():
+    """Three tiers with small thresholds so routing is easy to exercise."""
+    return [
+        ModelTier(name="small", large_input_tokens=100, max_input_tokens=1000),
+        ModelTier(name="medium", large_input_tokens=500, max_input_tokens=1000),
+        ModelTier(name="large", large_input_tokens=5000, max_input_tokens=5000),
+    ]
+
+def test_short_inputs_use_cheapest_tier(tiers):
+    """Test that small inputs go to the cheapest model for every stage."""
+    policy = RoutingPolicy(tiers=tiers)
+    for stage in ["evaluation", "summary", "analysis", "synthesis"]:
+        assert policy.route(stage, input_tokens=50) == "small", f"{stage} should use the cheapest tier"
+
+def test_large_inputs_go_up_a_tier(tiers):
+    """Test that large inputs are routed one tier up, except under a latency target."""
+    assert RoutingPolicy(tiers=tiers).route("analysis", input_tokens=200) == "medium"
+    assert RoutingPolicy(tiers=tiers, target="latency").route("analysis", input_tokens=200) == "small"
+
+def test_context_limit_overrides_target(tiers):
+    """Test that inputs beyond a tier's context always move up."""
+    policy = RoutingPolicy(tiers=tiers, target="latency")
+    assert policy.route("synthesis", input_tokens=2000) == "large"
+
+def test_stage_floor_and_quality_target(tiers):
+    """Test per-stage floors and the quality target."""
+    policy = RoutingPolicy(tiers=tiers, stage_floors={"synthesis": 1})
+    assert policy.route("synthesis") == "medium"
+    assert policy.route("evaluation") == "small"
+    assert RoutingPolicy(tiers=tiers, target="quality").route("evaluation") == "medium"
+
+def test_escalation_is_bounded(tiers):
+    """Test escalation moves up one tier and stops after max_escalations."""
+    policy = RoutingPolicy(tiers=tiers, max_escalations=1)
+    assert policy.escalate("analysis", "small", "ValidationError") == "medium"
+    assert policy.escalate("analysis", "medium", "ValidationError", attempt=2) is None
+    assert policy.escalate("analysis", "large", "ValidationError") is None, "Top tier cannot escalate"
+
+def test_decisions_are_recorded(tiers):
+    """Test routing decisions are kept for inspection."""
+    policy = RoutingPolicy(tiers=tiers)
+    policy.route("summary", input_tokens=200)
+    policy.escalate("summary", "medium", "no parsed output")
+    assert [d.model for d in policy.decisions] == ["medium", "large"]
+    assert policy.decisions[0].reason == "large input"
+    assert policy.decisions[1].reason.startswith("escalated")
+
+def test_cheapest_respects_context_limit(tiers):
+    """Test the budget fallback picks the cheapest tier that fits and records the choice."""
+    policy = RoutingPolicy(tiers=tiers, target="quality", stage_floors={"synthesis": 1})
+    assert policy.cheapest("synthesis", input_tokens=50) == "small", "Floors and target should be ignored"
+    assert policy.cheapest("synthesis", input_tokens=2000) == "large", "Inputs beyond a context limit move up"
+    assert [(d.model, d.reason) for d in policy.decisions] == [("small", "budget pressure"), ("large", "budget pressure")]
+
+def test_unknown_stage_and_target(tiers):
+    """Test invalid stages and targets are rejected."""
+    with pytest.raises(ValueError):
+        RoutingPolicy(tiers=tiers, target="cheap")
+    with pytest.raises(ValueError):
+        RoutingPolicy(tiers=tiers).route("planning")
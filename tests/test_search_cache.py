@@ -0,0 +1,64 @@
+import time
+from tools.search_cache import SearchCache, normalize_query
+
+RESULTS = [{"title": "Result", "url": "https://example.com/1", "published_date": "2024-01-01", "text": None}]
+
+def test_normalized_keys():
+    """Test queries differing only in case, punctuation and spacing share an entry."""
+    cache = SearchCache()
+    cache.put("Jesus and yoga?", 5, RESULTS)
+    assert cache.get("  jesus AND yoga ", 5) == RESULTS
+    assert cache.get("Jesus and yoga?", 10) is None, "Result count is part of the key"
+    assert cache.get("Jesus and yoga?", 5, type="neural") is None, "Search options are part of the key"
+    assert normalize_query("What's  New?") == "what s new"
+
+def test_get_or_search_calls_search_once():
+    """Test repeated queries skip the search call."""
+    cache = SearchCache()
+    calls = []
+    def search():
+        calls.append(1)
+        return RESULTS
+
+    assert cache.get_or_search("query", 5, search) == (RESULTS, False)
+    assert cache.get_or_search("Query!", 5, search) == (RESULTS, True)
+    assert len(calls) == 1 and (cache.hits, cache.misses) == (1, 1)
+
+def test_ttl_expiry():
+    """Test entries expire after the TTL."""
+    cache = SearchCache(ttl=0.05)
+    cache.put("query", 5, RESULTS)
+    time.sleep(0.1)
+    assert cache.get("query", 5) is None and len(cache) == 0
+
+def test_lru_eviction():
+    """Test the least recently used entry is evicted beyond max_entries."""
+    cache = SearchCache(max_entries=2)
+    cache.put("first", 5, RESULTS)
+    time.sleep(0.01)
+    cache.put("second", 5, RESULTS)
+    time.sleep(0.01)
+    cache.get("first", 5)
+    time.sleep(0.01)
+    cache.put("third", 5, RESULTS)
+    assert len(cache) == 2
+    assert cache.get("second", 5) is None, "Least recently used entry should be evicted"
+    assert cache.get("first", 5) == RESULTS
+
+def test_fuzzy_match():
+    """Test near-identical queries share results only when fuzzy matching is enabled."""
+    exact = SearchCache()
+    fuzzy = SearchCache(fuzzy_threshold=0.7)
+    for cache in (exact, fuzzy):
+        cache.put("historical connections between jesus and yoga traditions", 5, RESULTS)
+
+    near = "historical connections between jesus and the yoga traditions"
+    assert exact.get(near, 5) is None
+    assert fuzzy.get(near, 5) == RESULTS
+    assert fuzzy.get("tantra rituals in medieval india", 5) is None, "Unrelated queries should miss"
+
+def test_persistence(tmp_path):
+    """Test a file-backed cache survives reopening."""
+    path = str(tmp_path / "search.sqlite")
+    SearchCache(path).put("query", 5, RESULTS)
+    assert SearchCache(path).get("query", 5) == RESULTS
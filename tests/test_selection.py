@@ -0,0 +1,44 @@
+import numpy as np
+from models.base import ResearchResult
+from models.selection import tfidf_vectors, mmr_select, coverage, redundancy, tokenize
+
+def make_result(i: int, content: str, score: float) -> ResearchResult:
+    return ResearchResult(title=f"Article {i}", url=f"https://example.com/{i}",
+                          published_date="2024-01-01", relevance_score=score, content=content)
+
+YOGA = "yoga breathing meditation practice pranayama posture"
+GOSPEL = "gospel parables kingdom heaven teachings disciples"
+DESERT = "desert fathers monastic prayer hesychasm silence"
+
+def test_tfidf_vectors():
+    """Test vectors are normalized and similar texts are closer than unrelated ones."""
+    vectors = tfidf_vectors([YOGA, YOGA + " tantra", GOSPEL, ""])
+    norms = np.linalg.norm(vectors, axis=1)
+    assert np.allclose(norms[:3], 1.0), "Non-empty rows should be unit length"
+    assert norms[3] == 0, "Empty text should give a zero vector"
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2], "Near-duplicates should be most similar"
+    assert tokenize("The Yoga of the Gospels") == ["yoga", "gospels"]
+
+def test_mmr_prefers_diverse_sources():
+    """Test MMR skips near-duplicates that plain top-N would pick."""
+    results = [
+        make_result(0, YOGA, 9.5),
+        make_result(1, YOGA, 9.4),
+        make_result(2, YOGA + " posture", 9.3),
+        make_result(3, GOSPEL, 8.0),
+        make_result(4, DESERT, 7.5),
+    ]
+    top_n = sorted(results, key=lambda r: r.relevance_score, reverse=True)[:3]
+    selected = mmr_select(results, 3, diversity=0.5)
+
+    assert [r.url for r in selected][0] == results[0].url, "Most relevant source should be picked first"
+    assert {r.url for r in selected} == {results[0].url, results[3].url, results[4].url}, \
+        "Duplicates should give way to distinct sources"
+    assert redundancy(selected) < redundancy(top_n), "Selection should be less redundant than top-N"
+    assert coverage(selected, results) > coverage(top_n, results), "Selection should cover more of the pool"
+
+def test_mmr_without_diversity_is_top_n():
+    """Test diversity 0 reduces to ranking by score."""
+    results = [make_result(i, YOGA, score) for i, score in enumerate([3.0, 9.0, 6.0])]
+    assert [r.relevance_score for r in mmr_select(results, 2, diversity=0.0)] == [9.0, 6.0]
+    assert mmr_select(results, 0) == [] and mmr_select([], 3) == []
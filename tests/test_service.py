@@ -0,0 +1,79 @@
+import http.client
+import json
+import threading
+import pytest
+from http.server import ThreadingHTTPServer
+from models.base import ResearchReport
+from tools.service import ResearchService, make_handler
+
+def fake_pipeline(job):
+    """Emits the pipeline's stages without any API calls."""
+    job.emit('search', {'sources': 3})
+    job.emit('analysis', {'done': 1, 'total': 1, 'title': 'Source', 'key_points': ['point']})
+    if job.topic == 'fail':
+        raise RuntimeError('search backend down')
+    return ResearchReport(
+        title=f"Report on {job.topic}", summary="Summary", key_findings=["Finding"],
+        detailed_analysis="", critical_evaluation="", future_implications="",
+        methodology_analysis="", limitations_and_gaps="", timeline=[], metadata={}, source_analyses=[]
+    )
+
+@pytest.fixture
+def server():
+    service = ResearchService(pipeline=fake_pipeline)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(service, keepalive_seconds=0.1))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+def request(server, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+    connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers or {})
+    response = connection.getresponse()
+    data = response.read()
+    connection.close()
+    return response.status, data
+
+def read_events(raw: bytes):
+    events = []
+    for block in raw.decode('utf-8').split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if line and not line.startswith(':'))
+        if fields:
+            events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return events
+
+def test_submit_stream_and_status(server):
+    """Test a job streams its stage events and ends with the report."""
+    status, body = request(server, 'POST', '/research', {'topic': 'mysticism'})
+    assert status == 202
+    job = json.loads(body)
+
+    status, raw = request(server, 'GET', job['events_url'])
+    events = read_events(raw)
+    assert [name for _, name, _ in events] == ['started', 'search', 'analysis', 'done']
+    assert events[-1][2]['report']['title'] == 'Report on mysticism'
+
+    status, body = request(server, 'GET', job['status_url'])
+    summary = json.loads(body)
+    assert summary['status'] == 'done' and summary['stage'] == 'analysis'
+    assert summary['report']['key_findings'][0]['finding'] == 'Finding', "Reports use the template shape"
+
+    # Reconnecting clients only get events after the last one they saw
+    _, raw = request(server, 'GET', job['events_url'], headers={'Last-Event-ID': '1'})
+    assert [name for _, name, _ in read_events(raw)] == ['analysis', 'done']
+
+def test_failed_job_reports_error(server):
+    _, body = request(server, 'POST', '/research', {'topic': 'fail'})
+    _, raw = request(server, 'GET', json.loads(body)['events_url'])
+    assert read_events(raw)[-1][1:] == ('failed', {'error': 'RuntimeError: search backend down'})
+
+def test_bad_requests(server):
+    assert request(server, 'POST', '/research', {'queries': ['no topic']})[0] == 400
+    assert request(server, 'GET', '/research/unknown')[0] == 404
+    assert request(server, 'GET', '/nowhere')[0] == 404
+    status, body = request(server, 'GET', '/health')
+    assert status == 200 and 'jobs' in json.loads(body)
@@ -0,0 +1,84 @@
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from models.transport import PoolConfig, TransportRegistry
+
+class EchoHandler(BaseHTTPRequestHandler):
+    """Keep-alive handler that records the client port of each request."""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.client_ports.append(self.client_address[1])
+        payload = json.dumps({"received": json.loads(body)}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    server.client_ports = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def registry():
+    registry = TransportRegistry(PoolConfig(max_connections=4, http2=False))
+    yield registry
+    registry.close()
+
+def test_exa_clients_reuse_connections(server, registry):
+    """Test Exa clients from one registry share a keep-alive connection."""
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    first = registry.exa_client(api_key="test", base_url=base_url)
+    second = registry.exa_client(api_key="test", base_url=base_url)
+
+    assert first.request("/search", {"query": "one"}) == {"received": {"query": "one"}}
+    assert second.request("/search", {"query": "two"}) == {"received": {"query": "two"}}
+    assert len(set(server.client_ports)) == 1, "Both requests should use the same connection"
+
+    stats = registry.stats()["requests"]
+    assert (stats.open, stats.idle, stats.waiting) == (1, 1, 0)
+
+def test_exa_errors_raise(server, registry):
+    """Test error statuses surface as ValueError like the stock client."""
+    client = registry.exa_client(api_key="test", base_url=f"http://127.0.0.1:{server.server_address[1]}")
+    with pytest.raises(ValueError):
+        client.request("/missing", method="GET")
+
+def test_openai_clients_share_http_client(registry):
+    """Test OpenAI clients are built on the registry's single httpx client."""
+    first = registry.openai_client(api_key="test")
+    second = registry.openai_client(api_key="test")
+    assert first._client is second._client is registry.http_client()
+    assert registry.stats()["httpx"].open == 0, "No connections before the first request"
+
+def test_exa_timeout_capped_per_call(registry):
+    """Test a per-call timeout never extends the pool's and leaves the shared client unchanged."""
+    registry.config.timeout = 30.0
+    client = registry.exa_client(api_key="test")
+    assert client.with_timeout(5.0).timeout == 5.0
+    assert client.with_timeout(60.0).timeout == 30.0
+    assert client.with_timeout(None) is client
+    assert client.timeout == 30.0
+
+def test_stats_survive_unknown_internals(registry, monkeypatch):
+    """Test pool internals from other library versions give None counts instead of raising."""
+    registry.openai_client(api_key="test")
+    registry.session()
+    monkeypatch.setattr(registry.http_client()._transport, "_pool", None, raising=False)
+    monkeypatch.setattr(registry._adapter, "poolmanager", None)
+
+    stats = registry.stats()
+    assert (stats["httpx"].open, stats["httpx"].idle, stats["httpx"].waiting) == (None, None, None)
+    assert (stats["requests"].open, stats["requests"].idle, stats["requests"].waiting) == (None, None, 0)
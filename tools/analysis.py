@@ -0,0 +1,309 @@
+"""
+Columnar export of research outputs for bulk analysis.
+
+Reports and their source analyses are written to an archive directory as one part per
+export, one table per record type. Each column is stored on its own, so a query over
+scores or dates never touches the text. Parts are written as Arrow IPC files when pyarrow
+is installed and as memory-mapped NumPy columns otherwise; both can be read back without
+loading whole tables into memory.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from pathlib import Path
+from datetime import datetime
+from urllib.parse import urlparse
+import hashlib
+import json
+import time
+
+import numpy as np
+
+from models.base import ResearchReport
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # Optional dependency; fall back to NumPy columns
+    pa = None
+    pa_ipc = None
+
+FORMATS = ('auto', 'arrow', 'numpy')
+
+# Column name -> type, per table. 'str' columns hold text; everything else is fixed-width.
+SCHEMAS: Dict[str, List[Tuple[str, str]]] = {
+    'reports': [
+        ('run_id', 'str'),
+        ('created', 'date'),
+        ('query', 'str'),
+        ('num_sources', 'int32'),
+        ('title', 'str'),
+        ('summary', 'str'),
+        ('key_findings', 'str'),
+        ('detailed_analysis', 'str'),
+        ('critical_evaluation', 'str'),
+        ('future_implications', 'str'),
+        ('methodology_analysis', 'str'),
+        ('limitations_and_gaps', 'str'),
+    ],
+    'sources': [
+        ('run_id', 'str'),
+        ('url', 'str'),
+        ('domain', 'str'),
+        ('title', 'str'),
+        ('published_date', 'date'),
+        ('relevance_score', 'float32'),
+        ('content_chars', 'int32'),
+        ('num_key_points', 'int32'),
+        ('has_methodology', 'bool'),
+        ('key_points', 'str'),
+        ('methodology', 'str'),
+        ('limitations', 'str'),
+        ('significance', 'str'),
+        ('content_summary', 'str'),
+        ('content', 'str'),
+    ],
+}
+
+_NUMPY_TYPES = {'date': 'datetime64[D]', 'float32': np.float32, 'int32': np.int32, 'bool': np.bool_}
+
+def _parse_date(value: Optional[str]) -> np.datetime64:
+    if not value or value == 'Unknown':
+        return np.datetime64('NaT', 'D')
+    try:
+        return np.datetime64(datetime.fromisoformat(value.replace('Z', '+00:00')).date(), 'D')
+    except ValueError:
+        return np.datetime64('NaT', 'D')
+
+def run_id_for(report: ResearchReport) -> str:
+    """Stable identifier for a report, so re-exporting the same run is recognizable."""
+    created = report.timeline[-1]['date'] if report.timeline else ''
+    key = f"{report.metadata.get('query', '')}|{report.title}|{created}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+
+def _rows(reports: Sequence[ResearchReport],
+          run_ids: Sequence[str],
+          include_content: bool) -> Dict[str, Dict[str, list]]:
+    """Flatten reports into column lists per table."""
+    tables = {name: {column: [] for column, _ in schema} for name, schema in SCHEMAS.items()}
+    report_cols, source_cols = tables['reports'], tables['sources']
+
+    for report, run_id in zip(reports, run_ids):
+        values = {
+            'run_id': run_id,
+            'created': _parse_date(report.timeline[-1]['date'] if report.timeline else None),
+            'query': report.metadata.get('query', ''),
+            'num_sources': len(report.source_analyses),
+            'key_findings': '\n'.join(str(f) for f in report.key_findings),
+        }
+        for column, _ in SCHEMAS['reports']:
+            report_cols[column].append(values[column] if column in values else getattr(report, column))
+
+        for analysis in report.source_analyses:
+            source = analysis.source
+            values = {
+                'run_id': run_id,
+                'url': source.url,
+                'domain': urlparse(source.url).netloc,
+                'title': source.title,
+                'published_date': _parse_date(source.published_date),
+                'relevance_score': source.relevance_score,
+                'content_chars': len(source.content or ''),
+                'num_key_points': len(analysis.key_points),
+                'has_methodology': bool(analysis.methodology),
+                'key_points': '\n'.join(analysis.key_points),
+                'methodology': analysis.methodology or '',
+                'limitations': analysis.limitations or '',
+                'significance': analysis.significance,
+                'content_summary': source.content_summary or '',
+                'content': (source.content or '') if include_content else '',
+            }
+            for column, _ in SCHEMAS['sources']:
+                source_cols[column].append(values[column])
+
+    return tables
+
+class StringColumn:
+    """Read-only sequence of strings over a UTF-8 buffer and an offsets array, decoded on access."""
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return bytes(self.data[start:end]).decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+class _ArrowStringColumn:
+    """Adapts an Arrow string column to the StringColumn interface."""
+
+    def __init__(self, array):
+        self.array = array
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    def __getitem__(self, i: int) -> str:
+        return self.array[i].as_py()
+
+    def __iter__(self) -> Iterator[str]:
+        for value in self.array:
+            yield value.as_py()
+
+class _ChainedStrings:
+    """String column spanning several archive parts."""
+
+    def __init__(self, columns: List[Any]):
+        self.columns = columns
+        self.bounds = np.cumsum([0] + [len(c) for c in columns])
+
+    def __len__(self) -> int:
+        return int(self.bounds[-1])
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        part = int(np.searchsorted(self.bounds, i, side='right') - 1)
+        return self.columns[part][i - self.bounds[part]]
+
+    def __iter__(self) -> Iterator[str]:
+        for column in self.columns:
+            yield from column
+
+def _write_numpy_part(part_dir: Path, table: str, columns: Dict[str, list]):
+    part_dir.mkdir(parents=True)
+    for column, kind in SCHEMAS[table]:
+        values = columns[column]
+        if kind == 'str':
+            encoded = [v.encode('utf-8') for v in values]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(b) for b in encoded], out=offsets[1:])
+            np.save(part_dir / f'{column}.offsets.npy', offsets)
+            (part_dir / f'{column}.data.bin').write_bytes(b''.join(encoded))
+        else:
+            np.save(part_dir / f'{column}.npy', np.asarray(values, dtype=_NUMPY_TYPES[kind]))
+
+def _write_arrow_part(part_file: Path, table: str, columns: Dict[str, list]):
+    arrays = []
+    for column, kind in SCHEMAS[table]:
+        values = columns[column]
+        if kind == 'str':
+            arrays.append(pa.array(values, type=pa.large_string()))
+        else:
+            arrays.append(pa.array(np.asarray(values, dtype=_NUMPY_TYPES[kind])))
+    batch = pa.table(arrays, names=[column for column, _ in SCHEMAS[table]])
+    part_file.parent.mkdir(parents=True, exist_ok=True)
+    with pa.OSFile(str(part_file), 'wb') as sink:
+        with pa_ipc.new_file(sink, batch.schema) as writer:
+            writer.write_table(batch)
+
+def export_reports(reports: Sequence[ResearchReport],
+                   archive_dir: str,
+                   run_ids: Optional[Sequence[str]] = None,
+                   include_content: bool = False,
+                   format: str = 'auto') -> str:
+    """
+    Append reports and their source analyses to a columnar archive.
+
+    Args:
+        reports: Reports to export
+        archive_dir: Archive directory (created if missing)
+        run_ids: Identifier per report (default: derived from query, title and date)
+        include_content: Also store raw source content (default: False)
+        format: 'arrow', 'numpy' or 'auto' to use Arrow when pyarrow is installed
+
+    Returns:
+        Name of the part that was written
+
+    Raises:
+        ValueError: If the format is unknown or Arrow was requested without pyarrow
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown archive format: {format}")
+    if format == 'arrow' and pa is None:
+        raise ValueError("Arrow format requires pyarrow")
+    use_arrow = pa is not None and format != 'numpy'
+
+    run_ids = list(run_ids) if run_ids is not None else [run_id_for(r) for r in reports]
+    tables = _rows(reports, run_ids, include_content)
+
+    root = Path(archive_dir)
+    part = f"part-{time.time_ns()}"
+    for table, columns in tables.items():
+        if use_arrow:
+            _write_arrow_part(root / table / f'{part}.arrow', table, columns)
+        else:
+            _write_numpy_part(root / table / part, table, columns)
+
+    (root / 'archive.json').write_text(json.dumps({'schemas': SCHEMAS}, indent=1))
+    return part
+
+class ResearchArchive:
+    """
+    Memory-mapped reader over an archive written by export_reports.
+
+    Numeric and date columns come back as NumPy arrays; text columns come back as
+    lazily decoded sequences, so only the strings actually accessed are read.
+    """
+
+    def __init__(self, archive_dir: str):
+        self.root = Path(archive_dir)
+        if not self.root.exists():
+            raise ValueError(f"No archive at {archive_dir}")
+        self._arrow_tables: Dict[Path, Any] = {}
+
+    def parts(self, table: str) -> List[Path]:
+        """Parts of a table in the order they were written."""
+        if table not in SCHEMAS:
+            raise ValueError(f"Unknown table: {table}")
+        table_dir = self.root / table
+        return sorted(table_dir.iterdir()) if table_dir.exists() else []
+
+    def _arrow_table(self, part: Path):
+        if part not in self._arrow_tables:
+            if pa is None:
+                raise ValueError(f"Reading {part.name} requires pyarrow")
+            # Memory-mapped and zero-copy: buffers point straight into the file
+            self._arrow_tables[part] = pa_ipc.open_file(pa.memory_map(str(part), 'r')).read_all()
+        return self._arrow_tables[part]
+
+    def _part_column(self, part: Path, column: str, kind: str):
+        if part.suffix == '.arrow':
+            array = self._arrow_table(part).column(column)
+            if kind == 'str':
+                return _ArrowStringColumn(array)
+            return array.to_numpy()
+        if kind == 'str':
+            return StringColumn(np.load(part / f'{column}.offsets.npy', mmap_mode='r'),
+                                np.memmap(part / f'{column}.data.bin', dtype=np.uint8, mode='r')
+                                if (part / f'{column}.data.bin').stat().st_size else np.zeros(0, dtype=np.uint8))
+        return np.load(part / f'{column}.npy', mmap_mode='r')
+
+    def column(self, table: str, column: str) -> Union[np.ndarray, Sequence[str]]:
+        """Read one column across all parts of a table."""
+        kinds = dict(SCHEMAS.get(table, []))
+        if column not in kinds:
+            raise ValueError(f"Unknown column: {table}.{column}")
+        columns = [self._part_column(part, column, kinds[column]) for part in self.parts(table)]
+
+        if kinds[column] == 'str':
+            return columns[0] if len(columns) == 1 else _ChainedStrings(columns)
+        if not columns:
+            return np.zeros(0, dtype=_NUMPY_TYPES[kinds[column]])
+        return columns[0] if len(columns) == 1 else np.concatenate(columns)
+
+    def columns(self, table: str, names: Sequence[str]) -> Dict[str, Union[np.ndarray, Sequence[str]]]:
+        """Read several columns of a table."""
+        return {name: self.column(table, name) for name in names}
+
+    def __len__(self) -> int:
+        return len(self.column('reports', 'num_sources'))
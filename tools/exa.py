@@ -1,11 +1,13 @@
-from exa_py import Exa
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-from dataclasses import dataclass
-from typing import List, NewType
+from dataclasses import dataclass, asdict, field
+from typing import List, NewType, Optional
 from datetime import datetime
 from urllib.parse import urlparse
+from .search_cache import SearchCache, default_search_cache
+from models.budget import BudgetController, BudgetExceeded
+from models.transport import default_transport
 
 # Load environment variables from the .env file
 dotenv_path = Path(__file__).parent.parent / '.env'
@@ -15,12 +17,19 @@ EXA_API_KEY = os.getenv('EXA_API_KEY')
 if not EXA_API_KEY:
     raise ValueError("EXA_API_KEY not set in environment variables")
 
-# Initialize the Exa client
-exa = Exa(api_key=EXA_API_KEY)
+# Initialize the Exa client on the shared connection pool
+exa = default_transport().exa_client(api_key=EXA_API_KEY)
 
 # More specific URL type with validation
 URL = NewType('URL', str)
 
+# What search_with_contents returns per result: capped page text plus highlights, or highlights only
+CONTENT_MODES = ['text', 'highlights']
+
+def _client(budget: Optional[BudgetController]):
+    """The shared client, with requests cut off at the run deadline when there is one."""
+    return exa.with_timeout(budget.remaining_seconds()) if budget is not None else exa
+
 def validate_url(url: str) -> URL:
     """Validate and return a URL."""
     parsed = urlparse(url)
@@ -37,10 +46,14 @@ class SearchResult:
         title: The title of the search result
         url: The URL of the result (must be valid HTTP(S))
         published_date: ISO format date string of publication
+        text: Page text, if it was requested with the search
+        highlights: Query-relevant excerpts, if they were requested with the search
     """
     title: str
     url: URL
     published_date: str
+    text: Optional[str] = None
+    highlights: List[str] = field(default_factory=list)
 
     def __post_init__(self):
         """Validate URL and date format after initialization."""
@@ -51,13 +64,18 @@ class SearchResult:
             except ValueError:
                 raise ValueError(f"Invalid date format: {self.published_date}")
 
-def basic_search(query: str, max_results: int = 10) -> List[SearchResult]:
+def basic_search(query: str,
+                 max_results: int = 10,
+                 cache: Optional[SearchCache] = None,
+                 budget: Optional[BudgetController] = None) -> List[SearchResult]:
     """
     Perform a basic search using Exa's API.
     
     Args:
         query: Search query string
         max_results: Maximum number of results to return (default: 10)
+        cache: Search result cache (default: the shared cache from default_search_cache)
+        budget: Budget to check and charge for uncached searches
         
     Returns:
         List of SearchResult objects
@@ -65,29 +83,113 @@ def basic_search(query: str, max_results: int = 10) -> List[SearchResult]:
     Raises:
         ValueError: If the query is empty
         RuntimeError: If the API call fails
+        BudgetExceeded: If the search budget is used up
     """
     if not query.strip():
         raise ValueError("Search query cannot be empty")
     
-    try:
-        response = exa.search(query, num_results=max_results)
+    def search() -> List[dict]:
+        if budget is not None:
+            budget.check("search")
+            started = budget.clock()
+        response = _client(budget).search(query, num_results=max_results)
+        if budget is not None:
+            budget.charge_exa("search", seconds=budget.clock() - started)
         return [
-            SearchResult(
+            asdict(SearchResult(
                 result.title,
                 result.url,
                 result.published_date
-            ) for result in response.results
+            )) for result in response.results
+        ]
+
+    cache = cache if cache is not None else default_search_cache()
+    try:
+        if cache is None:
+            results = search()
+        else:
+            results, _ = cache.get_or_search(query, max_results, search, endpoint='search')
+        return [SearchResult(**result) for result in results]
+    except BudgetExceeded:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Search failed: {str(e)}") from e
+
+def search_with_contents(query: str,
+                         max_results: int = 10,
+                         contents: str = 'text',
+                         max_characters: int = 4000,
+                         cache: Optional[SearchCache] = None,
+                         budget: Optional[BudgetController] = None) -> List[SearchResult]:
+    """
+    Search and fetch each result's highlights, and optionally its text, in one request,
+    instead of a search followed by get_contents.
+    
+    Args:
+        query: Search query string
+        max_results: Maximum number of results to return (default: 10)
+        contents: 'text' for page text capped at max_characters plus highlights, or 'highlights' only
+        max_characters: Text characters kept per result
+        cache: Search result cache (default: the shared cache from default_search_cache)
+        budget: Budget to check and charge for uncached searches
+        
+    Returns:
+        List of SearchResult objects with text and highlights filled in
+        
+    Raises:
+        ValueError: If the query is empty or the contents mode is unknown
+        RuntimeError: If the API call fails
+        BudgetExceeded: If the search budget is used up
+    """
+    if not query.strip():
+        raise ValueError("Search query cannot be empty")
+    if contents not in CONTENT_MODES:
+        raise ValueError(f"Unknown contents mode {contents!r}, expected one of {CONTENT_MODES}")
+    
+    def search() -> List[dict]:
+        options = {'highlights': {'query': query}}
+        if contents == 'text':
+            options['text'] = {'max_characters': max_characters}
+        if budget is not None:
+            budget.check("search")
+            started = budget.clock()
+        response = _client(budget).search_and_contents(query, num_results=max_results, **options)
+        if budget is not None:
+            budget.charge_exa("search", seconds=budget.clock() - started)
+            budget.charge_exa("highlights", count=len(response.results))
+            if contents == 'text':
+                budget.charge_exa("contents", count=len(response.results))
+        return [
+            asdict(SearchResult(
+                result.title,
+                result.url,
+                result.published_date,
+                getattr(result, 'text', None) if contents == 'text' else None,
+                list(getattr(result, 'highlights', None) or [])
+            )) for result in response.results
         ]
+
+    cache = cache if cache is not None else default_search_cache()
+    try:
+        if cache is None:
+            results = search()
+        else:
+            results, _ = cache.get_or_search(query, max_results, search, endpoint='search_and_contents',
+                                             contents=contents, max_characters=max_characters)
+        return [SearchResult(**result) for result in results]
+    except BudgetExceeded:
+        raise
     except Exception as e:
         raise RuntimeError(f"Search failed: {str(e)}") from e
 
-def get_contents(urls: List[URL], chunk_size: int = 5) -> List[str]:
+def get_contents(urls: List[URL], chunk_size: int = 5, budget: Optional[BudgetController] = None) -> List[str]:
     """
     Get the contents of the URLs in batches.
     
     Args:
         urls: List of URLs to fetch
         chunk_size: Number of URLs to process in each batch (default: 5)
+        budget: Budget to check and charge per batch
         
     Returns:
         List of text contents corresponding to the URLs
@@ -95,6 +197,7 @@ def get_contents(urls: List[URL], chunk_size: int = 5) -> List[str]:
     Raises:
         ValueError: If any URL is invalid
         RuntimeError: If the API call fails
+        BudgetExceeded: If the search budget is used up
     """
     # Validate all URLs first
     validated_urls = [validate_url(url) for url in urls]
@@ -104,8 +207,15 @@ def get_contents(urls: List[URL], chunk_size: int = 5) -> List[str]:
         all_texts = []
         for i in range(0, len(validated_urls), chunk_size):
             chunk = validated_urls[i:i + chunk_size]
-            response = exa.get_contents(chunk, text=True)
+            if budget is not None:
+                budget.check("search")
+                started = budget.clock()
+            response = _client(budget).get_contents(chunk, text=True)
+            if budget is not None:
+                budget.charge_exa("contents", count=len(chunk), seconds=budget.clock() - started)
             all_texts.extend(result.text for result in response.results)
         return all_texts
+    except BudgetExceeded:
+        raise
     except Exception as e:
         raise RuntimeError(f"Content retrieval failed: {str(e)}") from e
@@ -0,0 +1,39 @@
+from typing import Callable, Iterator, List, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from models.base import ResearchResult
+
+def fan_out(queries: List[str],
+            search: Callable[[str], List[ResearchResult]],
+            seen_urls: Optional[Set[str]] = None,
+            max_workers: int = 8) -> Iterator[Tuple[str, List[ResearchResult]]]:
+    """
+    Run the searches for all queries at once and yield each query's results as it finishes,
+    so the whole batch takes about as long as the slowest query.
+
+    Results are merged in the calling thread: a URL already in seen_urls (or returned by an
+    earlier query of the batch) is dropped, and new URLs are added to seen_urls. An error
+    from a search is raised once the searches already in flight finish.
+
+    Args:
+        queries: Queries to search
+        search: Returns the results for one query
+        seen_urls: URLs to skip, updated as results arrive
+        max_workers: Searches in flight at once
+
+    Yields:
+        (query, new results) pairs in completion order
+    """
+    seen_urls = seen_urls if seen_urls is not None else set()
+    if not queries:
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(queries)), thread_name_prefix='search') as executor:
+        futures = {executor.submit(search, query): query for query in queries}
+        for future in as_completed(futures):
+            query = futures[future]
+            fresh = []
+            for result in future.result():
+                if result.url not in seen_urls:
+                    seen_urls.add(result.url)
+                    fresh.append(result)
+            yield query, fresh
@@ -0,0 +1,359 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+# Task states; done and failed are terminal
+PENDING, LEASED, DONE, FAILED = 'pending', 'leased', 'done', 'failed'
+
+@dataclass
+class Task:
+    """A unit of pipeline work and its delivery state."""
+    id: str
+    kind: str
+    payload: Dict[str, Any]
+    group: Optional[str]
+    status: str
+    attempts: int
+    max_attempts: int
+    idempotency_key: Optional[str] = None
+    lease_owner: Optional[str] = None
+    lease_expires: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+
+class Deferred(Exception):
+    """Raised by a handler whose task isn't ready yet (e.g. a join waiting on other tasks)."""
+
+    def __init__(self, delay: float = 1.0):
+        super().__init__(f"deferred for {delay}s")
+        self.delay = delay
+
+class QueueBackend(ABC):
+    """Durable task queue with leases. Workers only talk to a queue through this interface."""
+
+    @abstractmethod
+    def enqueue(self,
+                kind: str,
+                payload: Dict[str, Any],
+                idempotency_key: Optional[str] = None,
+                group: Optional[str] = None,
+                max_attempts: int = 3,
+                delay: float = 0.0) -> str:
+        """Add a task, returning its id. A task already enqueued with the same idempotency key is returned instead."""
+
+    @abstractmethod
+    def lease(self, worker_id: str, kinds: Optional[List[str]] = None, lease_seconds: float = 60.0) -> Optional[Task]:
+        """Claim the oldest available task, including ones whose previous lease expired."""
+
+    @abstractmethod
+    def heartbeat(self, worker_id: str, task_id: Optional[str] = None, lease_seconds: float = 60.0) -> bool:
+        """Record that a worker is alive and extend its lease. False means the lease was lost."""
+
+    @abstractmethod
+    def complete(self, task_id: str, worker_id: str, result: Any = None) -> bool:
+        """Mark a leased task done. False if the worker no longer holds the lease."""
+
+    @abstractmethod
+    def fail(self, task_id: str, worker_id: str, error: str, retry_delay: float = 0.0) -> bool:
+        """Release a failed task for retry, or mark it failed once its attempts are used up."""
+
+    @abstractmethod
+    def defer(self, task_id: str, worker_id: str, delay: float) -> bool:
+        """Release a leased task without counting the attempt."""
+
+    @abstractmethod
+    def get(self, task_id: str) -> Optional[Task]:
+        """Look up a task by id."""
+
+    @abstractmethod
+    def tasks(self, group: Optional[str] = None, kind: Optional[str] = None) -> List[Task]:
+        """Tasks, optionally filtered by group and kind, oldest first."""
+
+    def counts(self, group: Optional[str] = None) -> Dict[str, int]:
+        """Number of tasks in each state."""
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        for task in self.tasks(group=group):
+            counts[task.status] += 1
+        return counts
+
+class SQLiteQueue(QueueBackend):
+    """
+    Queue stored in a SQLite file, shared by worker processes on one machine.
+    Each process should open its own SQLiteQueue on the same path.
+    """
+
+    def __init__(self, path: str, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            path: SQLite file (':memory:' for a single-process queue)
+            clock: Time source in seconds, shared by every process using the file
+        """
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        if path != ':memory:':
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                task_group TEXT,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                idempotency_key TEXT UNIQUE,
+                available_at REAL NOT NULL,
+                lease_owner TEXT,
+                lease_expires REAL,
+                result TEXT,
+                error TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS tasks_available ON tasks (status, available_at);
+            CREATE INDEX IF NOT EXISTS tasks_group ON tasks (task_group, kind);
+            CREATE TABLE IF NOT EXISTS workers (
+                worker_id TEXT PRIMARY KEY,
+                last_seen REAL NOT NULL,
+                task_id TEXT
+            );
+        """)
+
+    def _task(self, row: sqlite3.Row) -> Task:
+        return Task(
+            id=row['id'],
+            kind=row['kind'],
+            payload=json.loads(row['payload']),
+            group=row['task_group'],
+            status=row['status'],
+            attempts=row['attempts'],
+            max_attempts=row['max_attempts'],
+            idempotency_key=row['idempotency_key'],
+            lease_owner=row['lease_owner'],
+            lease_expires=row['lease_expires'],
+            result=json.loads(row['result']) if row['result'] is not None else None,
+            error=row['error']
+        )
+
+    def enqueue(self,
+                kind: str,
+                payload: Dict[str, Any],
+                idempotency_key: Optional[str] = None,
+                group: Optional[str] = None,
+                max_attempts: int = 3,
+                delay: float = 0.0) -> str:
+        now = self.clock()
+        task_id = uuid.uuid4().hex
+        with self._lock:
+            cursor = self._db.execute(
+                """INSERT OR IGNORE INTO tasks
+                   (id, kind, payload, task_group, status, max_attempts, idempotency_key, available_at, created, updated)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (task_id, kind, json.dumps(payload), group, PENDING, max_attempts, idempotency_key, now + delay, now, now)
+            )
+            if cursor.rowcount == 0:
+                return self._db.execute("SELECT id FROM tasks WHERE idempotency_key = ?", (idempotency_key,)).fetchone()['id']
+        return task_id
+
+    def lease(self, worker_id: str, kinds: Optional[List[str]] = None, lease_seconds: float = 60.0) -> Optional[Task]:
+        now = self.clock()
+        kind_filter = f"AND kind IN ({','.join('?' * len(kinds))})" if kinds else ""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Leases that ran out with no attempts left belong to workers that kept crashing
+                self._db.execute(
+                    "UPDATE tasks SET status = ?, error = 'lease expired', lease_owner = NULL, updated = ? "
+                    "WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts",
+                    (FAILED, now, LEASED, now)
+                )
+                row = self._db.execute(
+                    f"""SELECT * FROM tasks
+                        WHERE ((status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?)) {kind_filter}
+                        ORDER BY available_at, created LIMIT 1""",
+                    (PENDING, now, LEASED, now, *(kinds or []))
+                ).fetchone()
+                if row is None:
+                    self._db.execute("COMMIT")
+                    return None
+                self._db.execute(
+                    "UPDATE tasks SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ?, updated = ? "
+                    "WHERE id = ?",
+                    (LEASED, worker_id, now + lease_seconds, now, row['id'])
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO workers (worker_id, last_seen, task_id) VALUES (?, ?, ?)",
+                    (worker_id, now, row['id'])
+                )
+                task = self._task(self._db.execute("SELECT * FROM tasks WHERE id = ?", (row['id'],)).fetchone())
+                self._db.execute("COMMIT")
+                return task
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _update_leased(self, task_id: str, worker_id: str, sql: str, params: tuple) -> bool:
+        """Apply an update only while worker_id still holds the lease on task_id."""
+        with self._lock:
+            cursor = self._db.execute(
+                f"UPDATE tasks SET {sql}, lease_owner = NULL, lease_expires = NULL, updated = ? "
+                "WHERE id = ? AND status = ? AND lease_owner = ?",
+                (*params, self.clock(), task_id, LEASED, worker_id)
+            )
+            self._db.execute("UPDATE workers SET task_id = NULL, last_seen = ? WHERE worker_id = ?",
+                             (self.clock(), worker_id))
+            return cursor.rowcount == 1
+
+    def heartbeat(self, worker_id: str, task_id: Optional[str] = None, lease_seconds: float = 60.0) -> bool:
+        now = self.clock()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO workers (worker_id, last_seen, task_id) VALUES (?, ?, ?)",
+                             (worker_id, now, task_id))
+            if task_id is None:
+                return True
+            cursor = self._db.execute(
+                "UPDATE tasks SET lease_expires = ?, updated = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+                (now + lease_seconds, now, task_id, LEASED, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, task_id: str, worker_id: str, result: Any = None) -> bool:
+        return self._update_leased(task_id, worker_id, "status = ?, result = ?, error = NULL",
+                                   (DONE, json.dumps(result)))
+
+    def fail(self, task_id: str, worker_id: str, error: str, retry_delay: float = 0.0) -> bool:
+        return self._update_leased(
+            task_id, worker_id,
+            "status = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END, error = ?, available_at = ?",
+            (FAILED, PENDING, error, self.clock() + retry_delay)
+        )
+
+    def defer(self, task_id: str, worker_id: str, delay: float) -> bool:
+        return self._update_leased(task_id, worker_id, "status = ?, attempts = attempts - 1, available_at = ?",
+                                   (PENDING, self.clock() + delay))
+
+    def get(self, task_id: str) -> Optional[Task]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return self._task(row) if row else None
+
+    def tasks(self, group: Optional[str] = None, kind: Optional[str] = None) -> List[Task]:
+        conditions, params = [], []
+        if group is not None:
+            conditions.append("task_group = ?")
+            params.append(group)
+        if kind is not None:
+            conditions.append("kind = ?")
+            params.append(kind)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            rows = self._db.execute(f"SELECT * FROM tasks {where} ORDER BY created", params).fetchall()
+        return [self._task(row) for row in rows]
+
+    def counts(self, group: Optional[str] = None) -> Dict[str, int]:
+        # Count in SQLite rather than loading and decoding every payload in the queue's history
+        where, params = ("WHERE task_group = ?", (group,)) if group is not None else ("", ())
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        with self._lock:
+            for row in self._db.execute(f"SELECT status, COUNT(*) FROM tasks {where} GROUP BY status", params):
+                counts[row[0]] = row[1]
+        return counts
+
+    def workers(self) -> List[Dict[str, Any]]:
+        """Workers seen so far, with their last heartbeat and current task."""
+        with self._lock:
+            return [dict(row) for row in self._db.execute("SELECT * FROM workers ORDER BY worker_id")]
+
+# Handlers get the leased task and the queue (to enqueue follow-up tasks) and return a JSON-serializable result
+Handler = Callable[[Task, QueueBackend], Any]
+
+class QueueWorker:
+    """
+    Pulls tasks from a queue and runs the handler for their kind, renewing the lease
+    from a heartbeat thread while the handler runs. If the worker dies, its lease
+    expires and another worker picks the task up.
+    """
+
+    def __init__(self,
+                 queue: QueueBackend,
+                 handlers: Dict[str, Handler],
+                 worker_id: Optional[str] = None,
+                 lease_seconds: float = 60.0,
+                 poll_interval: float = 0.5,
+                 retry_delay: float = 5.0):
+        """
+        Args:
+            queue: Queue to pull from
+            handlers: Handler per task kind; only these kinds are leased
+            worker_id: Name for leases and heartbeats (default: host, pid and a random suffix)
+            lease_seconds: Lease length; heartbeats renew it every third of this
+            poll_interval: Sleep between polls when the queue is empty
+            retry_delay: Delay before a failed task can be retried
+        """
+        self.queue = queue
+        self.handlers = handlers
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.processed = 0
+
+    def _heartbeat(self, task_id: str, stop: threading.Event):
+        while not stop.wait(self.lease_seconds / 3):
+            if not self.queue.heartbeat(self.worker_id, task_id, self.lease_seconds):
+                print(f"Worker {self.worker_id} lost the lease on task {task_id}")
+                return
+
+    def run_one(self) -> bool:
+        """Lease and run a single task. Returns False if none was available."""
+        task = self.queue.lease(self.worker_id, list(self.handlers), self.lease_seconds)
+        if task is None:
+            return False
+
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(task.id, stop), daemon=True)
+        heartbeat.start()
+        try:
+            result = self.handlers[task.kind](task, self.queue)
+        except Deferred as e:
+            self.queue.defer(task.id, self.worker_id, e.delay)
+        except Exception as e:
+            print(f"Task {task.kind} {task.id} failed (attempt {task.attempts}/{task.max_attempts}): {e}")
+            self.queue.fail(task.id, self.worker_id, f"{type(e).__name__}: {e}", self.retry_delay)
+        else:
+            self.queue.complete(task.id, self.worker_id, result)
+        finally:
+            stop.set()
+            heartbeat.join()
+        self.processed += 1
+        return True
+
+    def run(self, stop_when_idle: bool = False, max_tasks: Optional[int] = None):
+        """
+        Process tasks until stopped.
+
+        Args:
+            stop_when_idle: Return once every task is done or failed instead of polling
+            max_tasks: Return after this many tasks
+        """
+        while max_tasks is None or self.processed < max_tasks:
+            if not self.run_one():
+                self.queue.heartbeat(self.worker_id)
+                if stop_when_idle:
+                    # Deferred and other workers' tasks may still produce work
+                    counts = self.queue.counts()
+                    if counts[PENDING] + counts[LEASED] == 0:
+                        return
+                time.sleep(self.poll_interval)
@@ -0,0 +1,103 @@
+from typing import Any, Dict, List, Sequence, Tuple
+import numpy as np
+
+def force_layout(num_nodes: int,
+                 edges: Sequence[Tuple[int, int]],
+                 width: float = 1000.0,
+                 height: float = 600.0,
+                 iterations: int = 100,
+                 seed: int = 0) -> np.ndarray:
+    """
+    Compute a force-directed (Fruchterman-Reingold) layout with vectorized NumPy.
+
+    Args:
+        num_nodes: Number of nodes
+        edges: Pairs of node indices that attract each other
+        width: Width of the layout frame
+        height: Height of the layout frame
+        iterations: Number of cooling steps
+        seed: Seed for the initial positions, so layouts are reproducible
+
+    Returns:
+        Array of shape (num_nodes, 2) with x, y positions inside the frame
+    """
+    if num_nodes == 0:
+        return np.zeros((0, 2))
+    center = np.array([width / 2, height / 2], dtype=np.float32)
+    if num_nodes == 1:
+        return center[None, :].copy()
+
+    rng = np.random.default_rng(seed)
+    pos = (rng.uniform(0.25, 0.75, size=(num_nodes, 2)) * [width, height]).astype(np.float32)
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+
+    k = np.float32(np.sqrt(width * height / num_nodes))  # Ideal edge length
+    temperature = max(width, height) / 10
+    cooling = temperature / (iterations + 1)
+    margin = 0.05 * min(width, height)
+    gravity = np.float32(0.3 * k / min(width, height))
+
+    for _ in range(iterations):
+        # Repulsion between every pair of nodes, on separate x/y matrices to keep temporaries small
+        dx = pos[:, 0, None] - pos[None, :, 0]
+        dy = pos[:, 1, None] - pos[None, :, 1]
+        strength = k * k / np.maximum(dx * dx + dy * dy, np.float32(1e-4))
+        disp = np.stack([(dx * strength).sum(axis=1), (dy * strength).sum(axis=1)], axis=1)
+
+        # Attraction along edges
+        if len(edges):
+            edge_delta = pos[edges[:, 0]] - pos[edges[:, 1]]
+            edge_dist = np.linalg.norm(edge_delta, axis=1)
+            pull = edge_delta * (edge_dist / k)[:, None]
+            np.add.at(disp, edges[:, 0], -pull)
+            np.add.at(disp, edges[:, 1], pull)
+
+        # Gravity towards the center keeps large graphs off the frame edges
+        offset = center - pos
+        disp += offset * gravity * np.linalg.norm(offset, axis=1)[:, None]
+
+        length = np.maximum(np.linalg.norm(disp, axis=1), np.float32(1e-9))
+        pos += disp / length[:, None] * np.minimum(length, temperature)[:, None]
+        pos = np.clip(pos, margin, [width - margin, height - margin]).astype(np.float32)
+        temperature -= cooling
+
+    return pos
+
+def findings_network(report: Dict[str, Any], width: float = 1000.0, height: float = 600.0) -> Dict[str, Any]:
+    """
+    Build the findings network for a report with precomputed node positions.
+    Sources are shared between the findings they support.
+
+    Returns:
+        Dictionary with nodes (id, type, text, url, x, y), links, width and height
+    """
+    nodes: List[Dict[str, Any]] = []
+    links: List[Dict[str, str]] = []
+    edges: List[Tuple[int, int]] = []
+    source_index: Dict[str, int] = {}
+
+    for i, finding in enumerate(report.get('key_findings', [])):
+        if not isinstance(finding, dict):
+            finding = {'finding': finding, 'supporting_sources': []}
+        finding_index = len(nodes)
+        nodes.append({'id': f'finding-{i}', 'type': 'finding', 'text': finding.get('finding', '')})
+
+        for source in finding.get('supporting_sources', []):
+            key = source.get('url') or source.get('title', '')
+            if key not in source_index:
+                source_index[key] = len(nodes)
+                nodes.append({
+                    'id': f'source-{len(source_index) - 1}',
+                    'type': 'source',
+                    'text': source.get('title', ''),
+                    'url': source.get('url')
+                })
+            edges.append((finding_index, source_index[key]))
+            links.append({'source': nodes[finding_index]['id'], 'target': nodes[source_index[key]]['id']})
+
+    positions = force_layout(len(nodes), edges, width, height)
+    for node, (x, y) in zip(nodes, positions):
+        node['x'] = round(float(x), 1)
+        node['y'] = round(float(y), 1)
+
+    return {'nodes': nodes, 'links': links, 'width': width, 'height': height}
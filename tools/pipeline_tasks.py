@@ -0,0 +1,127 @@
+from typing import Any, Dict, List, Optional
+from dataclasses import asdict
+from multiprocessing import Process
+import argparse
+import hashlib
+import uuid
+
+from .job_queue import DONE, FAILED, LEASED, PENDING, Deferred, Handler, QueueBackend, QueueWorker, SQLiteQueue, Task
+from models.base import ResearchResult, SourceAnalysis
+from models.openai_model import OpenAIModel
+
+# Task kinds, in pipeline order
+KINDS = ['query', 'fetch', 'analysis', 'synthesis']
+
+def _source_analysis(data: Dict[str, Any]) -> SourceAnalysis:
+    return SourceAnalysis(**{**data, 'source': ResearchResult(**data['source'])})
+
+def submit_research(queue: QueueBackend, topic: str, queries: List[str], run_id: Optional[str] = None) -> str:
+    """
+    Enqueue a research run: one task per query, plus a synthesis task that waits for the rest.
+    Submitting the same run_id again adds nothing.
+
+    Returns:
+        The run id, which groups the run's tasks
+    """
+    run_id = run_id or uuid.uuid4().hex[:12]
+    for query in queries:
+        queue.enqueue('query', {'topic': topic, 'query': query}, idempotency_key=f"{run_id}:query:{query}", group=run_id)
+    queue.enqueue('synthesis', {'topic': topic}, idempotency_key=f"{run_id}:synthesis", group=run_id)
+    return run_id
+
+def run_report(queue: QueueBackend, run_id: str) -> Optional[Dict[str, Any]]:
+    """The synthesized report of a run, or None if it hasn't finished."""
+    for task in queue.tasks(group=run_id, kind='synthesis'):
+        if task.status == DONE:
+            return task.result
+    return None
+
+def pipeline_handlers(model: OpenAIModel,
+                      sources_per_query: int = 3,
+                      chunk_size: int = 5,
+                      max_length: int = 2000) -> Dict[str, Handler]:
+    """
+    Task handlers for the research pipeline, built on the existing model and Exa functions.
+
+    Args:
+        model: Model used for evaluation, analysis and synthesis
+        sources_per_query: Best-scored sources kept from each query's search results
+        chunk_size: URLs per content fetch task
+        max_length: Token length above which sources are summarized before analysis
+    """
+    from tools.exa import basic_search, get_contents  # Needs EXA_API_KEY, so only imported by workers
+
+    def query(task: Task, queue: QueueBackend) -> Dict[str, Any]:
+        topic, query_text = task.payload['topic'], task.payload['query']
+        results = [
+            ResearchResult(title=r.title, url=r.url, published_date=r.published_date or "Unknown")
+            for r in basic_search(query_text, max_results=10)
+        ]
+        ranked = model.evaluate_sources(results, topic, max_sources=sources_per_query)
+        for i in range(0, len(ranked), chunk_size):
+            chunk = [asdict(r) for r in ranked[i:i + chunk_size]]
+            digest = hashlib.sha1(''.join(r['url'] for r in chunk).encode('utf-8')).hexdigest()[:16]
+            queue.enqueue('fetch', {'topic': topic, 'sources': chunk},
+                          idempotency_key=f"{task.group}:fetch:{digest}", group=task.group)
+        return {'sources': len(ranked)}
+
+    def fetch(task: Task, queue: QueueBackend) -> Dict[str, Any]:
+        sources = task.payload['sources']
+        texts = get_contents([s['url'] for s in sources])
+        for source, text in zip(sources, texts):
+            # The same URL found by two queries is analyzed once per run
+            queue.enqueue('analysis', {'topic': task.payload['topic'], 'source': {**source, 'content': text}},
+                          idempotency_key=f"{task.group}:analysis:{source['url']}", group=task.group)
+        return {'fetched': len(texts)}
+
+    def analysis(task: Task, queue: QueueBackend) -> Dict[str, Any]:
+        source = ResearchResult(**task.payload['source'])
+        return asdict(model.summarize_and_analyze(source, max_length=max_length))
+
+    def synthesis(task: Task, queue: QueueBackend) -> Dict[str, Any]:
+        counts = queue.counts(group=task.group)
+        # This task holds one of the leases; anything else unfinished means upstream work remains
+        if counts[PENDING] + counts[LEASED] > 1:
+            raise Deferred(2.0)
+        analyses = [_source_analysis(t.result) for t in queue.tasks(group=task.group, kind='analysis') if t.status == DONE]
+        if not analyses:
+            raise RuntimeError(f"No sources were analyzed for run {task.group} ({counts[FAILED]} tasks failed)")
+        return asdict(model.synthesize_research(analyses, task.payload['topic']))
+
+    return {'query': query, 'fetch': fetch, 'analysis': analysis, 'synthesis': synthesis}
+
+def run_worker(db_path: str, stop_when_idle: bool = False):
+    """Run one worker process against a queue file."""
+    worker = QueueWorker(SQLiteQueue(db_path), pipeline_handlers(OpenAIModel()))
+    print(f"Worker {worker.worker_id} started")
+    worker.run(stop_when_idle=stop_when_idle)
+    print(f"Worker {worker.worker_id} processed {worker.processed} tasks")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the research pipeline on a durable job queue")
+    parser.add_argument('--db', default='jobs/queue.sqlite', help="Queue file shared by all workers")
+    commands = parser.add_subparsers(dest='command', required=True)
+    submit = commands.add_parser('submit', help="Enqueue a research run")
+    submit.add_argument('topic')
+    submit.add_argument('queries', nargs='+')
+    workers = commands.add_parser('worker', help="Process tasks")
+    workers.add_argument('--processes', type=int, default=1)
+    workers.add_argument('--stop-when-idle', action='store_true')
+    status = commands.add_parser('status', help="Show task counts for a run")
+    status.add_argument('run_id')
+    args = parser.parse_args()
+
+    if args.command == 'submit':
+        print(submit_research(SQLiteQueue(args.db), args.topic, args.queries))
+    elif args.command == 'worker':
+        processes = [Process(target=run_worker, args=(args.db, args.stop_when_idle)) for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    else:
+        queue = SQLiteQueue(args.db)
+        print(queue.counts(group=args.run_id))
+        report = run_report(queue, args.run_id)
+        if report:
+            print(report['title'])
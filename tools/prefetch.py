@@ -0,0 +1,121 @@
+from typing import Callable, Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+
+class ContentPrefetcher:
+    """
+    Speculatively fetches page contents for the sources most likely to be selected,
+    so fetching overlaps with source evaluation instead of following it.
+
+    Fetches are started in rank order, at most max_workers at a time, as workers free up.
+    When the ranking changes, URLs that fall out of the window before a worker is free
+    are never started and running ones are left to finish. Fetches beyond the top_k are speculative: once max_wasted fetches
+    have been spent on URLs that are no longer wanted, only the top_k are fetched.
+    """
+
+    def __init__(self,
+                 fetch: Callable[[str], Optional[str]],
+                 top_k: int = 5,
+                 lookahead: int = 3,
+                 max_workers: int = 4,
+                 max_wasted: int = 3):
+        """
+        Args:
+            fetch: Returns the text of a URL (or None)
+            top_k: Number of sources expected to be used
+            lookahead: Extra sources past top_k to fetch speculatively
+            max_workers: Concurrent fetches
+            max_wasted: Fetches allowed for URLs that end up outside the top_k
+        """
+        self.fetch = fetch
+        self.top_k = top_k
+        self.lookahead = lookahead
+        self.max_workers = max_workers
+        self.max_wasted = max_wasted
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch')
+        # Re-entrant: a fetch that finishes before its callback is added runs the callback in _pump
+        self._lock = threading.RLock()
+        self._ranking: List[str] = []
+        self._futures: Dict[str, Future] = {}
+        self._direct = set()  # URLs get() fetched itself rather than waiting on a prefetch
+        self._running = 0
+
+    def _wasted(self) -> int:
+        """Started prefetches for URLs currently outside the top_k."""
+        wanted = set(self._ranking[:self.top_k])
+        return sum(1 for url in self._futures if url not in wanted and url not in self._direct)
+
+    def _pump(self):
+        """Start fetches for the best-ranked unfetched URLs while workers are free. Caller holds the lock."""
+        wasted = self._wasted()
+        for rank, url in enumerate(self._ranking[:self.top_k + self.lookahead]):
+            if self._running >= self.max_workers:
+                break
+            if url in self._futures:
+                continue
+            if rank >= self.top_k:
+                # Speculative fetch; counts as wasted unless the URL moves into the top_k
+                if wasted >= self.max_wasted:
+                    break
+                wasted += 1
+            self._running += 1
+            future = self._executor.submit(self.fetch, url)
+            self._futures[url] = future
+            future.add_done_callback(self._done)
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._running -= 1
+            self._pump()
+
+    def update(self, ranked_urls: List[str]):
+        """Set the current best guess of which URLs will be used, most likely first."""
+        with self._lock:
+            self._ranking = list(dict.fromkeys(ranked_urls))
+            self._pump()
+
+    def get(self, url: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Return the text for a URL, waiting for its prefetch or fetching it now."""
+        with self._lock:
+            future = self._futures.get(url)
+            if future is None:
+                # Claim the URL so the prefetcher does not start a second fetch for it
+                claimed = Future()
+                claimed.set_running_or_notify_cancel()
+                self._futures[url] = claimed
+                self._direct.add(url)
+        if future is None:
+            try:
+                text = self.fetch(url)
+            except Exception as e:
+                claimed.set_exception(e)
+                raise
+            claimed.set_result(text)
+            return text
+        try:
+            return future.result(timeout=timeout)
+        except Exception as e:
+            print(f"Prefetch failed for {url}: {e}")
+            return self.fetch(url)
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of started, completed and wasted prefetches (URLs get() fetched itself are left out)."""
+        with self._lock:
+            prefetched = [f for url, f in self._futures.items() if url not in self._direct]
+            return {
+                'started': len(prefetched),
+                'completed': sum(1 for f in prefetched if f.done()),
+                'wasted': self._wasted()
+            }
+
+    def close(self):
+        """Stop starting fetches and wait for running ones."""
+        with self._lock:
+            self._ranking = []
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'ContentPrefetcher':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
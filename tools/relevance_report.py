@@ -0,0 +1,29 @@
+from typing import List, Optional
+import argparse
+import os
+
+from models.relevance import Judgment, JudgmentLog, RelevanceScorer, evaluate_scorer, format_report, judgments_from_archive
+from .analysis import ResearchArchive
+
+def load_judgments(log_path: Optional[str] = None, archive_dir: Optional[str] = None) -> List[Judgment]:
+    """Judgments from a judgment log and/or the sources of an archive."""
+    judgments = JudgmentLog(log_path).load() if log_path else []
+    if archive_dir:
+        judgments.extend(judgments_from_archive(ResearchArchive(archive_dir)))
+    return judgments
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the local relevance scorer with logged LLM scores")
+    parser.add_argument('--log', default=os.getenv('RELEVANCE_JUDGMENTS'), help="Judgment log (JSONL)")
+    parser.add_argument('--archive', help="Also train on the sources of a research archive")
+    parser.add_argument('--test-fraction', type=float, default=0.2, help="Share of queries held out")
+    parser.add_argument('--max-uncertainty', type=float, default=1.0, help="Routing threshold in score points")
+    parser.add_argument('--save', help="Fit on all judgments and save the model here (.npz), for RELEVANCE_MODEL")
+    args = parser.parse_args()
+
+    judgments = load_judgments(args.log, args.archive)
+    print(f"{len(judgments)} judgments for {len({j.query for j in judgments})} queries\n")
+    print(format_report(evaluate_scorer(judgments, args.test_fraction, args.max_uncertainty)))
+    if args.save:
+        RelevanceScorer(max_uncertainty=args.max_uncertainty).fit(judgments).save(args.save)
+        print(f"\nModel saved to {args.save}")
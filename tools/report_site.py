@@ -0,0 +1,178 @@
+from typing import Dict, Any, List, Optional, Union
+from pathlib import Path
+from collections import Counter
+import hashlib
+import json
+import re
+import time
+
+from .report_visualizer import ReportVisualizer, report_to_dict, TEMPLATE_DIR
+from models.base import ResearchReport
+from models.profiling import profiled
+
+MANIFEST_NAME = 'manifest.json'
+SEARCH_INDEX_NAME = 'search_index.js'
+INDEX_NAME = 'index.html'
+
+# Field weights for the search index
+FIELD_WEIGHTS = {'title': 3, 'key_findings': 2, 'summary': 1}
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'into', 'is', 'it',
+    'of', 'on', 'or', 'that', 'the', 'their', 'this', 'to', 'was', 'were', 'with'
+}
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search terms. Must match the tokenizer in report_index.html."""
+    return [t for t in re.findall(r'[a-z0-9]+', text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+def _file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+def _page_name(archive_name: str) -> str:
+    return f"{Path(archive_name).stem}.html"
+
+def _finding_text(finding: Union[str, Dict[str, Any]]) -> str:
+    return finding.get('finding', '') if isinstance(finding, dict) else finding
+
+class ReportSiteBuilder:
+    """
+    Builds a static site over archived reports: one HTML page per report, an index page
+    and a client-side search index. Only new or changed reports are re-rendered.
+
+    Reports are archived as JSON files in data_dir; the manifest in output_dir records
+    each file's content hash and the metadata the index and search pages need.
+    """
+
+    def __init__(self,
+                 data_dir: str = 'reports/data',
+                 output_dir: str = 'reports',
+                 template: str = 'basic_report.html',
+                 visualizer: Optional[ReportVisualizer] = None):
+        self.data_dir = Path(data_dir)
+        self.output_dir = Path(output_dir)
+        self.template = template
+        self.visualizer = visualizer or ReportVisualizer()
+
+    def add_report(self, report: Union[ResearchReport, Dict[str, Any]]) -> Path:
+        """Archive a report as JSON, named by its content hash. Returns the archived file."""
+        data = report_to_dict(report) if isinstance(report, ResearchReport) else report
+        payload = json.dumps(data, sort_keys=True, default=str).encode('utf-8')
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        path = self.data_dir / f"{hashlib.sha256(payload).hexdigest()[:16]}.json"
+        if not path.exists():
+            path.write_bytes(payload)
+        return path
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        manifest_file = self.output_dir / MANIFEST_NAME
+        if manifest_file.exists():
+            return json.loads(manifest_file.read_text())
+        return {'template_hash': None, 'reports': {}}
+
+    def _template_hash(self) -> str:
+        sources = [self.template, 'report_index.html']
+        return hashlib.sha256(b''.join((TEMPLATE_DIR / name).read_bytes() for name in sources)).hexdigest()
+
+    def _entry(self, name: str, stat, file_hash: str, report: Dict[str, Any], html: str) -> Dict[str, Any]:
+        terms = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            value = report.get(field, '')
+            text = ' '.join(_finding_text(f) for f in value) if isinstance(value, list) else value
+            for term in tokenize(text):
+                terms[term] += weight
+
+        return {
+            'hash': file_hash,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'html': Path(html).name,
+            'title': report.get('title', name),
+            'summary': report.get('summary', ''),
+            'date': report.get('metadata', {}).get('date_range', {}).get('latest', ''),
+            'terms': dict(terms)
+        }
+
+    @profiled("site")
+    def build(self, max_workers: Optional[int] = None) -> Dict[str, List[str]]:
+        """
+        Bring the site up to date with the archive.
+
+        Args:
+            max_workers: Worker processes for rendering changed reports (default: one per CPU)
+
+        Returns:
+            Names of the archived reports that were added, updated and removed
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self._load_manifest()
+        entries = manifest['reports']
+
+        template_hash = self._template_hash()
+        rebuild_all = manifest.get('template_hash') != template_hash
+
+        # Find new and changed reports; unchanged size and mtime means the hash can be reused
+        current = {path.name: path for path in sorted(self.data_dir.glob('*.json'))} if self.data_dir.exists() else {}
+        changed: Dict[str, Any] = {}
+        added, updated = [], []
+        for name, path in current.items():
+            stat = path.stat()
+            entry = entries.get(name)
+            if entry and not rebuild_all and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                continue
+            file_hash = _file_hash(path)
+            if entry and not rebuild_all and entry['hash'] == file_hash:
+                entry['mtime_ns'], entry['size'] = stat.st_mtime_ns, stat.st_size
+                continue
+            changed[name] = (stat, file_hash)
+            (updated if entry else added).append(name)
+
+        removed = [name for name in entries if name not in current]
+        for name in removed:
+            (self.output_dir / entries.pop(name)['html']).unlink(missing_ok=True)
+
+        if changed:
+            names = list(changed)
+            reports = [json.loads(current[name].read_text()) for name in names]
+            # Pages are named after the archive key, so reports sharing a title and date don't collide
+            pages = self.visualizer.render_many(reports, str(self.output_dir), self.template, max_workers=max_workers,
+                                                filenames=[_page_name(name) for name in names])
+            for name, report, html in zip(names, reports, pages):
+                stat, file_hash = changed[name]
+                old = entries.get(name)
+                if old and old['html'] != Path(html).name:
+                    (self.output_dir / old['html']).unlink(missing_ok=True)
+                entries[name] = self._entry(name, stat, file_hash, report, html)
+
+        if changed or removed or rebuild_all or not (self.output_dir / INDEX_NAME).exists():
+            self._write_search_index(entries)
+            self._write_index(entries)
+
+        manifest['template_hash'] = template_hash
+        manifest['built_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        (self.output_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=1, sort_keys=True))
+
+        return {'added': added, 'updated': updated, 'removed': removed}
+
+    def _ordered(self, entries: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return sorted(entries.values(), key=lambda e: (e['date'], e['title']), reverse=True)
+
+    def _write_search_index(self, entries: Dict[str, Any]):
+        """Write an inverted index (term -> [[document, weight], ...]) as a script the index page loads."""
+        docs = self._ordered(entries)
+        index: Dict[str, List[List[int]]] = {}
+        for doc_id, entry in enumerate(docs):
+            for term, weight in entry['terms'].items():
+                index.setdefault(term, []).append([doc_id, weight])
+
+        data = {
+            'docs': [{'title': e['title'], 'url': e['html'], 'date': e['date']} for e in docs],
+            'index': index
+        }
+        script = 'window.REPORT_SEARCH_INDEX = ' + json.dumps(data, separators=(',', ':'), sort_keys=True) + ';\n'
+        (self.output_dir / SEARCH_INDEX_NAME).write_text(script, encoding='utf-8')
+
+    def _write_index(self, entries: Dict[str, Any]):
+        template = self.visualizer.get_template('report_index.html')
+        with open(self.output_dir / INDEX_NAME, 'w', encoding='utf-8') as f:
+            f.writelines(template.generate(reports=self._ordered(entries), search_index=SEARCH_INDEX_NAME))
@@ -1,434 +1,207 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from pathlib import Path
-from jinja2 import Environment, FileSystemLoader
+from dataclasses import asdict
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, Template
+import gzip
 import json
 import os
+from .layout import findings_network
+from models.base import ResearchReport
+from models.profiling import profiled
+
+TEMPLATE_DIR = Path(__file__).parent / 'templates'
+
+# How report data is embedded for client-side visualizations
+DATA_MODES = ('inline', 'external')
+
+# Templates that draw the findings network and need a precomputed layout
+NETWORK_TEMPLATES = ('d3_report.html',)
+
+def default_cache_dir() -> Path:
+    """Location of the compiled template cache, outside the package directory."""
+    override = os.getenv('REPORT_TEMPLATE_CACHE')
+    if override:
+        return Path(override)
+    cache_home = Path(os.getenv('XDG_CACHE_HOME') or Path.home() / '.cache')
+    return cache_home / 'exa-researcher' / 'jinja'
+
+@lru_cache(maxsize=None)
+def _environment(cache_dir: Optional[str]) -> Environment:
+    """Build one Jinja2 environment per cache location per process."""
+    bytecode_cache = None
+    if cache_dir:
+        try:
+            Path(cache_dir).mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(cache_dir)
+        except OSError:
+            # Read-only home directories still render, just without the disk cache
+            bytecode_cache = None
+    # Templates ship with the package and don't change at runtime, so skip mtime checks
+    return Environment(
+        loader=FileSystemLoader(str(TEMPLATE_DIR)),
+        bytecode_cache=bytecode_cache,
+        auto_reload=False
+    )
+
+def report_to_dict(report: ResearchReport) -> Dict[str, Any]:
+    """Convert a ResearchReport into the dictionary shape the templates expect."""
+    data = asdict(report)
+    citations = {c['finding']: c['supporting_sources'] for c in report.finding_citations}
+    data['key_findings'] = [
+        finding if isinstance(finding, dict) else {'finding': finding, 'supporting_sources': citations.get(finding, [])}
+        for finding in report.key_findings
+    ]
+    del data['finding_citations']
+
+    dates = sorted(
+        a.source.published_date[:10] for a in report.source_analyses
+        if a.source.published_date and a.source.published_date != "Unknown"
+    )
+    completed = report.timeline[-1]['date'] if report.timeline else ''
+    data['metadata'] = {
+        **report.metadata,
+        'sources_analyzed': len(report.source_analyses),
+        'date_range': {
+            'earliest': dates[0] if dates else completed,
+            'latest': dates[-1] if dates else completed
+        }
+    }
+    return data
+
+# Per-process visualizer used by render_many workers
+_worker_visualizer = None
+
+def _init_worker(cache_dir: Optional[str]):
+    global _worker_visualizer
+    _worker_visualizer = ReportVisualizer(cache_dir=cache_dir)
+
+def _render_worker(args) -> str:
+    report, output_dir, template, data_mode, live_layout, filename = args
+    return _worker_visualizer._write(report, Path(output_dir), template, data_mode, live_layout, filename)
 
 class ReportVisualizer:
-    def __init__(self):
-        # Set up Jinja2 environment
-        template_dir = Path(__file__).parent / 'templates'
-        template_dir.mkdir(exist_ok=True)
-        self.env = Environment(loader=FileSystemLoader(str(template_dir)))
-        
-        # Create template files if they don't exist
-        self._create_templates()
-    
-    def _create_templates(self):
-        """Create the necessary template files if they don't exist."""
-        template_dir = Path(__file__).parent / 'templates'
-        
-        # Basic HTML template
-        basic_template = template_dir / 'basic_report.html'
-        if not basic_template.exists():
-            basic_template.write_text("""
-<!DOCTYPE html>
-<html>
-<head>
-    <title>{{ report.title }}</title>
-    <style>
-        body {
-            font-family: Arial, sans-serif;
-            line-height: 1.6;
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-        }
-        .report-header {
-            text-align: center;
-            margin-bottom: 30px;
-        }
-        .summary {
-            background-color: #f5f5f5;
-            padding: 20px;
-            border-radius: 5px;
-            margin-bottom: 30px;
-        }
-        .finding {
-            margin-bottom: 20px;
-            padding: 15px;
-            border: 1px solid #ddd;
-            border-radius: 5px;
-        }
-        .source {
-            margin-left: 20px;
-            font-size: 0.9em;
-            color: #666;
-        }
-        .quote {
-            margin: 10px 0;
-            padding: 10px;
-            background-color: #f9f9f9;
-            border-left: 3px solid #ddd;
-        }
-        .timeline {
-            margin: 40px 0;
-        }
-        .event {
-            display: flex;
-            margin-bottom: 15px;
-        }
-        .event-date {
-            width: 120px;
-            font-weight: bold;
-        }
-        .event-details {
-            flex: 1;
-        }
-        .metadata {
-            margin-top: 40px;
-            padding-top: 20px;
-            border-top: 1px solid #ddd;
-            font-size: 0.9em;
-            color: #666;
-        }
-    </style>
-</head>
-<body>
-    <div class="report-header">
-        <h1>{{ report.title }}</h1>
-    </div>
-    
-    <div class="summary">
-        <h2>Executive Summary</h2>
-        <p>{{ report.summary }}</p>
-    </div>
-    
-    <div class="key-findings">
-        <h2>Key Findings</h2>
-        {% for finding in report.key_findings %}
-        <div class="finding">
-            <h3>{{ finding.finding }}</h3>
-            {% for source in finding.supporting_sources %}
-            <div class="source">
-                <a href="{{ source.url }}" target="_blank">{{ source.title }}</a>
-                <div class="quote">{{ source.quote }}</div>
-            </div>
-            {% endfor %}
-        </div>
-        {% endfor %}
-    </div>
-    
-    <div class="timeline">
-        <h2>Timeline of Events</h2>
-        {% for event in report.timeline %}
-        <div class="event">
-            <div class="event-date">{{ event.date }}</div>
-            <div class="event-details">
-                <strong>{{ event.event }}</strong>
-                <p>{{ event.significance }}</p>
-            </div>
-        </div>
-        {% endfor %}
-    </div>
-    
-    <div class="metadata">
-        <h3>About this Report</h3>
-        <p>Query: {{ report.metadata.query }}</p>
-        <p>Sources analyzed: {{ report.metadata.sources_analyzed }}</p>
-        <p>Date range: {{ report.metadata.date_range.earliest }} to {{ report.metadata.date_range.latest }}</p>
-    </div>
-</body>
-</html>
-""")
-        
-        # Interactive D3.js template
-        d3_template = template_dir / 'd3_report.html'
-        if not d3_template.exists():
-            d3_template.write_text("""
-<!DOCTYPE html>
-<html>
-<head>
-    <title>{{ report.title }}</title>
-    <script src="https://d3js.org/d3.v7.min.js"></script>
-    <style>
-        /* Same CSS as basic template plus D3 specific styles */
-        .timeline-viz {
-            width: 100%;
-            height: 400px;
-            margin: 40px 0;
-        }
-        .findings-network {
-            width: 100%;
-            height: 600px;
-            margin: 40px 0;
-        }
-    </style>
-</head>
-<body>
-    <!-- Same basic structure as basic template -->
-    <div class="report-header">
-        <h1>{{ report.title }}</h1>
-    </div>
-    
-    <div class="summary">
-        <h2>Executive Summary</h2>
-        <p>{{ report.summary }}</p>
-    </div>
-    
-    <!-- Interactive timeline visualization -->
-    <h2>Interactive Timeline</h2>
-    <div id="timeline" class="timeline-viz"></div>
-    
-    <!-- Interactive findings network -->
-    <h2>Findings Network</h2>
-    <div id="network" class="findings-network"></div>
-    
-    <!-- Rest of the report content -->
-    <div class="key-findings">
-        <h2>Key Findings</h2>
-        {% for finding in report.key_findings %}
-        <div class="finding">
-            <h3>{{ finding.finding }}</h3>
-            {% for source in finding.supporting_sources %}
-            <div class="source">
-                <a href="{{ source.url }}" target="_blank">{{ source.title }}</a>
-                <div class="quote">{{ source.quote }}</div>
-            </div>
-            {% endfor %}
-        </div>
-        {% endfor %}
-    </div>
-    
-    <div class="metadata">
-        <h3>About this Report</h3>
-        <p>Query: {{ report.metadata.query }}</p>
-        <p>Sources analyzed: {{ report.metadata.sources_analyzed }}</p>
-        <p>Date range: {{ report.metadata.date_range.earliest }} to {{ report.metadata.date_range.latest }}</p>
-    </div>
-    
-    <script>
-        // Parse the report data
-        const report = {{ report|tojson|safe }};
-        
-        // Timeline Visualization
-        function createTimeline() {
-            const margin = {top: 20, right: 20, bottom: 30, left: 50};
-            const width = document.getElementById('timeline').offsetWidth - margin.left - margin.right;
-            const height = 400 - margin.top - margin.bottom;
-            
-            const svg = d3.select('#timeline')
-                .append('svg')
-                .attr('width', width + margin.left + margin.right)
-                .attr('height', height + margin.top + margin.bottom)
-                .append('g')
-                .attr('transform', `translate(${margin.left},${margin.top})`);
-            
-            // Parse dates
-            const timelineData = report.timeline.map(d => ({
-                ...d,
-                dateObj: new Date(d.date)
-            }));
-            
-            // Create scales
-            const x = d3.scaleTime()
-                .domain(d3.extent(timelineData, d => d.dateObj))
-                .range([0, width]);
-                
-            // Add axis
-            svg.append('g')
-                .attr('transform', `translate(0,${height})`)
-                .call(d3.axisBottom(x));
-            
-            // Add events
-            const events = svg.selectAll('.event')
-                .data(timelineData)
-                .enter()
-                .append('g')
-                .attr('class', 'event')
-                .attr('transform', d => `translate(${x(d.dateObj)},0)`);
-            
-            events.append('circle')
-                .attr('r', 5)
-                .attr('cy', height/2)
-                .style('fill', '#4CAF50');
-                
-            events.append('text')
-                .attr('y', height/2 - 10)
-                .attr('text-anchor', 'middle')
-                .text(d => d.event)
-                .call(wrap, 100);
-        }
-        
-        // Findings Network Visualization
-        function createNetwork() {
-            const width = document.getElementById('network').offsetWidth;
-            const height = 600;
-            
-            const svg = d3.select('#network')
-                .append('svg')
-                .attr('width', width)
-                .attr('height', height);
-            
-            // Create nodes for findings and sources
-            const nodes = [];
-            const links = [];
-            
-            // Add finding nodes
-            report.key_findings.forEach((finding, i) => {
-                nodes.push({
-                    id: `finding-${i}`,
-                    type: 'finding',
-                    text: finding.finding
-                });
-                
-                // Add source nodes and links
-                finding.supporting_sources.forEach((source, j) => {
-                    const sourceId = `source-${i}-${j}`;
-                    nodes.push({
-                        id: sourceId,
-                        type: 'source',
-                        text: source.title,
-                        url: source.url
-                    });
-                    links.push({
-                        source: `finding-${i}`,
-                        target: sourceId
-                    });
-                });
-            });
-            
-            // Create force simulation
-            const simulation = d3.forceSimulation(nodes)
-                .force('link', d3.forceLink(links).id(d => d.id))
-                .force('charge', d3.forceManyBody().strength(-300))
-                .force('center', d3.forceCenter(width/2, height/2));
-            
-            // Add links
-            const link = svg.append('g')
-                .selectAll('line')
-                .data(links)
-                .enter()
-                .append('line')
-                .style('stroke', '#999')
-                .style('stroke-width', 1);
-            
-            // Add nodes
-            const node = svg.append('g')
-                .selectAll('circle')
-                .data(nodes)
-                .enter()
-                .append('circle')
-                .attr('r', d => d.type === 'finding' ? 10 : 5)
-                .style('fill', d => d.type === 'finding' ? '#4CAF50' : '#2196F3')
-                .call(d3.drag()
-                    .on('start', dragstarted)
-                    .on('drag', dragged)
-                    .on('end', dragended));
-            
-            // Add labels
-            const label = svg.append('g')
-                .selectAll('text')
-                .data(nodes)
-                .enter()
-                .append('text')
-                .text(d => d.text)
-                .attr('font-size', d => d.type === 'finding' ? '12px' : '10px')
-                .attr('dx', 12)
-                .attr('dy', 4);
-            
-            // Add tooltips
-            node.append('title')
-                .text(d => d.text);
-            
-            // Update positions
-            simulation.on('tick', () => {
-                link
-                    .attr('x1', d => d.source.x)
-                    .attr('y1', d => d.source.y)
-                    .attr('x2', d => d.target.x)
-                    .attr('y2', d => d.target.y);
-                
-                node
-                    .attr('cx', d => d.x)
-                    .attr('cy', d => d.y);
-                
-                label
-                    .attr('x', d => d.x)
-                    .attr('y', d => d.y);
-            });
-            
-            // Drag functions
-            function dragstarted(event) {
-                if (!event.active) simulation.alphaTarget(0.3).restart();
-                event.subject.fx = event.subject.x;
-                event.subject.fy = event.subject.y;
-            }
-            
-            function dragged(event) {
-                event.subject.fx = event.x;
-                event.subject.fy = event.y;
-            }
-            
-            function dragended(event) {
-                if (!event.active) simulation.alphaTarget(0);
-                event.subject.fx = null;
-                event.subject.fy = null;
-            }
-        }
-        
-        // Text wrapping function
-        function wrap(text, width) {
-            text.each(function() {
-                const text = d3.select(this);
-                const words = text.text().split(/\s+/).reverse();
-                let word;
-                let line = [];
-                let lineNumber = 0;
-                const lineHeight = 1.1;
-                const y = text.attr('y');
-                const dy = parseFloat(text.attr('dy')) || 0;
-                let tspan = text.text(null).append('tspan').attr('x', 0).attr('y', y).attr('dy', dy + 'em');
-                
-                while (word = words.pop()) {
-                    line.push(word);
-                    tspan.text(line.join(' '));
-                    if (tspan.node().getComputedTextLength() > width) {
-                        line.pop();
-                        tspan.text(line.join(' '));
-                        line = [word];
-                        tspan = text.append('tspan').attr('x', 0).attr('y', y).attr('dy', ++lineNumber * lineHeight + dy + 'em').text(word);
-                    }
-                }
-            });
-        }
-        
-        // Create visualizations when page loads
-        document.addEventListener('DOMContentLoaded', () => {
-            createTimeline();
-            createNetwork();
-        });
-    </script>
-</body>
-</html>
-""")
-    
-    def visualize(self, report: Dict[str, Any], output_dir: str = 'reports', template: str = 'basic_report.html') -> str:
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Args:
+            cache_dir: Directory for compiled template bytecode
+                (default: REPORT_TEMPLATE_CACHE or ~/.cache/exa-researcher/jinja)
+        """
+        self.cache_dir = str(cache_dir or default_cache_dir())
+        self.env = _environment(self.cache_dir)
+
+    def get_template(self, template: str) -> Template:
+        """Return a compiled template; the environment keeps it for the life of the process."""
+        return self.env.get_template(template)
+
+    def _output_file(self, report: Dict[str, Any], output_path: Path) -> Path:
+        # Generate unique filename based on report title
+        safe_title = "".join(c for c in report['title'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
+        filename = f"{safe_title}_{report['metadata']['date_range']['latest']}.html"
+        return output_path / filename
+
+    def _write_data(self, report: Dict[str, Any], output_file: Path) -> str:
+        """Write report data as a compact gzipped JSON payload next to the HTML file."""
+        data_file = output_file.with_suffix('.data.json.gz')
+        with gzip.open(data_file, 'wt', encoding='utf-8', compresslevel=6) as f:
+            json.dump(report, f, separators=(',', ':'), default=str)
+        return data_file.name
+
+    def _write(self,
+               report: Dict[str, Any],
+               output_path: Path,
+               template: str,
+               data_mode: str = 'inline',
+               live_layout: bool = False,
+               filename: Optional[str] = None) -> str:
+        if data_mode not in DATA_MODES:
+            raise ValueError(f"Unknown data mode: {data_mode}")
+        output_file = output_path / filename if filename else self._output_file(report, output_path)
+
+        report_data_url = self._write_data(report, output_file) if data_mode == 'external' else None
+        network = findings_network(report) if template in NETWORK_TEMPLATES else None
+
+        # Stream template output to disk instead of building the whole page in memory
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.writelines(self.get_template(template).generate(
+                report=report,
+                report_data_url=report_data_url,
+                network=network,
+                live_layout=live_layout
+            ))
+        return str(output_file)
+
+    @profiled("render")
+    def visualize(self,
+                  report: Dict[str, Any],
+                  output_dir: str = 'reports',
+                  template: str = 'basic_report.html',
+                  data_mode: str = 'inline',
+                  live_layout: bool = False) -> str:
         """
         Generate an HTML visualization of the research report.
-        
+
         Args:
             report: The research report dictionary
             output_dir: Directory to save the HTML file (default: 'reports')
             template: Template to use (default: 'basic_report.html')
-            
+            data_mode: 'inline' embeds report data in the page; 'external' writes it to a
+                gzipped JSON file next to the page that interactive templates load lazily.
+                Browsers block that request on file:// pages, so external pages must be
+                served over HTTP (e.g. python -m http.server)
+            live_layout: Keep running the force simulation in the browser on top of the
+                precomputed network layout (default: False, the layout is static)
+
         Returns:
             Path to the generated HTML file
         """
         # Create output directory if it doesn't exist
         output_path = Path(output_dir)
         output_path.mkdir(exist_ok=True)
-        
-        # Generate unique filename based on report title
-        safe_title = "".join(c for c in report['title'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        filename = f"{safe_title}_{report['metadata']['date_range']['latest']}.html"
-        output_file = output_path / filename
-        
-        # Render template
-        template = self.env.get_template(template)
-        html = template.render(report=report)
-        
-        # Save to file
-        output_file.write_text(html)
-        
-        return str(output_file) 
\ No newline at end of file
+
+        return self._write(report, output_path, template, data_mode, live_layout)
+
+    @profiled("render")
+    def render_many(self,
+                    reports: List[Dict[str, Any]],
+                    output_dir: str = 'reports',
+                    template: str = 'basic_report.html',
+                    data_mode: str = 'inline',
+                    live_layout: bool = False,
+                    max_workers: Optional[int] = None,
+                    filenames: Optional[List[str]] = None) -> List[str]:
+        """
+        Render a batch of reports, in parallel worker processes when there is more than one.
+
+        Args:
+            reports: Research report dictionaries
+            output_dir: Directory to save the HTML files (default: 'reports')
+            template: Template to use (default: 'basic_report.html')
+            data_mode: How report data is embedded, as in visualize (default: 'inline')
+            live_layout: Run the browser force simulation, as in visualize (default: False)
+            max_workers: Worker processes to use (default: one per CPU)
+            filenames: Page file names, one per report (default: named from title and date)
+
+        Returns:
+            Paths to the generated HTML files, in the order of the input reports
+        """
+        output_path = Path(output_dir)
+        output_path.mkdir(exist_ok=True)
+
+        filenames = filenames or [None] * len(reports)
+        workers = min(max_workers or os.cpu_count() or 1, len(reports))
+        if workers <= 1:
+            return [self._write(report, output_path, template, data_mode, live_layout, filename)
+                    for report, filename in zip(reports, filenames)]
+
+        # Compile once here so workers load bytecode from the cache instead of re-parsing
+        self.get_template(template)
+        chunksize = max(1, len(reports) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(self.cache_dir,)) as executor:
+            return list(executor.map(_render_worker,
+                                     [(report, str(output_path), template, data_mode, live_layout, filename)
+                                      for report, filename in zip(reports, filenames)],
+                                     chunksize=chunksize))
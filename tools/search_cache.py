@@ -0,0 +1,169 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pathlib import Path
+from functools import lru_cache
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+def normalize_query(query: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace so trivially different queries share a key."""
+    return ' '.join(re.findall(r'\w+', query.lower()))
+
+def _options_key(num_results: int, options: Dict[str, Any]) -> str:
+    return json.dumps({'num_results': num_results, **options}, sort_keys=True, default=str)
+
+def _similarity(a: str, b: str) -> float:
+    """Jaccard similarity of the word sets of two normalized queries."""
+    words_a, words_b = set(a.split()), set(b.split())
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+class SearchCache:
+    """
+    TTL cache for search results keyed by normalized query, result count and search options.
+
+    Entries live in SQLite: in memory by default, or in a file so reruns can reuse them.
+    The least recently used entries are evicted beyond max_entries. With fuzzy_threshold
+    set, a miss falls back to the most similar fresh query with the same options.
+    """
+
+    def __init__(self,
+                 path: Optional[str] = None,
+                 ttl: float = 24 * 3600,
+                 max_entries: int = 5000,
+                 fuzzy_threshold: Optional[float] = None):
+        """
+        Args:
+            path: SQLite file to persist entries in (default: in memory only)
+            ttl: Seconds an entry stays fresh (default: one day)
+            max_entries: Maximum number of entries kept
+            fuzzy_threshold: Minimum word-set similarity (0-1) for near-identical queries
+                to share results (default: exact matches only)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.fuzzy_threshold = fuzzy_threshold
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path or ':memory:', check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS search_cache (
+                query TEXT NOT NULL,
+                options TEXT NOT NULL,
+                results TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (query, options)
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS search_cache_accessed ON search_cache (accessed)")
+        self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+
+    def get(self, query: str, num_results: int, **options) -> Optional[List[Dict[str, Any]]]:
+        """Return cached results for a query, or None on a miss."""
+        normalized = normalize_query(query)
+        options_key = _options_key(num_results, options)
+        now = time.time()
+
+        with self._lock:
+            self._db.execute("DELETE FROM search_cache WHERE created < ?", (now - self.ttl,))
+            row = self._db.execute(
+                "SELECT query, results FROM search_cache WHERE query = ? AND options = ?",
+                (normalized, options_key)
+            ).fetchone()
+
+            if row is None and self.fuzzy_threshold is not None:
+                candidates = self._db.execute(
+                    "SELECT query, results FROM search_cache WHERE options = ?", (options_key,)
+                ).fetchall()
+                scored = [(_similarity(normalized, q), q, r) for q, r in candidates]
+                scored = [c for c in scored if c[0] >= self.fuzzy_threshold]
+                if scored:
+                    _, q, r = max(scored)
+                    row = (q, r)
+
+            if row is None:
+                self.misses += 1
+                self._db.commit()
+                return None
+
+            self._db.execute("UPDATE search_cache SET accessed = ? WHERE query = ? AND options = ?",
+                             (now, row[0], options_key))
+            self._db.commit()
+            self.hits += 1
+            return json.loads(row[1])
+
+    def put(self, query: str, num_results: int, results: List[Dict[str, Any]], **options):
+        """Store results for a query, evicting the least recently used entries beyond max_entries."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?, ?, ?)",
+                (normalize_query(query), _options_key(num_results, options), json.dumps(results), now, now)
+            )
+            self._db.execute("""
+                DELETE FROM search_cache WHERE rowid IN (
+                    SELECT rowid FROM search_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._db.commit()
+
+    def get_or_search(self,
+                      query: str,
+                      num_results: int,
+                      search: Callable[[], List[Dict[str, Any]]],
+                      **options) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Return cached results, or run search() and cache what it returns.
+
+        Returns:
+            The results and whether they came from the cache
+        """
+        cached = self.get(query, num_results, **options)
+        if cached is not None:
+            return cached, True
+        results = search()
+        self.put(query, num_results, results, **options)
+        return results, False
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM search_cache")
+            self._db.commit()
+
+def default_cache_path() -> Path:
+    """Location of the persistent search cache, next to the other per-user caches."""
+    override = os.getenv('EXA_SEARCH_CACHE')
+    if override:
+        return Path(override)
+    cache_home = Path(os.getenv('XDG_CACHE_HOME') or Path.home() / '.cache')
+    return cache_home / 'exa-researcher' / 'search.sqlite'
+
+@lru_cache(maxsize=None)
+def default_search_cache() -> Optional[SearchCache]:
+    """
+    Process-wide persistent cache configured from the environment:
+    EXA_SEARCH_CACHE (file), EXA_SEARCH_CACHE_TTL (seconds, 0 disables caching)
+    and EXA_SEARCH_CACHE_FUZZY (similarity threshold for near-identical queries).
+    """
+    ttl = float(os.getenv('EXA_SEARCH_CACHE_TTL', 24 * 3600))
+    if ttl <= 0:
+        return None
+    fuzzy = os.getenv('EXA_SEARCH_CACHE_FUZZY')
+    try:
+        return SearchCache(str(default_cache_path()), ttl=ttl, fuzzy_threshold=float(fuzzy) if fuzzy else None)
+    except (OSError, sqlite3.Error):
+        # Unwritable cache location; fall back to caching within this process only
+        return SearchCache(ttl=ttl, fuzzy_threshold=float(fuzzy) if fuzzy else None)
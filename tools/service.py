@@ -0,0 +1,276 @@
+from typing import Any, Callable, Dict, List, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import threading
+import time
+import uuid
+
+from dotenv import load_dotenv
+from models.base import ResearchReport, ResearchResult
+from models.cleaning import clean_sources
+from models.offload import default_offload
+from models.openai_model import OpenAIModel, count_tokens
+from models.transport import default_transport
+from tools.search_cache import default_search_cache
+from .report_visualizer import report_to_dict
+
+@dataclass
+class ResearchJob:
+    """A research request and the progress events it has produced so far."""
+    id: str
+    topic: str
+    queries: List[str]
+    max_sources: int = 5
+    partial_reports: bool = False
+    status: str = 'queued'  # queued, running, done or failed
+    stage: Optional[str] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    report: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    _changed: threading.Condition = field(default_factory=threading.Condition, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed')
+
+    def emit(self, event: str, data: Dict[str, Any], status: Optional[str] = None):
+        """Record a progress event (and a status change with it) and wake up any event streams."""
+        with self._changed:
+            if status is not None:
+                self.status = status
+            elif event != 'partial_report':
+                self.stage = event
+            self.events.append({'id': len(self.events), 'event': event, 'data': data})
+            self._changed.notify_all()
+
+    def wait_for_events(self, after: int, timeout: float) -> List[Dict[str, Any]]:
+        """Events with an id of at least after, waiting up to timeout for new ones."""
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.events) > after or self.finished, timeout=timeout)
+            return self.events[after:]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'topic': self.topic,
+            'status': self.status,
+            'stage': self.stage,
+            'events': len(self.events),
+            'report': self.report,
+            'error': self.error
+        }
+
+def research_pipeline(model: OpenAIModel, job: ResearchJob) -> ResearchReport:
+    """Search, evaluate, fetch, analyze and synthesize, emitting an event after each stage."""
+    from tools.exa import get_contents, search_with_contents  # Needs EXA_API_KEY
+
+    results, seen = [], set()
+    for query in job.queries:
+        for result in search_with_contents(query, max_results=10):
+            if result.url not in seen:
+                seen.add(result.url)
+                results.append(ResearchResult(title=result.title, url=result.url,
+                                              published_date=result.published_date or "Unknown",
+                                              content=result.text, highlights=result.highlights or None))
+    job.emit('search', {'sources': len(results)})
+
+    ranked = model.evaluate_sources(results, job.topic, max_sources=job.max_sources)
+    job.emit('evaluation', {'selected': [{'title': r.title, 'url': r.url, 'score': r.relevance_score} for r in ranked]})
+
+    # Text normally came with the search; only fetch pages it was missing for
+    missing = [r for r in ranked if not r.content]
+    if missing:
+        for result, text in zip(missing, get_contents([r.url for r in missing])):
+            result.content = text
+    saved = sum(s.tokens_saved for s in clean_sources(ranked, count_tokens, offload=default_offload()))
+    job.emit('fetch', {'sources': len(ranked), 'tokens_saved': saved})
+
+    analyses = []
+    for i, result in enumerate(ranked, 1):
+        analyses.append(model.summarize_and_analyze(result, max_length=2000))
+        job.emit('analysis', {'done': i, 'total': len(ranked), 'title': result.title,
+                              'key_points': analyses[-1].key_points})
+
+    if job.partial_reports and len(analyses) > 1:
+        # A first report from half the sources, then a revision with the rest
+        half = len(analyses) // 2
+        report = model.synthesize_research(analyses[:half], job.topic)
+        job.emit('partial_report', report_to_dict(report))
+        report = model.update_research(report, analyses[half:], job.topic).report
+    else:
+        report = model.synthesize_research(analyses, job.topic)
+    job.emit('synthesis', {'title': report.title})
+    return report
+
+class ResearchService:
+    """
+    Resident research service: keeps the model, HTTP connection pools, search cache
+    and tokenizer warm, and runs submitted jobs on a thread pool.
+    """
+
+    def __init__(self,
+                 pipeline: Optional[Callable[[ResearchJob], ResearchReport]] = None,
+                 max_concurrent: int = 4,
+                 max_jobs: int = 100):
+        """
+        Args:
+            pipeline: Runs one job (default: research_pipeline on a warm OpenAIModel)
+            max_concurrent: Jobs run at the same time
+            max_jobs: Finished jobs kept for status queries
+        """
+        if pipeline is None:
+            load_dotenv()
+            model = OpenAIModel()
+            count_tokens("warm up")  # Load the tokenizer once, not on the first request
+            default_search_cache()
+            pipeline = lambda job: research_pipeline(model, job)
+        self.pipeline = pipeline
+        self.max_jobs = max_jobs
+        self.jobs: 'OrderedDict[str, ResearchJob]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='research')
+
+    def submit(self, topic: str, queries: Optional[List[str]] = None, max_sources: int = 5,
+               partial_reports: bool = False) -> ResearchJob:
+        job = ResearchJob(id=uuid.uuid4().hex[:12], topic=topic, queries=queries or [topic],
+                          max_sources=max_sources, partial_reports=partial_reports)
+        with self._lock:
+            self.jobs[job.id] = job
+            finished = [job_id for job_id, j in self.jobs.items() if j.finished]
+            for job_id in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+                del self.jobs[job_id]
+        self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job: ResearchJob):
+        job.emit('started', {'topic': job.topic, 'queries': job.queries}, status='running')
+        try:
+            report = self.pipeline(job)
+            job.report = report_to_dict(report) if isinstance(report, ResearchReport) else report
+            job.emit('done', {'report': job.report}, status='done')
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.emit('failed', {'error': job.error}, status='failed')
+
+    def get(self, job_id: str) -> Optional[ResearchJob]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def health(self) -> Dict[str, Any]:
+        # Only report the cache if something has opened it
+        cache = default_search_cache() if default_search_cache.cache_info().currsize else None
+        return {
+            'jobs': {status: sum(1 for j in list(self.jobs.values()) if j.status == status)
+                     for status in ('queued', 'running', 'done', 'failed')},
+            'pools': {name: vars(stats) for name, stats in default_transport().stats().items()},
+            'search_cache': {'hits': cache.hits, 'misses': cache.misses} if cache is not None else None
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+def make_handler(service: ResearchService, keepalive_seconds: float = 15.0) -> type:
+    """Request handler class bound to a service."""
+
+    class ResearchHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _json(self, status: int, body: Dict[str, Any]):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _job(self, job_id: str) -> Optional[ResearchJob]:
+            job = service.get(job_id)
+            if job is None:
+                self._json(404, {'error': f"Unknown job {job_id}"})
+            return job
+
+        def do_POST(self):
+            if self.path != '/research':
+                return self._json(404, {'error': 'Not found'})
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                topic = body['topic']
+            except (ValueError, KeyError):
+                return self._json(400, {'error': 'Expected a JSON body with a topic'})
+            job = service.submit(topic, body.get('queries'), int(body.get('max_sources', 5)),
+                                 bool(body.get('partial_reports', False)))
+            self._json(202, {'id': job.id, 'status_url': f"/research/{job.id}",
+                             'events_url': f"/research/{job.id}/events"})
+
+        def do_GET(self):
+            parts = self.path.strip('/').split('/')
+            if parts == ['health']:
+                return self._json(200, service.health())
+            if len(parts) == 2 and parts[0] == 'research':
+                job = self._job(parts[1])
+                if job:
+                    self._json(200, job.summary())
+                return
+            if len(parts) == 3 and parts[0] == 'research' and parts[2] == 'events':
+                job = self._job(parts[1])
+                if job:
+                    self._stream(job)
+                return
+            self._json(404, {'error': 'Not found'})
+
+        def _stream(self, job: ResearchJob):
+            """Server-sent events for a job, resuming after Last-Event-ID, until it finishes."""
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+
+            last_id = self.headers.get('Last-Event-ID')
+            position = int(last_id) + 1 if last_id and last_id.isdigit() else 0
+            try:
+                while True:
+                    events = job.wait_for_events(position, keepalive_seconds)
+                    if not events:
+                        if job.finished:
+                            return
+                        self.wfile.write(b": keepalive\n\n")
+                    for event in events:
+                        self.wfile.write(f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                    position += len(events)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Client went away
+
+        def log_message(self, format: str, *args):
+            pass
+
+    return ResearchHandler
+
+def serve(host: str = '127.0.0.1', port: int = 8000, max_concurrent: int = 4):
+    """Start the research service and block until interrupted."""
+    service = ResearchService(max_concurrent=max_concurrent)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    print(f"Research service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the research pipeline over a local HTTP API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-concurrent', type=int, default=4)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.max_concurrent)